@@ -0,0 +1,51 @@
+import os
+import asyncio
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI
+from motor.motor_asyncio import AsyncIOMotorClient
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from api.routes import router
+from api.trace import TraceCache, listen_for_invalidations
+from middleware.correlation import CorrelationIdMiddleware
+from versioning.manager import ContentCache
+
+MONGO_URI = os.getenv("MONGO_URI", "mongodb://ggp-mongo:27017")
+MONGO_DB = os.getenv("MONGO_DB", "ggp")
+POSTGRES_DSN = os.getenv("POSTGRES_DSN")  # required
+TRACE_CACHE_SIZE = int(os.getenv("TRACE_CACHE_SIZE", "1024"))
+TRACE_LISTEN_KEEPALIVE_S = float(os.getenv("TRACE_LISTEN_KEEPALIVE_S", "10"))
+SOP_CONTENT_CACHE_SIZE = int(os.getenv("SOP_CONTENT_CACHE_SIZE", "512"))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if not POSTGRES_DSN:
+        raise RuntimeError("POSTGRES_DSN is required")
+
+    mongo = AsyncIOMotorClient(MONGO_URI)
+    app.state.mdb = mongo[MONGO_DB]
+    app.state.pg = create_async_engine(POSTGRES_DSN, pool_pre_ping=True)
+    app.state.trace_cache = TraceCache(max_size=TRACE_CACHE_SIZE)
+    app.state.content_cache = ContentCache(max_size=SOP_CONTENT_CACHE_SIZE)
+    listener = asyncio.create_task(
+        listen_for_invalidations(app.state.pg, app.state.trace_cache, keepalive_s=TRACE_LISTEN_KEEPALIVE_S)
+    )
+    try:
+        yield
+    finally:
+        listener.cancel()
+        await asyncio.gather(listener, return_exceptions=True)
+        await app.state.pg.dispose()
+        mongo.close()
+
+
+app = FastAPI(title="GGP API", lifespan=lifespan)
+app.add_middleware(CorrelationIdMiddleware)
+app.include_router(router)
+
+
+@app.get("/healthz")
+async def healthz():
+    return {"status": "ok"}
@@ -0,0 +1,177 @@
+# api/routes.py
+"""
+Read API over the Mongo read models.
+
+SOP listings page with keyset cursors on (updated_at, _id), newest first, instead
+of skip/limit: each page is one index range scan on idx_status_updated_id /
+idx_tags_updated_id, so page N costs the same as page 1.
+
+Responses carry a weak ETag over the page's (_id, updated_at) pairs and next
+cursor; a matching If-None-Match gets 304 with no body, which is what the
+frontend's polling hits almost every time.
+
+GET /traces/{correlation_id} returns the causal tree of a request (see api/trace.py).
+
+GET /sops/{sop_id}/versions/{version} returns one version's content from the
+Postgres content store (versioning/manager.py); the content hash is its ETag.
+"""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+
+from api.trace import load_trace
+from versioning.manager import load_version
+
+router = APIRouter()
+
+SOP_STATUSES = ("draft", "published", "retired")
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# summary fields only; content is served per version from Postgres (get_sop_version)
+SOP_SUMMARY_FIELDS = {
+    "_id": 1,
+    "sop_id": 1,
+    "title": 1,
+    "status": 1,
+    "tags": 1,
+    "current_version": 1,
+    "updated_at": 1,
+}
+
+_KEYSET_SORT = [("updated_at", -1), ("_id", -1)]
+
+
+def encode_cursor(updated_at: datetime, _id: str) -> str:
+    raw = json.dumps([updated_at.isoformat(), _id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        updated_at, _id = json.loads(raw)
+        return datetime.fromisoformat(updated_at), str(_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset_filter(base: Dict[str, Any], cursor: Optional[str]) -> Dict[str, Any]:
+    """Rows strictly after the cursor in (updated_at DESC, _id DESC) order."""
+    if not cursor:
+        return base
+    updated_at, _id = decode_cursor(cursor)
+    return {
+        **base,
+        "$or": [
+            {"updated_at": {"$lt": updated_at}},
+            {"updated_at": updated_at, "_id": {"$lt": _id}},
+        ],
+    }
+
+
+def page_etag(items: List[Dict[str, Any]], next_cursor: Optional[str]) -> str:
+    h = hashlib.blake2b(digest_size=12)
+    for doc in items:
+        h.update(str(doc["_id"]).encode("utf-8"))
+        h.update(b"\0")
+        h.update(str(doc.get("updated_at")).encode("utf-8"))
+        h.update(b"\0")
+    h.update((next_cursor or "").encode("utf-8"))
+    return f'W/"{h.hexdigest()}"'
+
+
+def _if_none_match(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    return header.strip() == "*" or etag in (t.strip() for t in header.split(","))
+
+
+async def list_sops(request: Request, response: Response, base_filter: Dict[str, Any], *, limit: int, cursor: Optional[str]):
+    mdb = request.app.state.mdb
+    docs = await (
+        mdb["rm_sop_index"]
+        .find(keyset_filter(base_filter, cursor), SOP_SUMMARY_FIELDS)
+        .sort(_KEYSET_SORT)
+        .limit(limit + 1)  # one extra row tells us whether there is a next page
+        .to_list(length=limit + 1)
+    )
+    items = docs[:limit]
+    next_cursor = None
+    if len(docs) > limit and items:
+        last = items[-1]
+        next_cursor = encode_cursor(last["updated_at"], last["_id"])
+
+    etag = page_etag(items, next_cursor)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _if_none_match(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    response.headers.update(headers)
+    return {
+        "items": [
+            {**doc, "updated_at": doc["updated_at"].isoformat() if doc.get("updated_at") else None}
+            for doc in items
+        ],
+        "next_cursor": next_cursor,
+    }
+
+
+@router.get("/sops/status/{status}")
+async def list_sops_by_status(
+    status: str,
+    request: Request,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+):
+    if status not in SOP_STATUSES:
+        raise HTTPException(status_code=404, detail=f"Unknown status: {status}")
+    return await list_sops(request, response, {"status": status}, limit=limit, cursor=cursor)
+
+
+@router.get("/sops/tags/{tag}")
+async def list_sops_by_tag(
+    tag: str,
+    request: Request,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+):
+    return await list_sops(request, response, {"tags": tag}, limit=limit, cursor=cursor)
+
+
+@router.get("/traces/{correlation_id}")
+async def get_trace(correlation_id: UUID, request: Request):
+    body = await load_trace(request.app.state.pg, request.app.state.trace_cache, correlation_id)
+    if body is None:
+        raise HTTPException(status_code=404, detail="No events for correlation_id")
+    return Response(content=body, media_type="application/json")
+
+
+@router.get("/sops/{sop_id}/versions/{version}")
+async def get_sop_version(sop_id: UUID, version: int, request: Request):
+    async with request.app.state.pg.connect() as conn:
+        found = await load_version(conn, sop_id, version, cache=request.app.state.content_cache)
+    if found is None:
+        raise HTTPException(status_code=404, detail="No such SOP version")
+    content_hash, content = found
+    etag = f'"{content_hash}"'
+    # a version's content never changes
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=31536000, immutable"}
+    if _if_none_match(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(
+        content=json.dumps({"sop_id": str(sop_id), "version": version, "content_hash": content_hash, "content": content}),
+        media_type="application/json",
+        headers=headers,
+    )
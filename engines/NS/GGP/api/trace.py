@@ -0,0 +1,238 @@
+# api/trace.py
+"""
+Causal traces: every event of one correlation_id as a tree of causation_id links.
+
+- one indexed query per trace (idx_audit_event_correlation), tree assembled here
+- the rendered JSON is cached per correlation_id (LRU) and served as-is
+- entries are dropped when audit_event gets a new row for that correlation_id:
+  the statement-level trigger (migration 0004) NOTIFYs ggp_audit_event on commit
+  with the comma-separated correlation_ids of each insert, and
+  listen_for_invalidations() evicts on receipt
+- while the LISTEN connection is down nothing is cached (a missed notification
+  would otherwise serve a stale trace); the cache is cleared on reconnect
+- a half-open connection never reports termination, so the listener round-trips
+  a keepalive every keepalive_s; if it fails or times out, the cache is disabled
+  and cleared and the connection is replaced. Notifications sent before the
+  keepalive arrive before its reply, so a stale entry lives at most one interval.
+- a causation cycle (A caused B caused A) is cut at the earliest event of the
+  cycle, which becomes a root flagged "causation_cycle"
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+log = logging.getLogger("ggp.trace")
+
+NOTIFY_CHANNEL = "ggp_audit_event"
+
+_TRACE_SQL = text("""
+    SELECT
+      event_id, event_type, occurred_at, producer, causation_id,
+      actor_type, actor_id, actor_display, tenant_id,
+      kafka_topic, kafka_partition, kafka_offset
+    FROM audit_event
+    WHERE correlation_id = :cid
+    ORDER BY occurred_at, event_id
+""")
+
+
+class TraceCache:
+    """
+    LRU of rendered traces (bytes) keyed by correlation_id string.
+
+    A load that overlaps an invalidation for the same key must not store its
+    (possibly pre-insert) result: begin_load() returns a token that invalidate()
+    bumps, and finish_load() only stores when the token is unchanged.
+    """
+
+    def __init__(self, max_size: int = 1024) -> None:
+        self.max_size = max_size
+        self.enabled = False
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._loading: Dict[str, List[int]] = {}  # key -> [generation, loaders]
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        value = self._entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def begin_load(self, key: str) -> int:
+        state = self._loading.setdefault(key, [0, 0])
+        state[1] += 1
+        return state[0]
+
+    def finish_load(self, key: str, token: int, value: Optional[bytes]) -> None:
+        state = self._loading[key]
+        state[1] -= 1
+        if state[1] == 0:
+            del self._loading[key]
+        if value is None or not self.enabled or token != state[0]:
+            return
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: str) -> None:
+        self._entries.pop(key, None)
+        state = self._loading.get(key)
+        if state is not None:
+            state[0] += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+        for state in self._loading.values():
+            state[0] += 1
+
+
+def build_trace(correlation_id: UUID, rows) -> Dict[str, Any]:
+    """
+    Rows (occurred_at order) -> {"correlation_id", "event_count", "roots": [node...]}.
+    Roots are events without a causation_id or whose cause is outside this correlation
+    (flagged with "external_cause"), plus the earliest event of each causation
+    cycle (flagged with "causation_cycle"); children keep occurred_at order.
+    """
+    nodes: Dict[str, Dict[str, Any]] = {}
+    for r in rows:
+        nodes[str(r.event_id)] = {
+            "event_id": str(r.event_id),
+            "event_type": r.event_type,
+            "occurred_at": r.occurred_at.isoformat(),
+            "producer": r.producer,
+            "causation_id": str(r.causation_id) if r.causation_id else None,
+            "actor": {"type": r.actor_type, "id": r.actor_id, "display": r.actor_display},
+            "tenant_id": r.tenant_id,
+            "kafka": {"topic": r.kafka_topic, "partition": r.kafka_partition, "offset": r.kafka_offset},
+            "children": [],
+        }
+
+    roots = []
+    for node in nodes.values():
+        parent = nodes.get(node["causation_id"]) if node["causation_id"] else None
+        if parent is node:
+            # caused by itself: a one-event cycle
+            node["causation_cycle"] = True
+            roots.append(node)
+        elif parent is not None:
+            parent["children"].append(node)
+        else:
+            if node["causation_id"]:
+                node["external_cause"] = True
+            roots.append(node)
+
+    # nodes not reachable from a root hang off a causation cycle: cut each cycle
+    reached: set = set()
+    _mark(roots, reached)
+    position = {key: i for i, key in enumerate(nodes)}
+    for node in nodes.values():
+        if node["event_id"] in reached:
+            continue
+        # follow causes until one repeats: that event is on the cycle
+        seen = set()
+        cur = node
+        while cur["event_id"] not in seen:
+            seen.add(cur["event_id"])
+            cur = nodes[cur["causation_id"]]
+        first = min(_cycle(nodes, cur), key=lambda n: position[n["event_id"]])
+        nodes[first["causation_id"]]["children"].remove(first)
+        first["causation_cycle"] = True
+        roots.append(first)
+        _mark([first], reached)
+
+    return {"correlation_id": str(correlation_id), "event_count": len(nodes), "roots": roots}
+
+
+def _mark(roots: List[Dict[str, Any]], reached: set) -> None:
+    stack = list(roots)
+    while stack:
+        node = stack.pop()
+        reached.add(node["event_id"])
+        stack.extend(node["children"])
+
+
+def _cycle(nodes: Dict[str, Dict[str, Any]], start: Dict[str, Any]) -> List[Dict[str, Any]]:
+    cycle = [start]
+    node = nodes[start["causation_id"]]
+    while node is not start:
+        cycle.append(node)
+        node = nodes[node["causation_id"]]
+    return cycle
+
+
+async def load_trace(engine: AsyncEngine, cache: TraceCache, correlation_id: UUID) -> Optional[bytes]:
+    """Rendered trace JSON, from cache when possible. None if no events exist."""
+    key = str(correlation_id)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    token = cache.begin_load(key)
+    body = None
+    try:
+        async with engine.connect() as conn:
+            rows = (await conn.execute(_TRACE_SQL, {"cid": key})).all()
+        if rows:
+            body = json.dumps(build_trace(correlation_id, rows), separators=(",", ":")).encode("utf-8")
+    finally:
+        cache.finish_load(key, token, body)
+    return body
+
+
+async def listen_for_invalidations(
+    engine: AsyncEngine,
+    cache: TraceCache,
+    *,
+    retry_s: float = 1.0,
+    keepalive_s: float = 10.0,
+) -> None:
+    """
+    Hold a LISTEN connection and evict traces as their correlation ids get new events.
+    Runs until cancelled; reconnects on connection loss or a failed keepalive.
+    """
+    def on_notify(_conn, _pid, _channel, payload: str) -> None:
+        for key in payload.split(","):
+            cache.invalidate(key)
+
+    while True:
+        lost = asyncio.Event()
+        try:
+            async with engine.connect() as conn:
+                raw = (await conn.get_raw_connection()).driver_connection  # asyncpg.Connection
+                await raw.add_listener(NOTIFY_CHANNEL, on_notify)
+                raw.add_termination_listener(lambda _conn: lost.set())
+                cache.clear()
+                cache.enabled = True
+                try:
+                    while not lost.is_set():
+                        try:
+                            await asyncio.wait_for(lost.wait(), timeout=keepalive_s)
+                        except asyncio.TimeoutError:
+                            try:
+                                await asyncio.wait_for(raw.execute("SELECT 1"), timeout=keepalive_s)
+                            except BaseException:
+                                await conn.invalidate()  # don't return a half-open connection to the pool
+                                raise
+                    log.warning("trace LISTEN connection terminated; reconnecting")
+                finally:
+                    cache.enabled = False
+                    cache.clear()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            log.warning("trace LISTEN connection failed; trace cache disabled until reconnect", exc_info=True)
+        await asyncio.sleep(retry_s)
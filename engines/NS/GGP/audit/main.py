@@ -1,18 +1,42 @@
 import os
 import json
 import asyncio
-from aiokafka import AIOKafkaConsumer, AIOKafkaProducer
+from aiokafka import AIOKafkaProducer
 from sqlalchemy.ext.asyncio import create_async_engine
 from sqlalchemy import text
 
-from core.events import parse_envelope
-from components.pg_idempotency import try_mark_processed, KafkaMeta
+from core import codec
+from core.events import parse_envelope, parse_envelopes
+from components.partition_workers import partition_parallel
+from components.dedup_cache import cache_from_env
+from components.metrics import ConsumerMetrics, start_metrics_server, stop_metrics_server
+from components.pg_idempotency import mark_processed, mark_processed_many, KafkaMeta
+from components.runtime import ConsumerRuntime
 
 BOOTSTRAP = os.getenv("KAFKA_BOOTSTRAP_SERVERS", "ggp-kafka:9092")
 CONSUMER_GROUP = os.getenv("KAFKA_CONSUMER_GROUP", "ggp-audit-v1")
 POSTGRES_DSN = os.getenv("POSTGRES_DSN")
 DLQ_TOPIC = os.getenv("DLQ_TOPIC", "ggp.core.dlq.audit")
 
+# Batched mode: drain getmany() batches and write audit rows with one statement per batch.
+BATCH_MODE = os.getenv("AUDIT_BATCH_MODE", "false").strip().lower() in {"1", "true", "yes", "y", "on"}
+BATCH_MAX_RECORDS = int(os.getenv("BATCH_MAX_RECORDS", "500"))
+BATCH_MAX_WAIT_MS = int(os.getenv("BATCH_MAX_WAIT_MS", "200"))
+
+# Partition-parallel mode: one worker per assigned partition (order kept within a partition).
+PARTITION_PARALLEL = os.getenv("PARTITION_PARALLEL", "false").strip().lower() in {"1", "true", "yes", "y", "on"}
+PARTITION_QUEUE_SIZE = int(os.getenv("PARTITION_QUEUE_SIZE", "4"))
+
+# Recently confirmed event_ids, checked before the Postgres ledger (DEDUP_CACHE_SIZE=0 disables).
+DEDUP_CACHE = cache_from_env()
+
+# Per-stage latency, outcome counters, lag and dedup cache hit/miss counts, served on METRICS_PORT (see components/metrics.py).
+METRICS = ConsumerMetrics("audit")
+METRICS.watch_cache(DEDUP_CACHE)
+
+# Skip the ledger for records below the group's committed offset (batched and default modes).
+WATERMARK_FASTPATH = os.getenv("LEDGER_WATERMARK_FASTPATH", "false").strip().lower() in {"1", "true", "yes", "y", "on"}
+
 # Start explicit and expand later; you can also subscribe by regex with aiokafka patterns.
 TOPICS = [
     "ggp.core.sop.created",
@@ -30,9 +54,11 @@ async def dlq(producer: AIOKafkaProducer, meta: KafkaMeta, raw: dict, err: Excep
         "error_message": str(err)[:2000],
         "event": raw,
     }
-    await producer.send_and_wait(DLQ_TOPIC, json.dumps(msg).encode("utf-8"))
+    with METRICS.dlq.time():
+        await producer.send_and_wait(DLQ_TOPIC, json.dumps(msg).encode("utf-8"))
+    METRICS.dlq_total.inc()
 
-async def insert_audit(pg, env, meta: KafkaMeta):
+async def insert_audit(conn, env, meta: KafkaMeta):
     sql = text("""
       INSERT INTO audit_event (
         event_id, event_type, occurred_at,
@@ -47,75 +73,215 @@ async def insert_audit(pg, env, meta: KafkaMeta):
         :tenant_id, :schema_version, :payload,
         :kafka_topic, :kafka_partition, :kafka_offset
       )
-      ON CONFLICT (event_id) DO NOTHING
+      ON CONFLICT (event_id, occurred_at) DO NOTHING
     """)
-    async with pg.begin() as conn:
-        await conn.execute(sql, {
-            "event_id": str(env.event_id),
-            "event_type": env.event_type,
-            "occurred_at": env.occurred_at,
-            "producer": env.producer,
-            "correlation_id": str(env.correlation_id),
-            "causation_id": str(env.causation_id) if env.causation_id else None,
-            "actor_type": env.actor.type,
-            "actor_id": env.actor.id,
-            "actor_display": env.actor.display,
-            "tenant_id": env.tenant_id,
-            "schema_version": env.schema_version,
-            "payload": json.dumps(env.payload),
-            "kafka_topic": meta.topic,
-            "kafka_partition": meta.partition,
-            "kafka_offset": meta.offset,
-        })
+    await conn.execute(sql, {
+        "event_id": str(env.event_id),
+        "event_type": env.event_type,
+        "occurred_at": env.occurred_at,
+        "producer": env.producer,
+        "correlation_id": str(env.correlation_id),
+        "causation_id": str(env.causation_id) if env.causation_id else None,
+        "actor_type": env.actor.type,
+        "actor_id": env.actor.id,
+        "actor_display": env.actor.display,
+        "tenant_id": env.tenant_id,
+        "schema_version": env.schema_version,
+        "payload": json.dumps(env.payload),
+        "kafka_topic": meta.topic,
+        "kafka_partition": meta.partition,
+        "kafka_offset": meta.offset,
+    })
+
+async def insert_audit_many(conn, rows):
+    """
+    Bulk variant of insert_audit: one statement for the whole batch.
+    rows: list of (EventEnvelope, KafkaMeta).
+
+    The batch is shipped as a single JSONB array and expanded server-side with
+    jsonb_to_recordset, so statement size does not grow with the bind-parameter count.
+    """
+    if not rows:
+        return
+    sql = text("""
+      INSERT INTO audit_event (
+        event_id, event_type, occurred_at,
+        producer, correlation_id, causation_id,
+        actor_type, actor_id, actor_display,
+        tenant_id, schema_version, payload,
+        kafka_topic, kafka_partition, kafka_offset
+      )
+      SELECT
+        r.event_id, r.event_type, r.occurred_at,
+        r.producer, r.correlation_id, r.causation_id,
+        r.actor_type, r.actor_id, r.actor_display,
+        r.tenant_id, r.schema_version, r.payload,
+        r.kafka_topic, r.kafka_partition, r.kafka_offset
+      FROM jsonb_to_recordset(CAST(:rows AS jsonb)) AS r(
+        event_id uuid, event_type text, occurred_at timestamptz,
+        producer text, correlation_id uuid, causation_id uuid,
+        actor_type text, actor_id text, actor_display text,
+        tenant_id text, schema_version int, payload jsonb,
+        kafka_topic text, kafka_partition int, kafka_offset bigint
+      )
+      ON CONFLICT (event_id, occurred_at) DO NOTHING
+    """)
+    records = [{
+        "event_id": str(env.event_id),
+        "event_type": env.event_type,
+        "occurred_at": env.occurred_at.isoformat(),
+        "producer": env.producer,
+        "correlation_id": str(env.correlation_id),
+        "causation_id": str(env.causation_id) if env.causation_id else None,
+        "actor_type": env.actor.type,
+        "actor_id": env.actor.id,
+        "actor_display": env.actor.display,
+        "tenant_id": env.tenant_id,
+        "schema_version": env.schema_version,
+        "payload": env.payload,
+        "kafka_topic": meta.topic,
+        "kafka_partition": meta.partition,
+        "kafka_offset": meta.offset,
+    } for env, meta in rows]
+    await conn.execute(sql, {"rows": json.dumps(records)})
+
+async def write_event(pg, producer: AIOKafkaProducer, env, meta: KafkaMeta, raw: dict) -> None:
+    """
+    Ledger insert + audit insert in one transaction (one commit).
+    A failed audit insert rolls the ledger row back with it, then the event is DLQ'd.
+    Ledger/connection errors propagate so the offset is not committed.
+    """
+    async with pg.connect() as conn:
+        # idempotency ledger (audit should also be idempotent)
+        with METRICS.idempotency.time():
+            inserted = await mark_processed(conn, CONSUMER_GROUP, env.event_id, env.event_type, meta, cache=DEDUP_CACHE)
+        if not inserted:
+            METRICS.duplicate.inc()
+            await conn.rollback()
+            return
+        try:
+            with METRICS.apply.time():
+                await insert_audit(conn, env, meta)
+                await conn.commit()
+            if DEDUP_CACHE is not None:
+                DEDUP_CACHE.add(env.event_id)
+            METRICS.processed.inc()
+            return
+        except Exception as e:
+            await conn.rollback()
+            err = e
+    # audit is critical; DLQ then commit only after DLQ succeeds
+    await dlq(producer, meta, raw, err)
+
+async def process_message(pg, producer: AIOKafkaProducer, msg) -> None:
+    """
+    Per-message path (default mode). Caller commits after this returns.
+    """
+    meta = KafkaMeta(topic=msg.topic, partition=msg.partition, offset=msg.offset)
+    raw = msg.value
+
+    try:
+        with METRICS.parse.time():
+            env = parse_envelope(raw)
+    except Exception as e:
+        await dlq(producer, meta, raw, e)
+        return
+
+    await write_event(pg, producer, env, meta, raw)
+
+async def process_batch(pg, producer: AIOKafkaProducer, msgs) -> None:
+    """
+    Batched path: same validation/ledger/DLQ semantics as process_message,
+    but the ledger rows and all surviving audit rows are written with one
+    mark_processed_many + one insert_audit_many in a single transaction.
+    Caller commits offsets once after this returns.
+    """
+    with METRICS.parse.time():
+        results = parse_envelopes([m.value for m in msgs])
+    parsed = []
+    for msg, env in zip(msgs, results):
+        meta = KafkaMeta(topic=msg.topic, partition=msg.partition, offset=msg.offset)
+        if isinstance(env, Exception):
+            await dlq(producer, meta, msg.value, env)
+            continue
+        parsed.append((env, meta, msg.value))
+
+    if not parsed:
+        return
+
+    async with pg.connect() as conn:
+        with METRICS.idempotency.time():
+            new_ids = await mark_processed_many(
+                conn, CONSUMER_GROUP, [(env.event_id, env.event_type, meta) for env, meta, _ in parsed],
+                cache=DEDUP_CACHE,
+            )
+        pending = []
+        for env, meta, raw in parsed:
+            if env.event_id not in new_ids:
+                continue
+            new_ids.discard(env.event_id)  # in-batch duplicates only count once
+            pending.append((env, meta, raw))
+        METRICS.duplicate.inc(len(parsed) - len(pending))
+
+        if not pending:
+            await conn.rollback()
+            return
+        try:
+            with METRICS.apply.time():
+                await insert_audit_many(conn, [(env, meta) for env, meta, _ in pending])
+                await conn.commit()
+            if DEDUP_CACHE is not None:
+                DEDUP_CACHE.add_many(env.event_id for env, _, _ in pending)
+            METRICS.processed.inc(len(pending))
+            return
+        except Exception:
+            await conn.rollback()
+
+    # One bad row fails the whole statement (and rolls back the batch's ledger rows);
+    # replay per event so only the offending records go to the DLQ.
+    for env, meta, raw in pending:
+        await write_event(pg, producer, env, meta, raw)
+
+async def handle_batch(pg, producer: AIOKafkaProducer, msgs) -> None:
+    """Runtime handler: one partition's records, in offset order."""
+    if BATCH_MODE:
+        await process_batch(pg, producer, msgs)
+    else:
+        for msg in msgs:
+            await process_message(pg, producer, msg)
 
 async def main():
     if not POSTGRES_DSN:
         raise RuntimeError("POSTGRES_DSN is required")
 
     pg = create_async_engine(POSTGRES_DSN, pool_pre_ping=True)
+    producer = AIOKafkaProducer(bootstrap_servers=BOOTSTRAP)
 
-    consumer = AIOKafkaConsumer(
-        *TOPICS,
-        bootstrap_servers=BOOTSTRAP,
+    # fetch loop, batched commits, SIGTERM drain and revocation drain (components/runtime.py)
+    handler = lambda msgs: handle_batch(pg, producer, msgs)
+    runtime = ConsumerRuntime(
+        topics=TOPICS,
         group_id=CONSUMER_GROUP,
-        enable_auto_commit=False,
-        value_deserializer=lambda b: json.loads(b.decode("utf-8")),
-        auto_offset_reset="earliest",
+        handler=None if PARTITION_PARALLEL else handler,
+        dispatcher=partition_parallel(handler, queue_size=PARTITION_QUEUE_SIZE) if PARTITION_PARALLEL else None,
+        bootstrap_servers=BOOTSTRAP,
+        value_deserializer=METRICS.timed_decoder(codec.loads),
+        max_records=BATCH_MAX_RECORDS,
+        max_wait_ms=BATCH_MAX_WAIT_MS,
+        watermark_fastpath=WATERMARK_FASTPATH,
+        commit_timer=METRICS.commit,
     )
-    producer = AIOKafkaProducer(bootstrap_servers=BOOTSTRAP)
 
-    await consumer.start()
     await producer.start()
+    metrics_server = start_metrics_server()
+    lag_task = asyncio.create_task(METRICS.track_lag(runtime.consumer))
     try:
-        async for msg in consumer:
-            meta = KafkaMeta(topic=msg.topic, partition=msg.partition, offset=msg.offset)
-            raw = msg.value
-
-            try:
-                env = parse_envelope(raw)
-            except Exception as e:
-                await dlq(producer, meta, raw, e)
-                await consumer.commit()
-                continue
-
-            # idempotency ledger (audit should also be idempotent)
-            inserted = await try_mark_processed(pg, CONSUMER_GROUP, env.event_id, env.event_type, meta)
-            if not inserted:
-                await consumer.commit()
-                continue
-
-            try:
-                await insert_audit(pg, env, meta)
-                await consumer.commit()
-            except Exception as e:
-                # audit is critical; DLQ then commit only after DLQ succeeds
-                await dlq(producer, meta, raw, e)
-                await consumer.commit()
-
+        await runtime.run()
     finally:
-        await consumer.stop()
+        lag_task.cancel()
+        await stop_metrics_server(metrics_server)
         await producer.stop()
         await pg.dispose()
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
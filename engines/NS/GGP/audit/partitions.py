@@ -0,0 +1,206 @@
+# audit/partitions.py
+"""
+Partition maintenance for audit_event (monthly RANGE partitions on occurred_at, UTC).
+
+- pre-creates audit_event_pYYYY_MM for the current month and the next
+  AUDIT_PARTITION_MONTHS_AHEAD months, so inserts never land in the default partition
+- when AUDIT_RETENTION_MONTHS > 0, detaches every partition that ends before the
+  retention window and moves it to AUDIT_ARCHIVE_SCHEMA (still queryable, no longer
+  scanned or vacuumed with the live table; dump/drop it on your own schedule).
+  AUDIT_ARCHIVE_DROP=true drops it instead.
+- warns when audit_event_default holds rows (a timestamp outside every partition)
+- when the default partition already holds rows of a month being created (CREATE
+  ... PARTITION OF would fail its range check), the default is detached, the month
+  partition created, those rows moved into it and the default re-attached, all in
+  one transaction
+
+Uniqueness: the primary key is (event_id, occurred_at), because a partitioned
+table's unique keys must include the partition key. audit_event alone therefore
+does not stop the same event_id under two different occurred_at values; the
+audit consumer group's rows in the idempotency ledger (consumer_processed_event,
+keyed by (consumer_group, event_id)) are the global uniqueness guard: the audit
+writer marks the ledger in the same transaction as the insert. Within the
+ledger's retention (components/ledger_prune.py), that is.
+
+Idempotent; run daily (cron / k8s CronJob) from the audit image:
+  python -m audit.partitions
+
+Env:
+  POSTGRES_DSN                     (required)
+  AUDIT_PARTITION_MONTHS_AHEAD=3
+  AUDIT_RETENTION_MONTHS=0         0 => keep everything
+  AUDIT_ARCHIVE_SCHEMA=audit_archive
+  AUDIT_ARCHIVE_DROP=false
+  AUDIT_PARTITION_LOCK_TIMEOUT=5s  DDL gives up instead of queueing behind long readers
+                                   (integer with optional ms / s / min unit)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import re
+from datetime import date, datetime, timezone
+from typing import List
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+POSTGRES_DSN = os.getenv("POSTGRES_DSN")  # required
+MONTHS_AHEAD = int(os.getenv("AUDIT_PARTITION_MONTHS_AHEAD", "3"))
+RETENTION_MONTHS = int(os.getenv("AUDIT_RETENTION_MONTHS", "0"))
+ARCHIVE_SCHEMA = os.getenv("AUDIT_ARCHIVE_SCHEMA", "audit_archive")
+ARCHIVE_DROP = os.getenv("AUDIT_ARCHIVE_DROP", "false").strip().lower() in {"1", "true", "yes", "y", "on"}
+
+PARENT = "audit_event"
+DEFAULT = f"{PARENT}_default"
+_PARTITION_RE = re.compile(r"^audit_event_p(\d{4})_(\d{2})$")
+_LOCK_TIMEOUT_RE = re.compile(r"^\s*(\d+)\s*(ms|s|min)?\s*$")
+_LOCK_TIMEOUT_UNIT_MS = {None: 1, "ms": 1, "s": 1000, "min": 60000}
+
+
+def parse_lock_timeout_ms(value: str) -> int:
+    """'5s' / '500ms' / '1min' / '2000' -> milliseconds; ValueError otherwise."""
+    match = _LOCK_TIMEOUT_RE.match(value)
+    if match is None:
+        raise ValueError(f"invalid lock timeout {value!r} (expected e.g. 5s, 500ms, 1min)")
+    return int(match.group(1)) * _LOCK_TIMEOUT_UNIT_MS[match.group(2)]
+
+
+LOCK_TIMEOUT_MS = parse_lock_timeout_ms(os.getenv("AUDIT_PARTITION_LOCK_TIMEOUT", "5s"))
+
+# is_local => same as SET LOCAL, but the value is a bind parameter
+_SET_LOCK_TIMEOUT_SQL = text("SELECT set_config('lock_timeout', :value, true)")
+
+_LIST_PARTITIONS_SQL = text("""
+    SELECT c.relname
+    FROM pg_inherits i
+    JOIN pg_class c ON c.oid = i.inhrelid
+    JOIN pg_class p ON p.oid = i.inhparent
+    WHERE p.relname = :parent
+    ORDER BY c.relname
+""")
+
+
+def add_months(m: date, n: int) -> date:
+    y, mo = divmod(m.year * 12 + (m.month - 1) + n, 12)
+    return date(y, mo + 1, 1)
+
+
+def month_start(m: date) -> datetime:
+    return datetime(m.year, m.month, 1, tzinfo=timezone.utc)
+
+
+def partition_name(m: date) -> str:
+    return f"{PARENT}_p{m.year:04d}_{m.month:02d}"
+
+
+def partition_month(name: str):
+    match = _PARTITION_RE.match(name)
+    return date(int(match.group(1)), int(match.group(2)), 1) if match else None
+
+
+_DEFAULT_HAS_RANGE_SQL = text(f"""
+    SELECT EXISTS (SELECT 1 FROM {DEFAULT} WHERE occurred_at >= :lower AND occurred_at < :upper)
+""")
+
+_MOVE_FROM_DEFAULT_SQL = """
+    WITH moved AS (
+      DELETE FROM {default} WHERE occurred_at >= :lower AND occurred_at < :upper RETURNING *
+    )
+    INSERT INTO {name} SELECT * FROM moved
+"""
+
+
+async def set_lock_timeout(conn) -> None:
+    await conn.execute(_SET_LOCK_TIMEOUT_SQL, {"value": f"{LOCK_TIMEOUT_MS}ms"})
+
+
+async def list_partitions(conn) -> List[str]:
+    return list((await conn.execute(_LIST_PARTITIONS_SQL, {"parent": PARENT})).scalars())
+
+
+async def ensure_partitions(pg, *, today: date, months_ahead: int) -> List[str]:
+    """Create missing month partitions from today's month through +months_ahead."""
+    created = []
+    async with pg.begin() as conn:
+        await set_lock_timeout(conn)
+        existing = set(await list_partitions(conn))
+        has_default = DEFAULT in existing
+        first = date(today.year, today.month, 1)
+        for i in range(months_ahead + 1):
+            m = add_months(first, i)
+            name = partition_name(m)
+            if name in existing:
+                continue
+            bounds = {"lower": month_start(m), "upper": month_start(add_months(m, 1))}
+            # names/bounds are generated here, never user input
+            create = (
+                f"CREATE TABLE {name} PARTITION OF {PARENT} "
+                f"FOR VALUES FROM ('{m.isoformat()} 00:00:00+00') TO ('{add_months(m, 1).isoformat()} 00:00:00+00')"
+            )
+            if has_default and (await conn.execute(_DEFAULT_HAS_RANGE_SQL, bounds)).scalar():
+                # the default holds rows of this month: the new partition's range check would fail
+                await conn.execute(text(f"ALTER TABLE {PARENT} DETACH PARTITION {DEFAULT}"))
+                await conn.execute(text(create))
+                await conn.execute(text(_MOVE_FROM_DEFAULT_SQL.format(default=DEFAULT, name=name)), bounds)
+                await conn.execute(text(f"ALTER TABLE {PARENT} ATTACH PARTITION {DEFAULT} DEFAULT"))
+            else:
+                await conn.execute(text(create))
+            created.append(name)
+    return created
+
+
+async def archive_partitions(pg, *, today: date, retention_months: int, schema: str, drop: bool) -> List[str]:
+    """Detach (and archive or drop) partitions that end before the retention window."""
+    if retention_months <= 0:
+        return []
+    cutoff = add_months(date(today.year, today.month, 1), -retention_months)
+    async with pg.connect() as conn:
+        names = await list_partitions(conn)
+    expired = [n for n in names if (m := partition_month(n)) is not None and add_months(m, 1) <= cutoff]
+
+    done = []
+    for name in expired:
+        # one transaction per partition keeps the parent lock short
+        async with pg.begin() as conn:
+            await set_lock_timeout(conn)
+            await conn.execute(text(f"ALTER TABLE {PARENT} DETACH PARTITION {name}"))
+            if drop:
+                await conn.execute(text(f"DROP TABLE {name}"))
+            else:
+                await conn.execute(text(f'CREATE SCHEMA IF NOT EXISTS "{schema}"'))
+                await conn.execute(text(f'ALTER TABLE {name} SET SCHEMA "{schema}"'))
+        done.append(name)
+    return done
+
+
+async def default_has_rows(pg) -> bool:
+    async with pg.connect() as conn:
+        return bool((await conn.execute(text(f"SELECT EXISTS (SELECT 1 FROM {DEFAULT})"))).scalar())
+
+
+async def main() -> None:
+    if not POSTGRES_DSN:
+        raise RuntimeError("POSTGRES_DSN is required")
+
+    pg = create_async_engine(POSTGRES_DSN, pool_pre_ping=True)
+    today = datetime.now(timezone.utc).date()
+    try:
+        created = await ensure_partitions(pg, today=today, months_ahead=MONTHS_AHEAD)
+        print(f"[audit.partitions] created: {', '.join(created) or 'none'}")
+
+        archived = await archive_partitions(
+            pg, today=today, retention_months=RETENTION_MONTHS, schema=ARCHIVE_SCHEMA, drop=ARCHIVE_DROP,
+        )
+        action = "dropped" if ARCHIVE_DROP else f"moved to {ARCHIVE_SCHEMA}"
+        print(f"[audit.partitions] detached ({action}): {', '.join(archived) or 'none'}")
+
+        if await default_has_rows(pg):
+            print(f"[audit.partitions] WARNING: {DEFAULT} has rows outside every month partition")
+    finally:
+        await pg.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
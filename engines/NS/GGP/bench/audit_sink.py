@@ -0,0 +1,144 @@
+# bench/audit_sink.py
+"""
+Audit sink throughput: per-message loop vs batched mode.
+
+Drives audit.main.process_message (ledger insert + audit insert per event, in one
+transaction) and audit.main.process_batch (mark_processed_many + insert_audit_many,
+one transaction per batch) against a real Postgres migrated to head: the writers
+use ON CONFLICT (event_id, occurred_at), which needs the partitioned audit_event
+from migration 0003. Kafka is not involved; records are synthesized in-process so
+only the sink cost is measured.
+
+Usage:
+  alembic -c db/alembic.ini upgrade head
+  POSTGRES_DSN=postgresql+asyncpg://... python -m bench.audit_sink
+
+Env:
+  BENCH_EVENTS=5000        events per mode
+  BENCH_BATCH_SIZE=500     records per process_batch call
+
+Rows written by the run are deleted afterwards (ledger rows use a throwaway
+consumer group, audit rows are removed by event_id).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from collections import namedtuple
+from datetime import datetime, timezone
+from uuid import uuid4
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+import audit.main as audit_main
+
+Record = namedtuple("Record", ["topic", "partition", "offset", "value"])
+
+EVENTS = int(os.getenv("BENCH_EVENTS", "5000"))
+BATCH_SIZE = int(os.getenv("BENCH_BATCH_SIZE", "500"))
+
+
+class _NullProducer:
+    """Counts DLQ sends instead of publishing them."""
+
+    def __init__(self) -> None:
+        self.sent = 0
+
+    async def send_and_wait(self, topic, value, **_kw):
+        self.sent += 1
+
+
+def make_records(n: int) -> list[Record]:
+    out = []
+    for i in range(n):
+        sop_id = str(uuid4())
+        out.append(Record(
+            topic="ggp.core.sop.created",
+            partition=0,
+            offset=i,
+            value={
+                "event_id": str(uuid4()),
+                "event_type": "ggp.core.sop.created",
+                "occurred_at": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+                "producer": "bench@local",
+                "correlation_id": str(uuid4()),
+                "causation_id": None,
+                "actor": {"type": "service", "id": "bench"},
+                "tenant_id": None,
+                "schema_version": 1,
+                "payload": {"sop_id": sop_id, "title": f"Bench SOP {i}", "tags": ["bench"]},
+            },
+        ))
+    return out
+
+
+async def run_serial(pg, producer, records) -> float:
+    t0 = time.perf_counter()
+    for rec in records:
+        await audit_main.process_message(pg, producer, rec)
+    return time.perf_counter() - t0
+
+
+async def run_batched(pg, producer, records) -> float:
+    t0 = time.perf_counter()
+    for i in range(0, len(records), BATCH_SIZE):
+        await audit_main.process_batch(pg, producer, records[i:i + BATCH_SIZE])
+    return time.perf_counter() - t0
+
+
+_SCHEMA_SQL = text("""
+    SELECT EXISTS (
+      SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid
+      WHERE c.relname = 'audit_event'
+    )
+""")
+
+
+async def check_schema(pg) -> None:
+    async with pg.connect() as conn:
+        if not (await conn.execute(_SCHEMA_SQL)).scalar():
+            raise RuntimeError("audit_event is not partitioned: run `alembic -c db/alembic.ini upgrade head` (needs migration 0003)")
+
+
+async def cleanup(pg, records) -> None:
+    ids = [r.value["event_id"] for r in records]
+    async with pg.begin() as conn:
+        await conn.execute(text("DELETE FROM audit_event WHERE event_id = ANY(CAST(:ids AS uuid[]))"), {"ids": ids})
+        await conn.execute(
+            text("DELETE FROM consumer_processed_event WHERE consumer_group = :cg"),
+            {"cg": audit_main.CONSUMER_GROUP},
+        )
+
+
+async def main() -> None:
+    dsn = os.getenv("POSTGRES_DSN")
+    if not dsn:
+        raise RuntimeError("POSTGRES_DSN is required")
+
+    # isolate ledger rows from the real audit consumer group
+    audit_main.CONSUMER_GROUP = f"bench-audit-{uuid4()}"
+    pg = create_async_engine(dsn, pool_pre_ping=True)
+    producer = _NullProducer()
+
+    serial_records = make_records(EVENTS)
+    batch_records = make_records(EVENTS)
+    try:
+        await check_schema(pg)
+        serial_s = await run_serial(pg, producer, serial_records)
+        batch_s = await run_batched(pg, producer, batch_records)
+    finally:
+        await cleanup(pg, serial_records + batch_records)
+        await pg.dispose()
+
+    serial_eps = EVENTS / serial_s
+    batch_eps = EVENTS / batch_s
+    print(f"[bench.audit_sink] events={EVENTS} batch_size={BATCH_SIZE} dlq={producer.sent}")
+    print(f"  per-message : {serial_s:8.2f}s  {serial_eps:10.0f} events/s")
+    print(f"  batched     : {batch_s:8.2f}s  {batch_eps:10.0f} events/s  ({batch_eps / serial_eps:.1f}x)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,156 @@
+# bench/correlation_middleware.py
+"""
+Correlation middleware benchmark: previous BaseHTTPMiddleware version vs the pure ASGI one.
+
+The ASGI app is driven in-process (no server, no sockets), so the numbers isolate
+middleware overhead per request:
+  none     : bare Starlette app
+  baseline : previous CorrelationIdMiddleware (BaseHTTPMiddleware.dispatch / call_next)
+  current  : middleware.correlation.CorrelationIdMiddleware (pure ASGI + ContextVar)
+
+Half of the requests carry an X-Correlation-Id header, half get a generated one.
+
+  python -m bench.correlation_middleware
+
+Env:
+  BENCH_REQUESTS=20000   requests per round
+  BENCH_CONCURRENCY=50   requests in flight (asyncio.gather chunks)
+  BENCH_ROUNDS=5         best-of rounds
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from typing import Callable
+from uuid import uuid4
+
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+from core.context import current_correlation_id
+from middleware.correlation import (
+    CAUSATION_HEADER,
+    CORRELATION_HEADER,
+    CorrelationIdMiddleware,
+    get_correlation_context,
+)
+
+REQUESTS = int(os.getenv("BENCH_REQUESTS", "20000"))
+CONCURRENCY = int(os.getenv("BENCH_CONCURRENCY", "50"))
+ROUNDS = int(os.getenv("BENCH_ROUNDS", "5"))
+
+
+# --- baseline (verbatim copy of the previous implementation) ---
+
+class _BaselineCorrelationIdMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next: Callable):
+        ctx = get_correlation_context(request)
+        request.state.correlation = ctx
+
+        response: Response = await call_next(request)
+
+        response.headers[CORRELATION_HEADER] = str(ctx.correlation_id)
+        if ctx.causation_id:
+            response.headers[CAUSATION_HEADER] = str(ctx.causation_id)
+
+        return response
+
+
+# --- workload ---
+
+async def endpoint(request: Request):
+    ctx = request.state.correlation if hasattr(request.state, "correlation") else None
+    return JSONResponse({"ok": True, "cid": str(ctx.correlation_id) if ctx else str(current_correlation_id())})
+
+
+def make_app(middleware) -> Starlette:
+    return Starlette(routes=[Route("/sops", endpoint)], middleware=middleware)
+
+
+def make_scopes(n: int) -> list:
+    scopes = []
+    for i in range(n):
+        headers = [(b"host", b"bench"), (b"accept", b"application/json")]
+        if i % 2 == 0:
+            headers.append((b"x-correlation-id", str(uuid4()).encode("latin-1")))
+        scopes.append({
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": "/sops",
+            "raw_path": b"/sops",
+            "query_string": b"",
+            "root_path": "",
+            "headers": headers,
+            "client": ("127.0.0.1", 50000),
+            "server": ("bench", 80),
+        })
+    return scopes
+
+
+async def call(app, scope) -> None:
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    await app(dict(scope), receive, send)
+
+
+async def run(app, scopes) -> float:
+    t0 = time.perf_counter()
+    for i in range(0, len(scopes), CONCURRENCY):
+        await asyncio.gather(*(call(app, s) for s in scopes[i:i + CONCURRENCY]))
+    return time.perf_counter() - t0
+
+
+async def check_headers(app, scope) -> dict:
+    sent = {}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            sent.update({k.decode(): v.decode() for k, v in message["headers"]})
+
+    await app(dict(scope), receive, send)
+    return sent
+
+
+async def main_async() -> None:
+    scopes = make_scopes(REQUESTS)
+    apps = {
+        "none    ": make_app([]),
+        "baseline": make_app([Middleware(_BaselineCorrelationIdMiddleware)]),
+        "current ": make_app([Middleware(CorrelationIdMiddleware)]),
+    }
+
+    # same response contract: the client's id is echoed back
+    for name in ("baseline", "current "):
+        headers = await check_headers(apps[name], scopes[0])
+        assert headers["x-correlation-id"] == dict(scopes[0]["headers"])[b"x-correlation-id"].decode(), name
+
+    print(f"[bench.correlation_middleware] requests={REQUESTS} concurrency={CONCURRENCY} rounds={ROUNDS}")
+    for name, app in apps.items():
+        best = float("inf")
+        for _ in range(ROUNDS):
+            best = min(best, await run(app, scopes))
+        print(f"  {name}: {best * 1e6 / REQUESTS:7.2f} us/request  {REQUESTS / best:10.0f} requests/s")
+
+
+def main() -> None:
+    asyncio.run(main_async())
+
+
+if __name__ == "__main__":
+    main()
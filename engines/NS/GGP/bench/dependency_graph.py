@@ -0,0 +1,187 @@
+# bench/dependency_graph.py
+"""
+Dependency graph benchmark on synthetic governance graphs.
+
+Graph (seeded, same graph every run): BENCH_NODES nodes, BENCH_COMPONENT_SHARE
+of them components in BENCH_LAYERS layers (each depends on 0-2 components of
+earlier layers), the rest SOPs depending on 2-4 components and, sometimes, on
+an earlier SOP.
+
+Reported:
+  build     : DependencyGraph.from_edges (one Kahn pass) vs add_dependency one
+              edge at a time in shuffled order (incremental ranks)
+  impact    : impact(component) latency p50/p99 and affected-set size, vs a full
+              recompute (BFS + Kahn over the whole graph) for the same query
+  churn     : add_dependency / remove_dependency latency p50/p99 for random
+              component->component and SOP->component edges, cycles rejected
+
+Pure Python, no services needed:
+  python -m bench.dependency_graph
+
+Env:
+  BENCH_NODES=100000
+  BENCH_COMPONENT_SHARE=0.2
+  BENCH_LAYERS=4
+  BENCH_QUERIES=2000
+  BENCH_CHURN=20000
+  BENCH_BASELINE_QUERIES=20   full-recompute queries (slow)
+  BENCH_SEED=1
+"""
+
+from __future__ import annotations
+
+import os
+import random
+import time
+from collections import deque
+from typing import Dict, List, Set, Tuple
+
+from dependency_graph.graph import COMPONENT, SOP, CycleError, DependencyGraph
+
+NODES = int(os.getenv("BENCH_NODES", "100000"))
+COMPONENT_SHARE = float(os.getenv("BENCH_COMPONENT_SHARE", "0.2"))
+LAYERS = int(os.getenv("BENCH_LAYERS", "4"))
+QUERIES = int(os.getenv("BENCH_QUERIES", "2000"))
+CHURN = int(os.getenv("BENCH_CHURN", "20000"))
+BASELINE_QUERIES = int(os.getenv("BENCH_BASELINE_QUERIES", "20"))
+SEED = int(os.getenv("BENCH_SEED", "1"))
+
+
+def make_graph(rng: random.Random) -> Tuple[List[Tuple[str, str]], List[Tuple[str, str]], List[List[str]]]:
+    """Returns (nodes, edges as (dependent, dependency), component layers)."""
+    n_components = max(LAYERS, int(NODES * COMPONENT_SHARE))
+    layers: List[List[str]] = [[] for _ in range(LAYERS)]
+    nodes: List[Tuple[str, str]] = []
+    edges: List[Tuple[str, str]] = []
+    for i in range(n_components):
+        layer = min(LAYERS - 1, int(i * LAYERS / n_components))
+        cid = f"cmp-{i}"
+        layers[layer].append(cid)
+        nodes.append((cid, COMPONENT))
+        if layer:
+            earlier = layers[rng.randrange(layer)]
+            for _ in range(rng.randint(0, 2)):
+                edges.append((cid, earlier[rng.randrange(len(earlier))]))
+
+    components = [c for layer in layers for c in layer]
+    sops: List[str] = []
+    for i in range(NODES - n_components):
+        sid = f"sop-{i}"
+        nodes.append((sid, SOP))
+        for _ in range(rng.randint(2, 4)):
+            edges.append((sid, components[rng.randrange(len(components))]))
+        if sops and rng.random() < 0.1:
+            edges.append((sid, sops[rng.randrange(len(sops))]))
+        sops.append(sid)
+    return nodes, edges, layers
+
+
+def percentile(samples: List[float], q: float) -> float:
+    s = sorted(samples)
+    return s[min(len(s) - 1, int(len(s) * q))] if s else 0.0
+
+
+# --- baseline: recompute the whole topological order per query ---
+
+def full_recompute_impact(g: DependencyGraph, changed: str) -> List[str]:
+    dependents = g._dependents
+    affected: Set[str] = set()
+    stack = list(dependents[changed])
+    while stack:
+        node = stack.pop()
+        if node not in affected:
+            affected.add(node)
+            stack.extend(dependents[node])
+    indegree: Dict[str, int] = {n: len(d) for n, d in g._dependencies.items()}
+    queue = deque(n for n, d in indegree.items() if d == 0)
+    order = []
+    while queue:
+        node = queue.popleft()
+        if node in affected:
+            order.append(node)
+        for nxt in dependents[node]:
+            indegree[nxt] -= 1
+            if indegree[nxt] == 0:
+                queue.append(nxt)
+    return order
+
+
+def main() -> None:
+    rng = random.Random(SEED)
+    nodes, edges, layers = make_graph(rng)
+    print(f"[bench.dependency_graph] nodes={len(nodes)} edges={len(edges)} layers={LAYERS} seed={SEED}")
+
+    t0 = time.perf_counter()
+    g = DependencyGraph.from_edges(nodes, edges)
+    bulk_s = time.perf_counter() - t0
+
+    shuffled = list(edges)
+    rng.shuffle(shuffled)
+    t0 = time.perf_counter()
+    inc = DependencyGraph()
+    for node, kind in nodes:
+        inc.add_node(node, kind)
+    for dependent, dependency in shuffled:
+        inc.add_dependency(dependent, dependency)
+    inc_s = time.perf_counter() - t0
+    print(f"  build     : from_edges {bulk_s * 1e3:8.1f}ms   incremental (shuffled) {inc_s * 1e3:8.1f}ms")
+
+    components = [c for layer in layers for c in layer]
+    targets = [components[rng.randrange(len(components))] for _ in range(QUERIES)]
+    samples, sizes = [], []
+    for c in targets:
+        t0 = time.perf_counter()
+        res = g.impact(c)
+        samples.append(time.perf_counter() - t0)
+        sizes.append(len(res.affected))
+    print(
+        f"  impact    : p50={percentile(samples, 0.5) * 1e6:8.1f}us  p99={percentile(samples, 0.99) * 1e6:8.1f}us  "
+        f"affected p50={int(percentile(sizes, 0.5))} p99={int(percentile(sizes, 0.99))} max={max(sizes)}"
+    )
+    leaf_targets = layers[-1]
+    leaf_samples = []
+    for _ in range(QUERIES):
+        c = leaf_targets[rng.randrange(len(leaf_targets))]
+        t0 = time.perf_counter()
+        g.impact(c)
+        leaf_samples.append(time.perf_counter() - t0)
+    print(f"  impact    : last-layer components p50={percentile(leaf_samples, 0.5) * 1e6:8.1f}us  p99={percentile(leaf_samples, 0.99) * 1e6:8.1f}us")
+
+    base = []
+    for c in targets[:BASELINE_QUERIES]:
+        t0 = time.perf_counter()
+        order = full_recompute_impact(g, c)
+        base.append(time.perf_counter() - t0)
+        assert set(order) == g.impact(c).affected
+    print(f"  baseline  : full recompute per query p50={percentile(base, 0.5) * 1e3:8.1f}ms")
+
+    sop_ids = [n for n, k in nodes if k == SOP]
+    add_s, remove_s, cycles = [], [], 0
+    for i in range(CHURN):
+        if i % 2:
+            a, b = components[rng.randrange(len(components))], components[rng.randrange(len(components))]
+        else:
+            a, b = sop_ids[rng.randrange(len(sop_ids))], components[rng.randrange(len(components))]
+        t0 = time.perf_counter()
+        try:
+            added = g.add_dependency(a, b)
+        except CycleError:
+            cycles += 1
+            added = False
+        add_s.append(time.perf_counter() - t0)
+        if added and rng.random() < 0.5:
+            t0 = time.perf_counter()
+            g.remove_dependency(a, b)
+            remove_s.append(time.perf_counter() - t0)
+    print(
+        f"  churn     : add p50={percentile(add_s, 0.5) * 1e6:6.1f}us p99={percentile(add_s, 0.99) * 1e6:8.1f}us  "
+        f"remove p50={percentile(remove_s, 0.5) * 1e6:6.1f}us  cycles rejected={cycles}/{CHURN}"
+    )
+
+    t0 = time.perf_counter()
+    res = g.impact(targets[0])
+    print(f"  after churn: impact({targets[0]}) affected={len(res.affected)} in {(time.perf_counter() - t0) * 1e6:.1f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+# bench/envelope_decode.py
+"""
+Envelope decode micro-benchmark: previous decode path vs current core.events/core.codec.
+
+baseline : json.loads(b.decode()) + the original parse_envelope (set diff,
+           str.replace + fromisoformat, fresh Actor per event, non-slotted dataclasses)
+current  : core.codec.loads (orjson/msgspec when installed) + core.events.parse_envelope
+batch    : core.codec.loads + core.events.parse_envelopes per BENCH_BATCH_SIZE chunk
+
+Pure Python, no services needed:
+  python -m bench.envelope_decode
+
+Env:
+  BENCH_EVENTS=20000   events per round
+  BENCH_ROUNDS=5       best-of rounds
+  BENCH_BATCH_SIZE=500 records per parse_envelopes call (consumer poll size)
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+from uuid import UUID, uuid4
+
+from core import codec
+from core.events import parse_envelope, parse_envelopes
+
+EVENTS = int(os.getenv("BENCH_EVENTS", "20000"))
+ROUNDS = int(os.getenv("BENCH_ROUNDS", "5"))
+BATCH_SIZE = int(os.getenv("BENCH_BATCH_SIZE", "500"))
+
+
+# --- baseline (verbatim copy of the previous implementation) ---
+
+@dataclass(frozen=True)
+class _Actor:
+    type: str
+    id: str
+    display: Optional[str] = None
+
+@dataclass(frozen=True)
+class _EventEnvelope:
+    event_id: UUID
+    event_type: str
+    occurred_at: datetime
+    producer: str
+    correlation_id: UUID
+    causation_id: Optional[UUID]
+    actor: _Actor
+    tenant_id: Optional[str]
+    schema_version: int
+    payload: Dict[str, Any]
+
+_REQUIRED_TOP_LEVEL = {
+    "event_id", "event_type", "occurred_at", "producer",
+    "correlation_id", "schema_version", "payload", "actor"
+}
+
+def _baseline_parse(obj: Dict[str, Any]) -> _EventEnvelope:
+    missing = _REQUIRED_TOP_LEVEL - set(obj.keys())
+    if missing:
+        raise ValueError(f"Missing envelope fields: {sorted(missing)}")
+    actor = obj["actor"]
+    if not isinstance(actor, dict) or "type" not in actor or "id" not in actor:
+        raise ValueError("Invalid actor shape")
+    occurred_at = datetime.fromisoformat(obj["occurred_at"].replace("Z", "+00:00"))
+    return _EventEnvelope(
+        event_id=UUID(obj["event_id"]),
+        event_type=str(obj["event_type"]),
+        occurred_at=occurred_at,
+        producer=str(obj["producer"]),
+        correlation_id=UUID(obj["correlation_id"]),
+        causation_id=UUID(obj["causation_id"]) if obj.get("causation_id") else None,
+        actor=_Actor(type=str(actor["type"]), id=str(actor["id"]), display=actor.get("display")),
+        tenant_id=obj.get("tenant_id"),
+        schema_version=int(obj["schema_version"]),
+        payload=obj["payload"],
+    )
+
+
+# --- workload ---
+
+def make_messages(n: int) -> list[bytes]:
+    actors = [{"type": "user", "id": f"user-{i}", "display": f"User {i}"} for i in range(20)]
+    actors.append({"type": "service", "id": "ggp-api"})
+    out = []
+    for i in range(n):
+        sop_id = str(uuid4())
+        published = i % 3 != 0
+        env = {
+            "event_id": str(uuid4()),
+            "event_type": "ggp.core.sop.version_published" if published else "ggp.core.sop.created",
+            "occurred_at": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+            "producer": "ggp-api@prod",
+            "correlation_id": str(uuid4()),
+            "causation_id": str(uuid4()) if published else None,
+            "actor": actors[i % len(actors)],
+            "tenant_id": None,
+            "schema_version": 1,
+            "payload": (
+                {"sop_id": sop_id, "version": i % 7 + 1, "content_hash": "sha256:" + "ab" * 32,
+                 "content": {"clauses": [{"id": f"c{j}", "text": "Lorem ipsum " * 8} for j in range(6)]}}
+                if published else
+                {"sop_id": sop_id, "title": f"SOP {i}", "status": "draft", "tags": ["finance", "ops"]}
+            ),
+        }
+        out.append(json.dumps(env).encode("utf-8"))
+    return out
+
+
+def best_of(fn, msgs) -> float:
+    best = float("inf")
+    for _ in range(ROUNDS):
+        t0 = time.perf_counter()
+        fn(msgs)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def run_baseline(msgs):
+    for b in msgs:
+        _baseline_parse(json.loads(b.decode("utf-8")))
+
+
+def run_baseline_batch(msgs):
+    for i in range(0, len(msgs), BATCH_SIZE):
+        objs = [json.loads(b.decode("utf-8")) for b in msgs[i:i + BATCH_SIZE]]
+        for o in objs:
+            _baseline_parse(o)
+
+
+def run_current(msgs):
+    loads = codec.loads
+    for b in msgs:
+        parse_envelope(loads(b))
+
+
+def run_batch(msgs):
+    loads = codec.loads
+    for i in range(0, len(msgs), BATCH_SIZE):
+        parse_envelopes([loads(b) for b in msgs[i:i + BATCH_SIZE]])
+
+
+def run_parse_only_baseline(objs):
+    for o in objs:
+        _baseline_parse(o)
+
+
+def run_parse_only_current(objs):
+    for o in objs:
+        parse_envelope(o)
+
+
+def main() -> None:
+    msgs = make_messages(EVENTS)
+    objs = [json.loads(b) for b in msgs]
+
+    # same validation outcome on every record
+    for o in objs:
+        a, b = _baseline_parse(o), parse_envelope(o)
+        assert (a.event_id, a.occurred_at, a.actor.id, a.causation_id) == (b.event_id, b.occurred_at, b.actor.id, b.causation_id)
+
+    rows = [
+        ("parse only  baseline", best_of(run_parse_only_baseline, objs)),
+        ("parse only  current ", best_of(run_parse_only_current, objs)),
+        ("decode+parse baseline", best_of(run_baseline, msgs)),
+        ("decode+parse current ", best_of(run_current, msgs)),
+        # batch rows keep a whole poll's decoded values alive, as aiokafka does
+        ("poll batch  baseline", best_of(run_baseline_batch, msgs)),
+        ("poll batch  current ", best_of(run_batch, msgs)),
+    ]
+    print(f"[bench.envelope_decode] events={EVENTS} rounds={ROUNDS} json_backend={codec.BACKEND}")
+    for name, secs in rows:
+        print(f"  {name}: {secs * 1e6 / EVENTS:7.2f} us/event  {EVENTS / secs:10.0f} events/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+# bench/envelope_encode.py
+"""
+Envelope encode micro-benchmark: previous emit path vs current components.kafka path.
+
+baseline : asdict(EventEnvelope(..., actor=asdict(actor))) + json.dumps(separators=..., ensure_ascii=False)
+current  : build_envelope (shallow dict) + EnvelopeEncoder.encode (pre-encoded producer constants)
+
+Both paths must produce identical bytes; the benchmark asserts it before timing.
+No broker needed:
+  python -m bench.envelope_encode
+
+Env:
+  BENCH_EVENTS=20000   events per round
+  BENCH_ROUNDS=5       best-of rounds
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import time
+from dataclasses import asdict
+from uuid import uuid4
+
+from components.kafka import (
+    Actor,
+    EnvelopeEncoder,
+    EventEnvelope,
+    build_envelope,
+    utc_now_iso,
+)
+
+EVENTS = int(os.getenv("BENCH_EVENTS", "20000"))
+ROUNDS = int(os.getenv("BENCH_ROUNDS", "5"))
+PRODUCER = "ggp-api@bench"
+
+
+def _baseline_emit_bytes(*, event_type, payload, actor, correlation_id, event_id, occurred_at) -> bytes:
+    # verbatim shape of the previous build_envelope + json_dumps
+    env = EventEnvelope(
+        event_id=str(event_id),
+        event_type=event_type,
+        occurred_at=occurred_at,
+        producer=PRODUCER,
+        correlation_id=str(correlation_id),
+        causation_id=None,
+        actor=asdict(actor),
+        tenant_id=None,
+        schema_version=1,
+        payload=payload,
+    )
+    return json.dumps(asdict(env), separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def make_inputs(n: int) -> list[dict]:
+    actors = [Actor(type="user", id=f"user-{i}", display=f"User {i}") for i in range(20)]
+    out = []
+    for i in range(n):
+        out.append({
+            "event_type": "ggp.core.sop.version_published",
+            "payload": {
+                "sop_id": str(uuid4()),
+                "version": i % 7 + 1,
+                "content_hash": "sha256:" + "ab" * 32,
+                "content": {"clauses": [{"id": f"c{j}", "text": "Lorem ipsum " * 8} for j in range(6)]},
+            },
+            "actor": actors[i % len(actors)],
+            "correlation_id": uuid4(),
+            "event_id": uuid4(),
+            "occurred_at": utc_now_iso(),
+        })
+    return out
+
+
+def run_baseline(inputs):
+    for kw in inputs:
+        _baseline_emit_bytes(**kw)
+
+
+def run_current(inputs):
+    encode = EnvelopeEncoder(producer=PRODUCER, schema_version=1).encode
+    for kw in inputs:
+        encode(build_envelope(producer=PRODUCER, schema_version=1, **kw))
+
+
+def best_of(fn, inputs) -> float:
+    best = float("inf")
+    for _ in range(ROUNDS):
+        t0 = time.perf_counter()
+        fn(inputs)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main() -> None:
+    inputs = make_inputs(EVENTS)
+    encoder = EnvelopeEncoder(producer=PRODUCER, schema_version=1)
+    for kw in inputs[:100]:
+        assert encoder.encode(build_envelope(producer=PRODUCER, schema_version=1, **kw)) == _baseline_emit_bytes(**kw)
+
+    base = best_of(run_baseline, inputs)
+    cur = best_of(run_current, inputs)
+    print(f"[bench.envelope_encode] events={EVENTS} rounds={ROUNDS}")
+    print(f"  baseline : {base * 1e6 / EVENTS:7.2f} us/event  {EVENTS / base:10.0f} events/s")
+    print(f"  current  : {cur * 1e6 / EVENTS:7.2f} us/event  {EVENTS / cur:10.0f} events/s  ({base / cur:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+# bench/graph_snapshot.py
+"""
+Dependency graph startup: build from rows vs mmap a snapshot.
+
+Uses the bench.dependency_graph synthetic graph (same env knobs: BENCH_NODES,
+BENCH_COMPONENT_SHARE, BENCH_LAYERS, BENCH_SEED). The parent writes a snapshot
+to a temp dir, then each mode runs in a fresh child process so startup time and
+RSS are measured from a clean interpreter:
+
+  rows      : DependencyGraph.from_edges over the (node, kind) / edge rows, as a
+              process rebuilding from Postgres would (rows already in memory:
+              the query round trip is not counted)
+  snapshot  : load_snapshot (mmap + hash verify), then impact queries
+  snapshot-noverify : same without hash verification
+  to_graph  : load_snapshot(...).to_graph(), for processes that mutate the graph
+
+Reported per mode: startup ms, RSS growth (VmRSS) split into anonymous (private
+to the process) and file-backed (page cache, shared by every process mapping
+the same snapshot), and impact() p50 on random components.
+
+  python -m bench.graph_snapshot
+
+Env:
+  BENCH_QUERIES=2000
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, Iterator
+
+from bench.dependency_graph import SEED, make_graph, percentile
+from dependency_graph.graph import COMPONENT, DependencyGraph
+from dependency_graph.snapshot import load_snapshot, write_snapshot
+
+QUERIES = int(os.getenv("BENCH_QUERIES", "2000"))
+MODES = ("rows", "snapshot", "snapshot-noverify", "to_graph")
+
+
+def _rss_kb() -> Dict[str, int]:
+    out = {}
+    with open("/proc/self/status") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if key in ("VmRSS", "RssAnon", "RssFile"):
+                out[key] = int(value.split()[0])
+    return out
+
+
+def child(mode: str, path: str) -> None:
+    rng = random.Random(SEED)
+    if mode == "rows":
+        nodes, edges, _ = make_graph(rng)
+    before = _rss_kb()
+    t0 = time.perf_counter()
+    if mode == "rows":
+        g = DependencyGraph.from_edges(nodes, edges)
+    elif mode == "to_graph":
+        g = load_snapshot(path).to_graph()
+    else:
+        g = load_snapshot(path, verify=mode == "snapshot")
+    startup_s = time.perf_counter() - t0
+
+    components = list(_component_ids(g))
+    samples = []
+    for _ in range(QUERIES):
+        c = components[rng.randrange(len(components))]
+        t1 = time.perf_counter()
+        g.impact(c)
+        samples.append(time.perf_counter() - t1)
+    after = _rss_kb()
+    print(json.dumps({
+        "startup_ms": startup_s * 1e3,
+        "rss_mb": {k: (after[k] - before.get(k, 0)) / 1024 for k in after},
+        "impact_p50_us": percentile(samples, 0.5) * 1e6,
+        "impact_p99_us": percentile(samples, 0.99) * 1e6,
+    }))
+
+
+def _component_ids(g) -> Iterator[str]:
+    # bench.dependency_graph names components cmp-0..cmp-N
+    i = 0
+    while f"cmp-{i}" in g:
+        yield f"cmp-{i}"
+        i += 1
+
+
+def main() -> None:
+    rng = random.Random(SEED)
+    nodes, edges, _ = make_graph(rng)
+    g = DependencyGraph.from_edges(nodes, edges)
+    with tempfile.TemporaryDirectory() as tmp:
+        t0 = time.perf_counter()
+        path = write_snapshot(g, tmp)
+        write_s = time.perf_counter() - t0
+        size = os.path.getsize(path)
+        print(
+            f"[bench.graph_snapshot] nodes={len(g)} edges={g.edge_count} seed={SEED}  "
+            f"snapshot {size / 2**20:.1f}MiB written in {write_s * 1e3:.0f}ms ({os.path.basename(path)})"
+        )
+
+        snap = load_snapshot(path)
+        for c in [n for n, k in nodes if k == COMPONENT][:50]:
+            assert snap.impact(c).affected == g.impact(c).affected, c
+        snap.close()
+
+        for mode in MODES:
+            out = subprocess.run(
+                [sys.executable, "-m", "bench.graph_snapshot", "--child", mode, path],
+                check=True, capture_output=True, text=True,
+            ).stdout
+            r = json.loads(out.strip().splitlines()[-1])
+            rss = r["rss_mb"]
+            print(
+                f"  {mode:18s}: startup {r['startup_ms']:8.1f}ms  "
+                f"rss +{rss.get('VmRSS', 0):6.1f}MB (anon +{rss.get('RssAnon', 0):6.1f}, file +{rss.get('RssFile', 0):5.1f})  "
+                f"impact p50={r['impact_p50_us']:7.1f}us p99={r['impact_p99_us']:8.1f}us"
+            )
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "--child":
+        child(sys.argv[2], sys.argv[3])
+    else:
+        main()
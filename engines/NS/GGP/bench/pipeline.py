@@ -0,0 +1,303 @@
+# bench/pipeline.py
+"""
+End-to-end consumer throughput: the audit and projection consume loops driven
+over a synthetic SOP event stream, against the in-memory stand-ins in
+bench/standins.py (no Kafka, Postgres or Mongo needed).
+
+Each mode runs the real consumer code path, from value_deserializer through
+parse_envelope(s), the idempotency ledger, the sink/projection write and the
+offset commit:
+  audit                 ConsumerRuntime + process_message per record
+  audit-batched         ConsumerRuntime + process_batch
+  audit-partition       ConsumerRuntime + partition_parallel dispatcher + process_batch
+  projection            ConsumerRuntime + process_message per record
+  projection-batched    ConsumerRuntime + process_batch
+  projection-partition  ConsumerRuntime + partition_parallel dispatcher + process_batch
+  projection-keyed      ConsumerRuntime + key_parallel dispatcher + process_message
+
+The stream is generated from BENCH_SEED (same bytes every run): a created /
+version_published mix keyed by sop_id over BENCH_PARTITIONS partitions per
+topic, with redelivered duplicates, malformed envelopes (valid JSON, bad
+fields; they go to the DLQ) and a share of large SOP content payloads.
+
+Reported per mode (best round by throughput): events/s, and p50/p99 of
+per-event latency, measured from the poll that delivered the record to the
+offset commit that covered it.
+
+  python -m bench.pipeline
+
+Env:
+  BENCH_EVENTS=20000          events in the stream (including duplicates/malformed)
+  BENCH_ROUNDS=3              best-of rounds per mode
+  BENCH_SEED=1
+  BENCH_MODES=all             comma-separated subset of the modes above
+  BENCH_PARTITIONS=4          partitions per topic
+  BENCH_BATCH_SIZE=500        max_records per poll
+  BENCH_KEY_PARALLELISM=16    projection-keyed concurrency
+  BENCH_CREATE_RATIO=0.3      share of sop.created among valid events
+  BENCH_DUPLICATE_RATE=0.05   redelivered copies of earlier records
+  BENCH_MALFORMED_RATE=0.01
+  BENCH_LARGE_RATE=0.05       share of version_published events with large content
+  BENCH_LARGE_BYTES=65536
+  BENCH_PG_RTT_MS=0           simulated round trip per statement/commit
+  BENCH_MONGO_RTT_MS=0        simulated round trip per update_one/bulk_write
+  BENCH_KAFKA_RTT_MS=0        simulated round trip per fetch/commit/DLQ send_and_wait
+  COMMIT_EVERY_N / COMMIT_INTERVAL_MS are read as in the services (components/commits.py)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import gc
+import os
+import random
+import time
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from aiokafka import TopicPartition
+
+import audit.main as audit_main
+import projection.main as projection_main
+from bench.standins import MemoryMongo, MemoryPostgres, NullProducer, StreamConsumer, StreamDrained
+from components.dedup_cache import cache_from_env
+from components.kafka import json_dumps
+from components.keyed_executor import key_parallel
+from components.partition_workers import partition_parallel
+from components.runtime import ConsumerRuntime
+from core import codec
+
+EVENTS = int(os.getenv("BENCH_EVENTS", "20000"))
+ROUNDS = int(os.getenv("BENCH_ROUNDS", "3"))
+SEED = int(os.getenv("BENCH_SEED", "1"))
+MODES = os.getenv("BENCH_MODES", "all")
+PARTITIONS = int(os.getenv("BENCH_PARTITIONS", "4"))
+BATCH_SIZE = int(os.getenv("BENCH_BATCH_SIZE", "500"))
+KEY_PARALLELISM = int(os.getenv("BENCH_KEY_PARALLELISM", "16"))
+CREATE_RATIO = float(os.getenv("BENCH_CREATE_RATIO", "0.3"))
+DUPLICATE_RATE = float(os.getenv("BENCH_DUPLICATE_RATE", "0.05"))
+MALFORMED_RATE = float(os.getenv("BENCH_MALFORMED_RATE", "0.01"))
+LARGE_RATE = float(os.getenv("BENCH_LARGE_RATE", "0.05"))
+LARGE_BYTES = int(os.getenv("BENCH_LARGE_BYTES", "65536"))
+PG_RTT_S = float(os.getenv("BENCH_PG_RTT_MS", "0")) / 1000.0
+MONGO_RTT_S = float(os.getenv("BENCH_MONGO_RTT_MS", "0")) / 1000.0
+KAFKA_RTT_S = float(os.getenv("BENCH_KAFKA_RTT_MS", "0")) / 1000.0
+
+CREATED = "ggp.core.sop.created"
+PUBLISHED = "ggp.core.sop.version_published"
+
+Log = Dict[TopicPartition, List[Tuple[Optional[bytes], bytes]]]
+
+
+# ---------------------------
+# Stream
+# ---------------------------
+
+def _uuid(rng: random.Random) -> str:
+    return str(UUID(int=rng.getrandbits(128), version=4))
+
+
+def _content(rng: random.Random, size: int) -> str:
+    words = ("step", "verify", "operator", "record", "approve", "escalate", "inspect", "calibrate")
+    out, n = [], 0
+    while n < size:
+        w = words[rng.randrange(len(words))]
+        out.append(w)
+        n += len(w) + 1
+    return " ".join(out)[:size]
+
+
+def make_stream(n: int, *, seed: int = SEED) -> Tuple[Log, Dict[str, int]]:
+    """Deterministic event log for `seed`; returns (log, counts by kind)."""
+    rng = random.Random(seed)
+    base = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    log: Log = {TopicPartition(t, p): [] for t in (CREATED, PUBLISHED) for p in range(PARTITIONS)}
+    sops: List[Tuple[str, int]] = []  # (sop_id, latest version)
+    sent: List[Tuple[TopicPartition, bytes, bytes]] = []
+    counts = {"created": 0, "published": 0, "large": 0, "duplicate": 0, "malformed": 0}
+
+    for i in range(n):
+        roll = rng.random()
+        if sent and roll < DUPLICATE_RATE:
+            tp, key, value = sent[rng.randrange(len(sent))]
+            log[tp].append((key, value))
+            counts["duplicate"] += 1
+            continue
+
+        if not sops or rng.random() < CREATE_RATIO:
+            sop_id = _uuid(rng)
+            sops.append((sop_id, 0))
+            topic = CREATED
+            payload = {"sop_id": sop_id, "title": f"SOP {i}", "status": "draft", "tags": ["ops", f"team-{i % 7}"]}
+            counts["created"] += 1
+        else:
+            j = rng.randrange(len(sops))
+            sop_id, version = sops[j]
+            version += 1
+            sops[j] = (sop_id, version)
+            topic = PUBLISHED
+            large = rng.random() < LARGE_RATE
+            content = _content(rng, LARGE_BYTES if large else 512)
+            payload = {
+                "sop_id": sop_id,
+                "version": version,
+                "content_hash": format(zlib.crc32(content.encode("utf-8")), "08x"),
+                "content": content,
+            }
+            counts["published"] += 1
+            counts["large"] += large
+
+        envelope = {
+            "event_id": _uuid(rng),
+            "event_type": topic,
+            "occurred_at": (base + timedelta(milliseconds=i)).isoformat().replace("+00:00", "Z"),
+            "producer": "bench@local",
+            "correlation_id": _uuid(rng),
+            "causation_id": None,
+            "actor": {"type": "user", "id": f"user-{i % 50}", "display": None},
+            "tenant_id": None,
+            "schema_version": 1,
+            "payload": payload,
+        }
+        if rng.random() < MALFORMED_RATE:
+            if i % 2:
+                del envelope["actor"]
+            else:
+                envelope["event_id"] = "not-a-uuid"
+            counts["malformed"] += 1
+
+        key = sop_id.encode("utf-8")
+        tp = TopicPartition(topic, zlib.crc32(key) % PARTITIONS)
+        value = json_dumps(envelope)
+        log[tp].append((key, value))
+        sent.append((tp, key, value))
+
+    return log, counts
+
+
+# ---------------------------
+# Modes
+# ---------------------------
+
+def _runtime(consumer, handler=None, dispatcher=None) -> ConsumerRuntime:
+    # same fetch/commit loop the services run; signals and group membership don't apply here
+    return ConsumerRuntime(
+        topics=(), group_id="bench", handler=handler, dispatcher=dispatcher,
+        consumer=consumer, max_records=BATCH_SIZE, max_wait_ms=0,
+    )
+
+
+async def _each(process, msgs) -> None:
+    for msg in msgs:
+        await process(msg)
+
+
+def _mode_runner(mode: str, pg, mdb, consumer, producer) -> Callable[[], Awaitable[None]]:
+    if mode == "audit":
+        rt = _runtime(consumer, lambda msgs: _each(lambda msg: audit_main.process_message(pg, producer, msg), msgs))
+    elif mode == "audit-batched":
+        rt = _runtime(consumer, lambda msgs: audit_main.process_batch(pg, producer, msgs))
+    elif mode == "audit-partition":
+        rt = _runtime(consumer, dispatcher=partition_parallel(lambda msgs: audit_main.process_batch(pg, producer, msgs)))
+    elif mode == "projection":
+        rt = _runtime(consumer, lambda msgs: _each(lambda msg: projection_main.process_message(pg, mdb, producer, msg), msgs))
+    elif mode == "projection-batched":
+        rt = _runtime(consumer, lambda msgs: projection_main.process_batch(pg, mdb, producer, msgs))
+    elif mode == "projection-partition":
+        rt = _runtime(consumer, dispatcher=partition_parallel(lambda msgs: projection_main.process_batch(pg, mdb, producer, msgs)))
+    elif mode == "projection-keyed":
+        rt = _runtime(consumer, dispatcher=key_parallel(
+            lambda msg: projection_main.process_message(pg, mdb, producer, msg), max_concurrency=KEY_PARALLELISM,
+        ))
+    else:
+        raise ValueError(f"unknown mode: {mode}")
+    return lambda: rt.run(handle_signals=False)
+
+
+ALL_MODES = (
+    "audit", "audit-batched", "audit-partition",
+    "projection", "projection-batched", "projection-partition", "projection-keyed",
+)
+
+
+class RoundResult:
+    def __init__(self, seconds: float, consumer: StreamConsumer, producer: NullProducer) -> None:
+        self.seconds = seconds
+        self.commits = consumer.commits
+        latencies = consumer.latencies
+        lat = sorted(latencies)
+        self.events = len(lat)
+        self.p50 = lat[len(lat) // 2] if lat else 0.0
+        self.p99 = lat[min(len(lat) - 1, int(len(lat) * 0.99))] if lat else 0.0
+        self.dlq = sum(n for topic, n in producer.sent.items() if ".dlq." in topic)
+
+    @property
+    def events_per_s(self) -> float:
+        return self.events / self.seconds if self.seconds else 0.0
+
+
+async def run_round(mode: str, log: Log) -> RoundResult:
+    # fresh sinks and dedup caches so every round starts from the same state
+    audit_main.DEDUP_CACHE = cache_from_env()
+    projection_main.DEDUP_CACHE = cache_from_env()
+    audit_main.BATCH_MAX_RECORDS = projection_main.BATCH_MAX_RECORDS = BATCH_SIZE
+    audit_main.BATCH_MAX_WAIT_MS = projection_main.BATCH_MAX_WAIT_MS = 0
+
+    module = audit_main if mode.startswith("audit") else projection_main
+    consumer = StreamConsumer(
+        log,
+        value_deserializer=module.METRICS.timed_decoder(codec.loads),
+        rtt_s=KAFKA_RTT_S,
+        # once the log is delivered the runtime drains its dispatcher and its
+        # final commit covers the tail (inside the timed run)
+        finish_on_delivered=True,
+    )
+    producer = NullProducer(rtt_s=KAFKA_RTT_S)
+    pg = MemoryPostgres(rtt_s=PG_RTT_S)
+    mdb = MemoryMongo(rtt_s=MONGO_RTT_S)
+    runner = _mode_runner(mode, pg, mdb, consumer, producer)
+
+    gc.collect()
+    t0 = time.perf_counter()
+    try:
+        await runner()
+    except StreamDrained:
+        pass
+    seconds = time.perf_counter() - t0
+    return RoundResult(seconds, consumer, producer)
+
+
+async def main_async() -> None:
+    modes = ALL_MODES if MODES.strip() in ("", "all") else tuple(m.strip() for m in MODES.split(",") if m.strip())
+    log, counts = make_stream(EVENTS)
+    stream_mb = sum(len(v) for recs in log.values() for _, v in recs) / 1e6
+
+    print(
+        f"[bench.pipeline] events={EVENTS} seed={SEED} partitions={PARTITIONS}x2 batch={BATCH_SIZE} "
+        f"rounds={ROUNDS} json={codec.BACKEND} rtt_ms(pg/mongo/kafka)="
+        f"{PG_RTT_S * 1e3:g}/{MONGO_RTT_S * 1e3:g}/{KAFKA_RTT_S * 1e3:g}"
+    )
+    print(
+        f"  stream: created={counts['created']} published={counts['published']} (large={counts['large']}) "
+        f"duplicate={counts['duplicate']} malformed={counts['malformed']} bytes={stream_mb:.1f}MB"
+    )
+    for mode in modes:
+        best: Optional[RoundResult] = None
+        for _ in range(ROUNDS):
+            res = await run_round(mode, log)
+            if best is None or res.events_per_s > best.events_per_s:
+                best = res
+        print(
+            f"  {mode:<21}: {best.events_per_s:10.0f} events/s  "
+            f"p50={best.p50 * 1e3:8.3f}ms  p99={best.p99 * 1e3:8.3f}ms  dlq={best.dlq}  commits={best.commits}"
+        )
+
+
+def main() -> None:
+    asyncio.run(main_async())
+
+
+if __name__ == "__main__":
+    main()
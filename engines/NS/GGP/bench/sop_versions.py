@@ -0,0 +1,175 @@
+# bench/sop_versions.py
+"""
+SOP version storage benchmark: full content per version vs the content-addressed
+delta store (versioning/manager.py), on a synthetic publish history.
+
+History (seeded): BENCH_SOPS SOPs of ~BENCH_CLAUSES clauses each (some SOPs
+start from a shared template), BENCH_VERSIONS published versions per SOP. Each
+publish edits 1-3 clauses (reword / insert / delete / metadata), and a share of
+publishes revert to an earlier version.
+
+The store is simulated in memory with the same decisions publish_version makes
+(dedup by hash, encode_content against the previous version, keyframes), so no
+Postgres is needed:
+
+  python -m bench.sop_versions
+
+Reported:
+  stored    : bytes stored as before (content_json in sop_version plus content in
+              rm_sop_versions) vs sop_content bodies; full/delta/dedup counts
+  publish   : bytes written per publish p50/p99, encode time p50/p99
+  read      : reconstruction (decode + patch chain, like load_content) p50/p99 and
+              the longest chain, for every version, each checked against its hash
+
+Env:
+  BENCH_SOPS=200
+  BENCH_VERSIONS=40
+  BENCH_CLAUSES=40
+  BENCH_REVERT_RATE=0.05
+  BENCH_SEED=1
+  SOP_KEYFRAME_INTERVAL / SOP_DELTA_MAX_RATIO as in versioning.manager
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import random
+import time
+from typing import Any, Dict, List, Tuple
+
+from bench.dependency_graph import percentile
+from versioning.manager import DELTA, FULL, KEYFRAME_INTERVAL, canonical_json, content_hash, encode_content, patch
+
+SOPS = int(os.getenv("BENCH_SOPS", "200"))
+VERSIONS = int(os.getenv("BENCH_VERSIONS", "40"))
+CLAUSES = int(os.getenv("BENCH_CLAUSES", "40"))
+REVERT_RATE = float(os.getenv("BENCH_REVERT_RATE", "0.05"))
+SEED = int(os.getenv("BENCH_SEED", "1"))
+
+_WORDS = (
+    "approval authority threshold material risk control owner review quarterly "
+    "escalate committee delegate record retain evidence exception policy entity "
+    "finance legal operations compliance notify within business days prior written"
+).split()
+
+
+def _sentence(rng: random.Random, n: int) -> str:
+    return " ".join(rng.choice(_WORDS) for _ in range(n)).capitalize() + "."
+
+
+def _clause(rng: random.Random, cid: int) -> Dict[str, Any]:
+    return {
+        "id": f"c{cid}",
+        "title": _sentence(rng, 4),
+        "text": " ".join(_sentence(rng, rng.randint(10, 25)) for _ in range(rng.randint(1, 3))),
+        "refs": sorted(rng.sample(range(500), rng.randint(0, 3))),
+    }
+
+
+def _initial(rng: random.Random, templates: List[Dict[str, Any]]) -> Dict[str, Any]:
+    if templates and rng.random() < 0.3:
+        return templates[rng.randrange(len(templates))]
+    return {
+        "title": _sentence(rng, 5),
+        "meta": {"owner": rng.choice(_WORDS), "review_cycle_days": rng.choice([90, 180, 365])},
+        "clauses": [_clause(rng, i) for i in range(CLAUSES + rng.randint(-10, 10))],
+    }
+
+
+def _edit(rng: random.Random, doc: Dict[str, Any]) -> Dict[str, Any]:
+    doc = json.loads(json.dumps(doc))
+    clauses = doc["clauses"]
+    for _ in range(rng.randint(1, 3)):
+        op = rng.random()
+        if op < 0.55 and clauses:
+            c = clauses[rng.randrange(len(clauses))]
+            c["text"] = c["text"] + " " + _sentence(rng, rng.randint(5, 12))
+        elif op < 0.75:
+            clauses.insert(rng.randrange(len(clauses) + 1), _clause(rng, rng.randrange(10**6)))
+        elif op < 0.9 and len(clauses) > 1:
+            clauses.pop(rng.randrange(len(clauses)))
+        else:
+            doc["meta"]["review_cycle_days"] = rng.choice([90, 180, 365])
+    return doc
+
+
+def main() -> None:
+    rng = random.Random(SEED)
+    templates = [_initial(rng, []) for _ in range(5)]
+
+    # content_hash -> (encoding, base_hash, depth, body)
+    store: Dict[str, Tuple[str, Any, int, bytes]] = {}
+    versions: List[str] = []
+    baseline_bytes = 0
+    counts = {FULL: 0, DELTA: 0, "dedup": 0}
+    written, encode_s = [], []
+
+    for _ in range(SOPS):
+        history: List[Dict[str, Any]] = []
+        prev_hash = None
+        for _ in range(VERSIONS):
+            if history and rng.random() < REVERT_RATE:
+                doc = history[rng.randrange(len(history))]
+            else:
+                doc = _edit(rng, history[-1]) if history else _initial(rng, templates)
+            history.append(doc)
+
+            t0 = time.perf_counter()
+            h = content_hash(doc)
+            full_size = len(canonical_json(doc))
+            baseline_bytes += 2 * full_size  # sop_version.content_json + rm_sop_versions.content
+            if h in store:
+                counts["dedup"] += 1
+                written.append(0)
+            else:
+                prev_depth = store[prev_hash][2] if prev_hash else None
+                prev = history[-2] if prev_hash and len(history) > 1 else None
+                encoding, body, depth, _ = encode_content(doc, prev=prev, prev_depth=prev_depth)
+                store[h] = (encoding, prev_hash if encoding == DELTA else None, depth, body)
+                counts[encoding] += 1
+                written.append(len(body))
+            encode_s.append(time.perf_counter() - t0)
+            versions.append(h)
+            prev_hash = h
+
+    stored_bytes = sum(len(entry[3]) for entry in store.values())
+    print(
+        f"[bench.sop_versions] sops={SOPS} versions/sop={VERSIONS} clauses~{CLAUSES} "
+        f"keyframe_interval={KEYFRAME_INTERVAL} seed={SEED}"
+    )
+    print(
+        f"  stored    : before {baseline_bytes / 2**20:8.1f}MiB   content store {stored_bytes / 2**20:6.2f}MiB "
+        f"({baseline_bytes / max(1, stored_bytes):.1f}x less)   "
+        f"full={counts[FULL]} delta={counts[DELTA]} dedup={counts['dedup']}"
+    )
+    print(
+        f"  publish   : written p50={percentile(written, 0.5):7.0f}B p99={percentile(written, 0.99):7.0f}B "
+        f"(full doc ~{baseline_bytes // 2 // len(versions)}B)   "
+        f"encode p50={percentile(encode_s, 0.5) * 1e3:6.2f}ms p99={percentile(encode_s, 0.99) * 1e3:6.2f}ms"
+    )
+
+    read_s, longest = [], 0
+    for h in versions:
+        t0 = time.perf_counter()
+        chain = []
+        node = h
+        while node is not None:
+            entry = store[node]
+            chain.append(entry)
+            node = entry[1]
+        doc = None
+        for encoding, _, _, body in reversed(chain):
+            decoded = json.loads(body)
+            doc = decoded if encoding == FULL else patch(doc, decoded)
+        read_s.append(time.perf_counter() - t0)
+        longest = max(longest, len(chain))
+        assert content_hash(doc) == h
+    print(
+        f"  read      : p50={percentile(read_s, 0.5) * 1e3:6.2f}ms p99={percentile(read_s, 0.99) * 1e3:6.2f}ms  "
+        f"longest chain={longest} rows  (all {len(versions)} versions verified)"
+    )
+
+
+if __name__ == "__main__":
+    main()
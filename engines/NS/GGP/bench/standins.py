@@ -0,0 +1,364 @@
+# bench/standins.py
+"""
+In-memory stand-ins for Kafka, Postgres and Mongo, used by bench.pipeline.
+
+They implement just the client surface the GGP consumers touch, with the same
+call shapes, so audit/projection code runs unmodified:
+
+StreamConsumer (AIOKafkaConsumer)
+  start / stop / getmany / async iteration / commit / assignment / pause / resume /
+  position / highwater / committed. Values are stored encoded and run through
+  value_deserializer on delivery, like aiokafka. Once the log is drained and
+  every delivered record is committed (or just delivered, with
+  finish_on_delivered, for ConsumerRuntime runs: its drain and final commit
+  then cover the tail), getmany/__anext__ raise StreamDrained, which is how a bench ends the
+  otherwise endless consume loops.
+  Each record's poll-to-commit time is recorded in `latencies` (seconds).
+
+NullProducer (AIOKafkaProducer)
+  send (returns an already resolved future) / send_and_wait; counts per topic.
+
+MemoryPostgres (AsyncEngine)
+  connect() / begin() with transactional staging (commit applies, rollback
+  drops). Understands the statements the consumers issue: the idempotency
+  ledger inserts (components.pg_idempotency) and the audit_event inserts
+  (audit.main). Anything else raises NotImplementedError.
+
+MemoryMongo (AsyncIOMotorDatabase)
+  db[name].update_one / bulk_write with $set upserts.
+
+Every round trip awaits `asyncio.sleep(rtt_s)`; with rtt_s=0 that is a bare
+yield to the event loop, as a real driver would do, and the numbers measure
+consumer-side cost only. Non-zero rtt adds timer jitter, so compare like with like.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from aiokafka import TopicPartition
+
+
+class StreamDrained(Exception):
+    """Raised by StreamConsumer once every record has been delivered and committed."""
+
+
+class StreamRecord(NamedTuple):
+    topic: str
+    partition: int
+    offset: int
+    key: Optional[bytes]
+    value: Any
+    headers: Tuple = ()
+
+
+# ---------------------------
+# Kafka
+# ---------------------------
+
+class StreamConsumer:
+    def __init__(
+        self,
+        log: Dict[TopicPartition, List[Tuple[Optional[bytes], bytes]]],
+        *,
+        value_deserializer: Optional[Callable[[bytes], Any]] = None,
+        rtt_s: float = 0.0,
+        idle_s: float = 0.0005,
+        finish_on_delivered: bool = False,
+    ) -> None:
+        self._log = log
+        self._deserialize = value_deserializer or (lambda v: v)
+        self._rtt_s = rtt_s
+        self._idle_s = idle_s
+        self._finish_on_delivered = finish_on_delivered
+        self._tps = list(log)
+        self._position: Dict[TopicPartition, int] = {tp: 0 for tp in self._tps}
+        self._committed: Dict[TopicPartition, int] = {tp: 0 for tp in self._tps}
+        self._inflight: Dict[TopicPartition, deque] = {tp: deque() for tp in self._tps}
+        self._paused: set = set()
+        self._rr = 0
+        self.latencies: List[float] = []
+        self.commits = 0
+
+    async def start(self) -> None:
+        return None
+
+    async def stop(self) -> None:
+        return None
+
+    # --- assignment / positions ---
+
+    def assignment(self) -> set:
+        return set(self._tps)
+
+    def pause(self, *tps: TopicPartition) -> None:
+        self._paused.update(tps)
+
+    def resume(self, *tps: TopicPartition) -> None:
+        self._paused.difference_update(tps)
+
+    def highwater(self, tp: TopicPartition) -> int:
+        return len(self._log[tp])
+
+    async def position(self, tp: TopicPartition) -> int:
+        return self._position[tp]
+
+    async def committed(self, tp: TopicPartition) -> int:
+        return self._committed[tp]
+
+    def _drained(self) -> bool:
+        done = self._position if self._finish_on_delivered else self._committed
+        return all(done[tp] >= len(self._log[tp]) for tp in self._tps)
+
+    def _take(self, tp: TopicPartition, n: int, now: float) -> List[StreamRecord]:
+        start = self._position[tp]
+        entries = self._log[tp][start:start + n]
+        self._position[tp] = start + len(entries)
+        inflight = self._inflight[tp]
+        out = []
+        for i, (key, raw) in enumerate(entries, start):
+            inflight.append((i, now))
+            out.append(StreamRecord(tp.topic, tp.partition, i, key, self._deserialize(raw)))
+        return out
+
+    # --- fetch ---
+
+    async def getmany(self, *partitions: TopicPartition, timeout_ms: int = 0, max_records: Optional[int] = None) -> Dict[TopicPartition, List[StreamRecord]]:
+        budget = max_records or 500
+        now = time.perf_counter()
+        out: Dict[TopicPartition, List[StreamRecord]] = {}
+        n = len(self._tps)
+        for k in range(n):
+            tp = self._tps[(self._rr + k) % n]
+            if budget <= 0:
+                break
+            if tp in self._paused or (partitions and tp not in partitions):
+                continue
+            recs = self._take(tp, budget, now)
+            if recs:
+                out[tp] = recs
+                budget -= len(recs)
+        self._rr = (self._rr + 1) % max(1, n)
+        if out:
+            await asyncio.sleep(self._rtt_s)
+            return out
+        if self._drained():
+            raise StreamDrained()
+        # nothing fetchable yet (paused, or waiting on commits): idle like a real poll
+        await asyncio.sleep(self._idle_s)
+        return {}
+
+    def __aiter__(self) -> "StreamConsumer":
+        return self
+
+    async def __anext__(self) -> StreamRecord:
+        n = len(self._tps)
+        for k in range(n):
+            tp = self._tps[(self._rr + k) % n]
+            if tp in self._paused or self._position[tp] >= len(self._log[tp]):
+                continue
+            self._rr = (self._rr + k + 1) % n
+            return self._take(tp, 1, time.perf_counter())[0]
+        raise StreamDrained()
+
+    # --- commit ---
+
+    async def commit(self, offsets: Optional[Dict[TopicPartition, int]] = None) -> None:
+        await asyncio.sleep(self._rtt_s)
+        if offsets is None:
+            offsets = {tp: self._position[tp] for tp in self._tps}
+        now = time.perf_counter()
+        for tp, offset in offsets.items():
+            if offset <= self._committed[tp]:
+                continue
+            self._committed[tp] = offset
+            inflight = self._inflight[tp]
+            while inflight and inflight[0][0] < offset:
+                self.latencies.append(now - inflight.popleft()[1])
+        self.commits += 1
+
+
+class NullProducer:
+    """Accepts every send; counts records per topic."""
+
+    def __init__(self, *, rtt_s: float = 0.0) -> None:
+        self._rtt_s = rtt_s
+        self.sent: Dict[str, int] = {}
+
+    async def send(self, topic: str, value: bytes = None, key: Optional[bytes] = None, headers=None, **_kw) -> asyncio.Future:
+        self.sent[topic] = self.sent.get(topic, 0) + 1
+        fut = asyncio.get_running_loop().create_future()
+        fut.set_result(None)
+        return fut
+
+    async def send_and_wait(self, topic: str, value: bytes = None, key: Optional[bytes] = None, headers=None, **_kw) -> None:
+        await asyncio.sleep(self._rtt_s)
+        self.sent[topic] = self.sent.get(topic, 0) + 1
+
+    async def flush(self) -> None:
+        return None
+
+
+# ---------------------------
+# Postgres
+# ---------------------------
+
+class _Result:
+    __slots__ = ("rowcount", "_rows")
+
+    def __init__(self, rowcount: int, rows: Iterable[Tuple] = ()) -> None:
+        self.rowcount = rowcount
+        self._rows = list(rows)
+
+    def __iter__(self):
+        return iter(self._rows)
+
+
+class _Connection:
+    def __init__(self, db: "MemoryPostgres") -> None:
+        self._db = db
+        self._ledger: set = set()
+        self._audit: Dict[str, dict] = {}
+
+    async def execute(self, stmt, params: Optional[dict] = None) -> _Result:
+        await asyncio.sleep(self._db.rtt_s)
+        self._db.statements += 1
+        return self._db._handler(stmt.text)(self, params or {})
+
+    async def commit(self) -> None:
+        await asyncio.sleep(self._db.rtt_s)
+        self._db.ledger.update(self._ledger)
+        self._db.audit.update(self._audit)
+        self._ledger.clear()
+        self._audit.clear()
+
+    async def rollback(self) -> None:
+        self._ledger.clear()
+        self._audit.clear()
+
+    # --- statements ---
+
+    def _mark_one(self, p: dict) -> _Result:
+        key = (p["cg"], p["eid"])
+        if key in self._db.ledger or key in self._ledger:
+            return _Result(0)
+        self._ledger.add(key)
+        return _Result(1)
+
+    def _mark_many(self, p: dict) -> _Result:
+        cg = p["cg"]
+        rows = []
+        for eid in p["eids"]:
+            key = (cg, eid)
+            if key in self._db.ledger or key in self._ledger:
+                continue
+            self._ledger.add(key)
+            rows.append((eid,))
+        return _Result(len(rows), rows)
+
+    def _audit_one(self, p: dict) -> _Result:
+        if p["event_id"] in self._db.audit:
+            return _Result(0)
+        json.loads(p["payload"])  # server-side jsonb parse
+        self._audit[p["event_id"]] = p
+        return _Result(1)
+
+    def _audit_many(self, p: dict) -> _Result:
+        n = 0
+        for row in json.loads(p["rows"]):  # server-side jsonb_to_recordset
+            if row["event_id"] in self._db.audit or row["event_id"] in self._audit:
+                continue
+            self._audit[row["event_id"]] = row
+            n += 1
+        return _Result(n)
+
+
+class _ConnectionContext:
+    def __init__(self, db: "MemoryPostgres", *, autocommit: bool) -> None:
+        self._conn = _Connection(db)
+        self._autocommit = autocommit
+
+    async def __aenter__(self) -> _Connection:
+        return self._conn
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        if self._autocommit and exc_type is None:
+            await self._conn.commit()
+        else:
+            await self._conn.rollback()
+
+
+class MemoryPostgres:
+    def __init__(self, *, rtt_s: float = 0.0) -> None:
+        self.rtt_s = rtt_s
+        self.ledger: set = set()
+        self.audit: Dict[str, dict] = {}
+        self.statements = 0
+        self._handlers: Dict[str, Callable[[_Connection, dict], _Result]] = {}
+
+    def _handler(self, sql: str) -> Callable[[_Connection, dict], _Result]:
+        h = self._handlers.get(sql)
+        if h is None:
+            if "INTO consumer_processed_event" in sql:
+                h = _Connection._mark_many if "unnest(" in sql else _Connection._mark_one
+            elif "INTO audit_event" in sql:
+                h = _Connection._audit_many if "jsonb_to_recordset" in sql else _Connection._audit_one
+            else:
+                raise NotImplementedError(f"MemoryPostgres: unsupported statement: {sql.strip().splitlines()[0]}")
+            self._handlers[sql] = h
+        return h
+
+    def connect(self) -> _ConnectionContext:
+        return _ConnectionContext(self, autocommit=False)
+
+    def begin(self) -> _ConnectionContext:
+        return _ConnectionContext(self, autocommit=True)
+
+    async def dispose(self) -> None:
+        return None
+
+
+# ---------------------------
+# Mongo
+# ---------------------------
+
+class _Collection:
+    def __init__(self, db: "MemoryMongo") -> None:
+        self._db = db
+        self.docs: Dict[Any, dict] = {}
+
+    def _upsert(self, flt: dict, update: dict) -> None:
+        _id = flt["_id"]
+        doc = self.docs.get(_id)
+        if doc is None:
+            doc = self.docs[_id] = {"_id": _id}
+        doc.update(update["$set"])
+
+    async def update_one(self, flt: dict, update: dict, upsert: bool = False) -> None:
+        await asyncio.sleep(self._db.rtt_s)
+        self._db.round_trips += 1
+        self._upsert(flt, update)
+
+    async def bulk_write(self, requests: List, ordered: bool = True) -> None:
+        await asyncio.sleep(self._db.rtt_s)
+        self._db.round_trips += 1
+        for req in requests:
+            # pymongo.UpdateOne keeps its arguments in private slots
+            self._upsert(req._filter, req._doc)
+
+
+class MemoryMongo:
+    def __init__(self, *, rtt_s: float = 0.0) -> None:
+        self.rtt_s = rtt_s
+        self.round_trips = 0
+        self._collections: Dict[str, _Collection] = {}
+
+    def __getitem__(self, name: str) -> _Collection:
+        coll = self._collections.get(name)
+        if coll is None:
+            coll = self._collections[name] = _Collection(self)
+        return coll
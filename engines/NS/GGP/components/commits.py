@@ -0,0 +1,207 @@
+# components/commits.py
+"""
+Batched, rebalance-aware offset commits for GGP consumers.
+
+CommitManager replaces a consumer.commit() per record:
+- records are tracked per TopicPartition with an OffsetTracker (begin on
+  dispatch, complete once durably handled: written, skipped as a duplicate or
+  DLQ'd), so the committed offset never passes an unfinished record
+- the highest contiguous completed offset is committed every `every_n`
+  completed records or every `interval_s`, whichever comes first
+- flush() commits synchronously; components.runtime.ConsumerRuntime calls
+  revoke() for revoked partitions (once their in-flight work is drained) and
+  close() on shutdown
+
+A commit the group rejects mid-rebalance (CommitFailedError, IllegalStateError)
+is logged and retried by the next flush instead of stopping the consumer.
+
+At-least-once is unchanged: only completed records are ever committed, and a
+crash between commits redelivers at most every_n records / interval_s worth per
+partition, which the idempotency ledger absorbs.
+
+Env:
+  COMMIT_EVERY_N=1000       1 restores a commit per record
+  COMMIT_INTERVAL_MS=1000
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from typing import Callable, Dict, Iterable, List, Mapping, Optional
+
+from aiokafka import AIOKafkaConsumer, TopicPartition
+from aiokafka.errors import CommitFailedError, IllegalStateError
+
+from components.offsets import OffsetTracker
+
+log = logging.getLogger("ggp.commits")
+
+COMMIT_EVERY_N = int(os.getenv("COMMIT_EVERY_N", "1000"))
+COMMIT_INTERVAL_S = int(os.getenv("COMMIT_INTERVAL_MS", "1000")) / 1000.0
+
+
+class CommitManager:
+    def __init__(
+        self,
+        consumer: AIOKafkaConsumer,
+        *,
+        every_n: int = COMMIT_EVERY_N,
+        interval_s: float = COMMIT_INTERVAL_S,
+        on_commit: Optional[Callable[[Mapping[TopicPartition, int]], None]] = None,
+        timer=None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """
+        on_commit(offsets) runs after each successful commit (e.g. CommittedWatermarks.advance).
+        timer: optional histogram child (components.metrics); commit round trips are timed on it.
+        """
+        self.consumer = consumer
+        self.every_n = max(1, every_n)
+        self.interval_s = interval_s
+        self._on_commit = on_commit
+        self._timer = timer
+        self._clock = clock
+        self._trackers: Dict[TopicPartition, OffsetTracker] = {}
+        self._uncommitted = 0
+        self._last_commit = clock()
+        self._lock = asyncio.Lock()  # one commit in flight, so offsets never go backwards
+        self.commits = 0
+
+    # --- tracking ---
+
+    def begin(self, tp: TopicPartition, offset: int) -> OffsetTracker:
+        """A record was dispatched (call in offset order per partition). Returns its tracker."""
+        tracker = self._trackers.get(tp)
+        if tracker is None:
+            tracker = self._trackers[tp] = OffsetTracker()
+        tracker.begin(offset)
+        return tracker
+
+    def complete(self, tp: TopicPartition, offset: int, tracker: Optional[OffsetTracker] = None) -> None:
+        """
+        A record was durably handled (any order). Ignored after revocation, and, when
+        `tracker` (from begin) is given, if the partition was revoked and reassigned
+        since: a stale completion must not count against the new assignment's offsets.
+        """
+        current = self._trackers.get(tp)
+        if current is None or (tracker is not None and tracker is not current):
+            return
+        current.complete(offset)
+        self._uncommitted += 1
+
+    def done(self, tp: TopicPartition, offset: int) -> None:
+        """begin + complete, for loops that handle a partition's records in order."""
+        self.begin(tp, offset)
+        self.complete(tp, offset)
+
+    def begin_batch(self, tp: TopicPartition, msgs: List) -> OffsetTracker:
+        """An in-order batch from one partition was dispatched."""
+        tracker = self._trackers.get(tp)
+        if tracker is None:
+            tracker = self._trackers[tp] = OffsetTracker()
+        for msg in msgs:
+            tracker.begin(msg.offset)
+        return tracker
+
+    def complete_batch(self, tp: TopicPartition, msgs: List, tracker: Optional[OffsetTracker] = None) -> None:
+        """Every record of a begin_batch() batch was handled. Same staleness rules as complete()."""
+        current = self._trackers.get(tp)
+        if current is None or (tracker is not None and tracker is not current):
+            return
+        for msg in msgs:
+            current.complete(msg.offset)
+        self._uncommitted += len(msgs)
+
+    @property
+    def due(self) -> bool:
+        if not self._uncommitted:
+            return False
+        return self._uncommitted >= self.every_n or self._clock() - self._last_commit >= self.interval_s
+
+    # --- committing ---
+
+    async def maybe_commit(self) -> None:
+        """Commit if every_n records completed or interval_s elapsed since the last commit."""
+        if self.due:
+            await self.flush()
+
+    async def flush(self, partitions: Optional[Iterable[TopicPartition]] = None) -> Dict[TopicPartition, int]:
+        """
+        Commit every completed offset now (or only those of `partitions`).
+        Partitions no longer assigned are dropped instead of committed.
+        Returns the offsets committed.
+        """
+        async with self._lock:
+            return await self._flush(partitions)
+
+    async def _flush(self, partitions: Optional[Iterable[TopicPartition]]) -> Dict[TopicPartition, int]:
+        assigned = self.consumer.assignment()
+        offsets: Dict[TopicPartition, int] = {}
+        for tp in list(partitions if partitions is not None else self._trackers):
+            tracker = self._trackers.get(tp)
+            if tracker is None:
+                continue
+            if tp not in assigned:
+                # revoked without a flush: the new owner resumes from the last commit
+                del self._trackers[tp]
+                continue
+            nxt = tracker.take_commit()
+            if nxt is not None:
+                offsets[tp] = nxt
+
+        if partitions is None:
+            self._uncommitted = 0
+            self._last_commit = self._clock()
+        if not offsets:
+            return offsets
+
+        try:
+            if self._timer is not None:
+                with self._timer.time():
+                    await self.consumer.commit(offsets)
+            else:
+                await self.consumer.commit(offsets)
+        except (CommitFailedError, IllegalStateError):
+            # the group rebalanced under us: keep the offsets for the next flush (the
+            # revocation flush, or the next commit once still assigned) and keep consuming
+            log.warning("offset commit rejected during a rebalance; will retry", exc_info=True)
+            for tp in offsets:
+                tracker = self._trackers.get(tp)
+                if tracker is not None:
+                    tracker.retry_commit()
+            self._uncommitted += len(offsets)
+            return {}
+        self.commits += 1
+        if self._on_commit is not None:
+            self._on_commit(offsets)
+        return offsets
+
+    async def run_interval(self) -> None:
+        """
+        Background ticker (create_task it; cancel on shutdown): commits on interval_s even
+        when the consume loop is idle, so the tail of a burst does not wait for the next record.
+        """
+        while True:
+            await asyncio.sleep(self.interval_s)
+            await self.maybe_commit()
+
+    async def revoke(self, partitions: Iterable[TopicPartition]) -> None:
+        """Commit what completed on `partitions`, then stop tracking them."""
+        partitions = list(partitions)
+        try:
+            await self.flush(partitions)
+        except Exception:
+            # the group is already rebalancing; the new owner re-reads from the last commit
+            log.exception("offset commit on revocation failed")
+        for tp in partitions:
+            self._trackers.pop(tp, None)
+
+    async def close(self) -> None:
+        """Final flush on shutdown; failures are logged, not raised, so they don't mask the exit reason."""
+        try:
+            await self.flush()
+        except Exception:
+            log.exception("final offset commit failed")
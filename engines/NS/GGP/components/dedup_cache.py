@@ -0,0 +1,91 @@
+# components/dedup_cache.py
+"""
+In-process cache of recently confirmed event_ids for one consumer group.
+
+Sits in front of the Postgres idempotency ledger (components.pg_idempotency):
+an event_id is only added once the ledger row is known to be committed, so a
+cache hit is always a true duplicate and can be skipped without a round trip.
+A miss says nothing; the ledger stays the source of truth for first-seen events.
+
+Bounded by size (LRU eviction) and optionally by age (TTL). hits/misses are
+exposed (as ggp_dedup_cache_* via components.metrics) so the size can be tuned
+against the real redelivery pattern.
+"""
+
+from __future__ import annotations
+
+import os
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Iterable, Optional
+
+
+class RecentEventCache:
+    def __init__(
+        self,
+        max_size: int = 100_000,
+        *,
+        ttl_seconds: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_size = max(1, max_size)
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, float]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def seen(self, event_id: Hashable) -> bool:
+        """True if event_id was confirmed recently (counts as hit/miss)."""
+        added_at = self._entries.get(event_id)
+        if added_at is None:
+            self.misses += 1
+            return False
+        if self.ttl_seconds is not None and self._clock() - added_at > self.ttl_seconds:
+            del self._entries[event_id]
+            self.expirations += 1
+            self.misses += 1
+            return False
+        self._entries.move_to_end(event_id)
+        self.hits += 1
+        return True
+
+    def add(self, event_id: Hashable) -> None:
+        entries = self._entries
+        entries[event_id] = self._clock()
+        entries.move_to_end(event_id)
+        if len(entries) > self.max_size:
+            entries.popitem(last=False)
+            self.evictions += 1
+
+    def add_many(self, event_ids: Iterable[Hashable]) -> None:
+        for eid in event_ids:
+            self.add(eid)
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": (self.hits / lookups) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+def cache_from_env(prefix: str = "DEDUP_CACHE") -> Optional[RecentEventCache]:
+    """
+    <prefix>_SIZE=0 disables (default 100000); <prefix>_TTL_S sets an optional TTL.
+    """
+    size = int(os.getenv(f"{prefix}_SIZE", "100000"))
+    if size <= 0:
+        return None
+    ttl = os.getenv(f"{prefix}_TTL_S")
+    return RecentEventCache(size, ttl_seconds=float(ttl) if ttl else None)
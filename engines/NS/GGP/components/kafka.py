@@ -1,14 +1,18 @@
 from __future__ import annotations
 
+import asyncio
 import json
 import os
 import socket
-from dataclasses import asdict, dataclass
+from dataclasses import dataclass
 from datetime import datetime, timezone
-from typing import Any, Dict, Iterable, Optional
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
 from uuid import UUID, uuid4
 
-from aiokafka import AIOKafkaConsumer, AIOKafkaProducer
+from aiokafka import AIOKafkaConsumer, AIOKafkaProducer, ConsumerRebalanceListener
+
+from core import codec
+from core.context import current_correlation
 
 
 # ---------------------------
@@ -28,6 +32,13 @@ DEFAULT_SCHEMA_VERSION = int(os.getenv("EVENT_SCHEMA_VERSION", "1"))
 
 DEFAULT_VALUE_ENCODING = "utf-8"
 
+# Producer batching knobs (defaults match aiokafka: linger 0ms, 16KiB batches, no compression).
+# Records enqueued before the sender runs already share a produce request; a few ms of
+# linger widens that window for high-rate emitters at the cost of single-event latency.
+DEFAULT_LINGER_MS = int(os.getenv("KAFKA_PRODUCER_LINGER_MS", "0"))
+DEFAULT_MAX_BATCH_SIZE = int(os.getenv("KAFKA_PRODUCER_MAX_BATCH_SIZE", "16384"))
+DEFAULT_COMPRESSION_TYPE = os.getenv("KAFKA_PRODUCER_COMPRESSION_TYPE") or None  # gzip|snappy|lz4|zstd
+
 
 # ---------------------------
 # Contract types
@@ -54,6 +65,21 @@ class EventEnvelope:
     payload: Dict[str, Any]
 
 
+@dataclass(frozen=True)
+class OutboundEvent:
+    """
+    One event for KafkaProducer.emit_many (same fields as emit()).
+    """
+    topic: str
+    payload: Dict[str, Any]
+    actor: Actor
+    correlation_id: Optional[UUID] = None
+    causation_id: Optional[UUID] = None
+    tenant_id: Optional[str] = None
+    schema_version: int = DEFAULT_SCHEMA_VERSION
+    key_entity_id: Optional[str] = None
+
+
 # ---------------------------
 # Helpers
 # ---------------------------
@@ -62,6 +88,21 @@ def utc_now_iso() -> str:
     return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
 
 
+def group_correlation(correlation_id: Optional[UUID] = None) -> Tuple[UUID, Optional[UUID]]:
+    """
+    (correlation_id, default causation_id) shared by a group of events, resolved
+    the way build_envelope resolves one: an explicit correlation_id (no default
+    cause), else the request's correlation context (and its causation_id), else a
+    fresh id.
+    """
+    if correlation_id is not None:
+        return correlation_id, None
+    ctx = current_correlation()
+    if ctx is not None:
+        return ctx.correlation_id, ctx.causation_id
+    return uuid4(), None
+
+
 def build_envelope(
     *,
     event_type: str,
@@ -78,28 +119,89 @@ def build_envelope(
     """
     Builds the canonical GGP Kafka event envelope.
     - event_type should equal the topic name (per your canonical spec).
-    - correlation_id should be threaded through request->events.
+    - correlation_id should be threaded through request->events; when omitted, the
+      request's correlation context (core.context) is used, then a fresh id.
     """
     eid = event_id or uuid4()
+    if correlation_id is None:
+        ctx = current_correlation()
+        if ctx is not None:
+            correlation_id = ctx.correlation_id
+            causation_id = causation_id or ctx.causation_id
     cid = correlation_id or uuid4()
 
-    env = EventEnvelope(
-        event_id=str(eid),
-        event_type=event_type,
-        occurred_at=occurred_at or utc_now_iso(),
-        producer=producer,
-        correlation_id=str(cid),
-        causation_id=str(causation_id) if causation_id else None,
-        actor=asdict(actor),
-        tenant_id=tenant_id,
-        schema_version=int(schema_version),
-        payload=payload,
-    )
-    return asdict(env)
+    # Field order is the EventEnvelope field order. Built directly rather than via
+    # asdict(EventEnvelope(...)): asdict deep-copies the payload, so the returned
+    # envelope now shares `payload` with the caller.
+    return {
+        "event_id": str(eid),
+        "event_type": event_type,
+        "occurred_at": occurred_at or utc_now_iso(),
+        "producer": producer,
+        "correlation_id": str(cid),
+        "causation_id": str(causation_id) if causation_id else None,
+        "actor": {"type": actor.type, "id": actor.id, "display": actor.display},
+        "tenant_id": tenant_id,
+        "schema_version": int(schema_version),
+        "payload": payload,
+    }
+
+
+# One shared encoder: json.dumps(..., separators=...) builds a new JSONEncoder per call.
+_JSON_ENCODER = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False)
+_encode_json = _JSON_ENCODER.encode
 
 
 def json_dumps(obj: Any) -> bytes:
-    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode(DEFAULT_VALUE_ENCODING)
+    return _encode_json(obj).encode(DEFAULT_VALUE_ENCODING)
+
+
+class EnvelopeEncoder:
+    """
+    Writes a canonical envelope (as returned by build_envelope) straight to bytes.
+
+    Output is byte-identical to json_dumps(envelope), but only the variable parts
+    are JSON-encoded per event: the per-producer constants (producer id,
+    schema_version) are pre-encoded once and actor fragments are cached.
+    """
+
+    def __init__(self, *, producer: str = DEFAULT_PRODUCER_ID, schema_version: int = DEFAULT_SCHEMA_VERSION):
+        self.producer = producer
+        self.schema_version = int(schema_version)
+        self._producer_json = _encode_json(producer)
+        self._schema_version_json = str(self.schema_version)
+        self._actor_json: Dict[tuple, str] = {}
+
+    def _actor(self, actor: Dict[str, Any]) -> str:
+        try:
+            key = (actor["type"], actor["id"], actor.get("display"))
+            cached = self._actor_json.get(key)
+        except TypeError:  # unhashable display
+            return _encode_json(actor)
+        if cached is None:
+            cached = _encode_json(actor)
+            if len(self._actor_json) < 1024:
+                self._actor_json[key] = cached
+        return cached
+
+    def encode(self, env: Dict[str, Any]) -> bytes:
+        producer = env["producer"]
+        schema_version = env["schema_version"]
+        causation_id = env["causation_id"]
+        tenant_id = env["tenant_id"]
+        return "".join((
+            '{"event_id":', _encode_json(env["event_id"]),
+            ',"event_type":', _encode_json(env["event_type"]),
+            ',"occurred_at":', _encode_json(env["occurred_at"]),
+            ',"producer":', self._producer_json if producer == self.producer else _encode_json(producer),
+            ',"correlation_id":', _encode_json(env["correlation_id"]),
+            ',"causation_id":', "null" if causation_id is None else _encode_json(causation_id),
+            ',"actor":', self._actor(env["actor"]),
+            ',"tenant_id":', "null" if tenant_id is None else _encode_json(tenant_id),
+            ',"schema_version":', self._schema_version_json if schema_version == self.schema_version else _encode_json(schema_version),
+            ',"payload":', _encode_json(env["payload"]),
+            "}",
+        )).encode(DEFAULT_VALUE_ENCODING)
 
 
 def make_message_key(*, correlation_id: Optional[str] = None, entity_id: Optional[str] = None) -> bytes:
@@ -125,17 +227,27 @@ class KafkaProducer:
         *,
         bootstrap_servers: str = KAFKA_BOOTSTRAP_SERVERS,
         producer_id: str = DEFAULT_PRODUCER_ID,
+        linger_ms: int = DEFAULT_LINGER_MS,
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+        compression_type: Optional[str] = DEFAULT_COMPRESSION_TYPE,
     ):
         self.bootstrap_servers = bootstrap_servers
         self.producer_id = producer_id
+        self.linger_ms = linger_ms
+        self.max_batch_size = max_batch_size
+        self.compression_type = compression_type
+        self._encoder = EnvelopeEncoder(producer=producer_id)
         self._producer: Optional[AIOKafkaProducer] = None
 
     async def start(self) -> None:
         if self._producer:
             return
+        # values are always pre-encoded bytes (EnvelopeEncoder / json_dumps)
         self._producer = AIOKafkaProducer(
             bootstrap_servers=self.bootstrap_servers,
-            value_serializer=lambda o: json_dumps(o),
+            linger_ms=self.linger_ms,
+            max_batch_size=self.max_batch_size,
+            compression_type=self.compression_type,
         )
         await self._producer.start()
 
@@ -144,7 +256,12 @@ class KafkaProducer:
             await self._producer.stop()
             self._producer = None
 
-    async def emit(
+    async def flush(self) -> None:
+        """Wait until every buffered record has been delivered (or failed)."""
+        if self._producer:
+            await self._producer.flush()
+
+    async def emit_async(
         self,
         *,
         topic: str,
@@ -155,10 +272,11 @@ class KafkaProducer:
         tenant_id: Optional[str] = None,
         schema_version: int = DEFAULT_SCHEMA_VERSION,
         key_entity_id: Optional[str] = None,
-    ) -> Dict[str, Any]:
+    ) -> Tuple[Dict[str, Any], "asyncio.Future"]:
         """
-        Publish a single event using canonical envelope.
-        Returns the envelope (useful for logging/tests).
+        Enqueue a single event without waiting for the broker.
+        Returns (envelope, delivery future); await the future (or a gather of several)
+        to know the publish succeeded. Records enqueued within linger_ms share a request.
         """
         if not self._producer:
             raise RuntimeError("KafkaProducer not started")
@@ -179,10 +297,92 @@ class KafkaProducer:
             entity_id=key_entity_id,
         )
 
-        # send_and_wait ensures publish succeeded before returning
-        await self._producer.send_and_wait(topic, envelope, key=key)
+        # send() only waits for buffer space; the returned future resolves on broker ack
+        fut = await self._producer.send(topic, self._encoder.encode(envelope), key=key)
+        return envelope, fut
+
+    async def emit(
+        self,
+        *,
+        topic: str,
+        payload: Dict[str, Any],
+        actor: Actor,
+        correlation_id: Optional[UUID] = None,
+        causation_id: Optional[UUID] = None,
+        tenant_id: Optional[str] = None,
+        schema_version: int = DEFAULT_SCHEMA_VERSION,
+        key_entity_id: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Publish a single event using canonical envelope.
+        Returns the envelope (useful for logging/tests).
+        """
+        envelope, fut = await self.emit_async(
+            topic=topic,
+            payload=payload,
+            actor=actor,
+            correlation_id=correlation_id,
+            causation_id=causation_id,
+            tenant_id=tenant_id,
+            schema_version=schema_version,
+            key_entity_id=key_entity_id,
+        )
+        # wait for the broker ack before returning
+        await fut
         return envelope
 
+    async def emit_many(
+        self,
+        events: Iterable[OutboundEvent],
+        *,
+        correlation_id: Optional[UUID] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Publish a group of events pipelined: all are enqueued first, then awaited together,
+        so the group costs about one broker round trip instead of one per event.
+        Events without their own correlation_id share `correlation_id` (else the request's
+        correlation context, whose causation_id they also default to, as with emit();
+        else a generated id), e.g. a SOP and its first version published by one request.
+        Returns the envelopes in input order; raises if any publish failed (after the
+        events already enqueued have settled).
+        """
+        cid, cause = group_correlation(correlation_id)
+        pending = []
+        try:
+            for ev in events:
+                pending.append(await self.emit_async(
+                    topic=ev.topic,
+                    payload=ev.payload,
+                    actor=ev.actor,
+                    correlation_id=ev.correlation_id or cid,
+                    # context causation only for events that take the context's correlation
+                    causation_id=ev.causation_id or (None if ev.correlation_id else cause),
+                    tenant_id=ev.tenant_id,
+                    schema_version=ev.schema_version,
+                    key_entity_id=ev.key_entity_id,
+                ))
+        except Exception:
+            # records already enqueued are sent regardless: settle them before raising
+            await asyncio.gather(*(fut for _, fut in pending), return_exceptions=True)
+            raise
+        await asyncio.gather(*(fut for _, fut in pending))
+        return [envelope for envelope, _ in pending]
+
+    async def send_encoded_async(
+        self,
+        topic: str,
+        value: bytes,
+        *,
+        key: Optional[bytes] = None,
+    ) -> "asyncio.Future":
+        """
+        Enqueue an already-encoded envelope (e.g. a row from event_outbox) without
+        rebuilding it. Returns the delivery future.
+        """
+        if not self._producer:
+            raise RuntimeError("KafkaProducer not started")
+        return await self._producer.send(topic, value, key=key)
+
     async def emit_dlq(
         self,
         *,
@@ -227,18 +427,31 @@ def make_consumer(
     bootstrap_servers: str = KAFKA_BOOTSTRAP_SERVERS,
     auto_offset_reset: str = "earliest",
     enable_auto_commit: bool = False,
+    value_deserializer: Callable[[bytes], Any] = codec.loads,
+    listener: Optional[ConsumerRebalanceListener] = None,
 ) -> AIOKafkaConsumer:
     """
     Standard consumer config for GGP services:
     - manual commits (enable_auto_commit=False)
     - earliest reset (safe for rebuilds)
-    - JSON dict deserialization
+    - JSON dict deserialization (core.codec: orjson/msgspec when installed)
+    - optional rebalance listener (subscribes with it instead of passing topics)
     """
-    return AIOKafkaConsumer(
-        *list(topics),
+    if listener is None:
+        return AIOKafkaConsumer(
+            *list(topics),
+            bootstrap_servers=bootstrap_servers,
+            group_id=group_id,
+            enable_auto_commit=enable_auto_commit,
+            auto_offset_reset=auto_offset_reset,
+            value_deserializer=value_deserializer,
+        )
+    consumer = AIOKafkaConsumer(
         bootstrap_servers=bootstrap_servers,
         group_id=group_id,
         enable_auto_commit=enable_auto_commit,
         auto_offset_reset=auto_offset_reset,
-        value_deserializer=lambda b: json.loads(b.decode(DEFAULT_VALUE_ENCODING)),
-    )
\ No newline at end of file
+        value_deserializer=value_deserializer,
+    )
+    consumer.subscribe(list(topics), listener=listener)
+    return consumer
\ No newline at end of file
@@ -24,6 +24,7 @@ Default topic config (applies unless overridden per topic):
 Recommended overrides (baked in below):
 - version_published retained longer (30d)
 - DLQs retained longest (90d)
+- retry tiers retained 7d (well past the longest tier delay)
 """
 
 from __future__ import annotations
@@ -89,6 +90,7 @@ def per_topic_overrides() -> Dict[str, Dict[str, str]]:
 
     Notes:
     - DLQ topics should persist long enough for operator review.
+    - Retry tier topics only need to outlive their delay plus consumer downtime.
     - 'version_published' gets longer retention to support rebuild windows.
     - All are 'delete' cleanup policy for now.
       (We can introduce compacted topics later for derived state stores.)
@@ -114,6 +116,10 @@ def per_topic_overrides() -> Dict[str, Dict[str, str]]:
             "retention.ms": MS_90D,
             "cleanup.policy": "delete",
         },
+        **{
+            t: {"retention.ms": MS_7D, "cleanup.policy": "delete"}
+            for t in core_topics.RETRY_TOPICS
+        },
     }
 
 
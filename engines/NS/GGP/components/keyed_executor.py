@@ -0,0 +1,156 @@
+# components/keyed_executor.py
+"""
+Key-ordered parallel processing for GGP consumers.
+
+Records with the same Kafka message key (see components.kafka.make_message_key,
+usually the sop_id) are handled strictly in offset order; records with different
+keys run concurrently up to `max_concurrency`. Offsets are committed per
+partition through the runtime's CommitManager (one OffsetTracker per
+partition), so the committed offset never moves past the lowest unfinished
+record even though records complete out of order.
+
+This lets one hot partition drain a burst without adding partitions.
+
+Runs as a components.runtime dispatcher:
+  ConsumerRuntime(..., dispatcher=key_parallel(handler, max_concurrency=8))
+so stop and revocation drain in-flight records (bounded by the runtime's
+deadline) before offsets are committed: a revocation waits for (then cancels)
+only the revoked partitions' records, and shutdown commits everything that
+completed after the last poll.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Optional, Set
+
+from aiokafka import TopicPartition
+
+from components.commits import CommitManager
+
+if TYPE_CHECKING:
+    from components.runtime import ConsumerRuntime
+
+RecordHandler = Callable[[Any], Awaitable[None]]
+
+
+class KeyOrderedExecutor:
+    def __init__(
+        self,
+        handler: RecordHandler,
+        *,
+        max_concurrency: int,
+        max_in_flight: int = 1000,
+    ) -> None:
+        self.handler = handler
+        self._running = asyncio.Semaphore(max(1, max_concurrency))
+        self._in_flight = asyncio.Semaphore(max(1, max_in_flight))
+        self._tails: Dict[Hashable, asyncio.Task] = {}
+        self._groups: Dict[Hashable, Set[asyncio.Task]] = {}
+        self.failure: Optional[BaseException] = None
+
+    async def submit(self, key: Hashable, item: Any, on_done: Callable[[], None], *, group: Hashable = None) -> None:
+        """
+        Schedule `item` behind any earlier item with the same key. `group` (e.g. the
+        partition; must be the same for every item of a key) lets join()/close()
+        target a subset. Waits (backpressure) while max_in_flight items are queued or running.
+        """
+        await self._in_flight.acquire()
+        prev = self._tails.get(key)
+        task = asyncio.create_task(self._run(key, prev, item, on_done))
+        self._tails[key] = task
+        tasks = self._groups.get(group)
+        if tasks is None:
+            tasks = self._groups[group] = set()
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    async def _run(self, key: Hashable, prev: Optional[asyncio.Task], item: Any, on_done: Callable[[], None]) -> None:
+        try:
+            if prev is not None:
+                await prev
+            # once anything failed, later items must not overtake it
+            if self.failure is not None:
+                return
+            async with self._running:
+                await self.handler(item)
+            on_done()
+        except asyncio.CancelledError:
+            raise
+        except BaseException as e:
+            if self.failure is None:
+                self.failure = e
+        finally:
+            self._in_flight.release()
+            if self._tails.get(key) is asyncio.current_task():
+                del self._tails[key]
+
+    def raise_if_failed(self) -> None:
+        if self.failure is not None:
+            raise self.failure
+
+    def _tasks(self, groups: Optional[Iterable[Hashable]]) -> List[asyncio.Task]:
+        keys = list(self._groups) if groups is None else groups
+        return [t for g in keys for t in self._groups.get(g, ())]
+
+    async def join(self, groups: Optional[Iterable[Hashable]] = None) -> None:
+        """Wait for every item of `groups` (default all), including ones queued meanwhile."""
+        groups = None if groups is None else list(groups)
+        while True:
+            tasks = self._tasks(groups)
+            if not tasks:
+                return
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def close(self, groups: Optional[Iterable[Hashable]] = None) -> None:
+        """Cancel every item of `groups` (default all) and forget them."""
+        groups = list(self._groups) if groups is None else list(groups)
+        tasks = self._tasks(groups)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for g in groups:
+            self._groups.pop(g, None)
+
+
+class KeyParallelDispatcher:
+    """
+    ConsumerRuntime dispatcher: every record goes to a KeyOrderedExecutor keyed by
+    (topic, partition, message key) and is completed on the CommitManager once handled.
+    """
+
+    def __init__(self, handler: RecordHandler, commits: CommitManager, *, max_concurrency: int, max_in_flight: int = 1000) -> None:
+        self.commits = commits
+        self.executor = KeyOrderedExecutor(handler, max_concurrency=max_concurrency, max_in_flight=max_in_flight)
+
+    async def submit(self, tp: TopicPartition, msgs: List) -> None:
+        commits = self.commits
+        for msg in msgs:
+            tracker = commits.begin(tp, msg.offset)
+            await self.executor.submit(
+                (tp.topic, tp.partition, msg.key),
+                msg,
+                lambda o=msg.offset, t=tracker: commits.complete(tp, o, t),
+                group=tp,
+            )
+
+    async def drain(self, partitions: Optional[Iterable[TopicPartition]] = None) -> None:
+        """Wait for the records of `partitions` (default all) already dispatched."""
+        await self.executor.join(partitions)
+
+    async def cancel(self, partitions: Optional[Iterable[TopicPartition]] = None) -> None:
+        """Cancel queued and running records of `partitions` (revoked, or past the drain deadline)."""
+        await self.executor.close(partitions)
+
+    def assign(self, partitions: Iterable[TopicPartition]) -> None:
+        return None
+
+    def raise_if_failed(self) -> None:
+        self.executor.raise_if_failed()
+
+
+def key_parallel(handler: RecordHandler, *, max_concurrency: int, max_in_flight: int = 1000) -> Callable[["ConsumerRuntime"], KeyParallelDispatcher]:
+    """Dispatcher factory for ConsumerRuntime(dispatcher=...)."""
+    return lambda runtime: KeyParallelDispatcher(
+        handler, runtime.commits, max_concurrency=max_concurrency, max_in_flight=max_in_flight,
+    )
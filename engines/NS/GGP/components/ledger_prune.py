@@ -0,0 +1,118 @@
+# components/ledger_prune.py
+"""
+Retention for the idempotency ledger (consumer_processed_event).
+
+A ledger row only has to outlive the Kafka record it guards: once the source topic
+has deleted that record it can never be redelivered, so the row is dead weight in
+the (consumer_group, event_id) primary key that every mark_processed probes.
+Rows are therefore pruned per source topic once they are older than the topic's
+retention.ms (from kafka_admin, the same config the topics are created with) plus
+a margin for segment-granular deletion (Kafka drops whole segments, so records can
+outlive retention.ms by up to segment.ms, 7d by default). That keeps the ledger at
+a constant size relative to the retention window.
+
+Deletes run in batches by ctid so each transaction stays short and the live
+consumers' inserts never queue behind one huge DELETE. (The ledger is not
+partitioned: a partitioned table's unique key must contain the partition key,
+which would break ON CONFLICT (consumer_group, event_id) dedup.)
+
+Not covered: re-publishing a pruned event as a new record (manual DLQ replay of a
+months-old event) gets past the ledger; read-model upserts and ON CONFLICT audit
+inserts keep that harmless.
+
+Usage (one-shot; run daily):
+  python -m components.ledger_prune
+
+Env:
+  POSTGRES_DSN                       (required)
+  LEDGER_PRUNE_MARGIN_MS=604800000   extra age beyond retention.ms (default 7d)
+  LEDGER_PRUNE_BATCH=10000           rows per DELETE transaction
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Dict
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from components.kafka_admin import default_topic_config, merged_topic_config, per_topic_overrides
+from core import topics as core_topics
+
+POSTGRES_DSN = os.getenv("POSTGRES_DSN")  # required
+MARGIN_MS = int(os.getenv("LEDGER_PRUNE_MARGIN_MS", "604800000"))
+BATCH = int(os.getenv("LEDGER_PRUNE_BATCH", "10000"))
+
+_DELETE_TOPIC_SQL = text("""
+    DELETE FROM consumer_processed_event
+    WHERE ctid = ANY(ARRAY(
+      SELECT ctid FROM consumer_processed_event
+      WHERE kafka_topic = :topic AND processed_at < :cutoff
+      LIMIT :batch
+    ))
+""")
+
+# rows without a known source topic fall back to the longest retention
+_DELETE_OTHER_SQL = text("""
+    DELETE FROM consumer_processed_event
+    WHERE ctid = ANY(ARRAY(
+      SELECT ctid FROM consumer_processed_event
+      WHERE (kafka_topic IS NULL OR NOT (kafka_topic = ANY(CAST(:known AS text[]))))
+        AND processed_at < :cutoff
+      LIMIT :batch
+    ))
+""")
+
+
+def retention_by_topic() -> Dict[str, int]:
+    """retention.ms per consumed topic, as kafka_admin configures it."""
+    base = default_topic_config()
+    overrides = per_topic_overrides()
+    return {
+        t: int(merged_topic_config(t, base, overrides)["retention.ms"])
+        for t in core_topics.SLICE1_TOPICS
+    }
+
+
+async def _delete_batched(engine: AsyncEngine, sql, params: dict) -> int:
+    total = 0
+    while True:
+        async with engine.begin() as conn:
+            res = await conn.execute(sql, {**params, "batch": BATCH})
+        n = res.rowcount or 0
+        total += n
+        if n < BATCH:
+            return total
+
+
+async def prune_ledger(engine: AsyncEngine, *, now: datetime, margin_ms: int = MARGIN_MS) -> Dict[str, int]:
+    """Delete expired ledger rows; returns rows deleted per topic ("*" = other)."""
+    retention = retention_by_topic()
+    deleted: Dict[str, int] = {}
+    for topic, retention_ms in retention.items():
+        cutoff = now - timedelta(milliseconds=retention_ms + margin_ms)
+        deleted[topic] = await _delete_batched(engine, _DELETE_TOPIC_SQL, {"topic": topic, "cutoff": cutoff})
+
+    cutoff = now - timedelta(milliseconds=max(retention.values()) + margin_ms)
+    deleted["*"] = await _delete_batched(engine, _DELETE_OTHER_SQL, {"known": list(retention), "cutoff": cutoff})
+    return deleted
+
+
+async def main() -> None:
+    if not POSTGRES_DSN:
+        raise RuntimeError("POSTGRES_DSN is required")
+
+    engine = create_async_engine(POSTGRES_DSN, pool_pre_ping=True)
+    try:
+        deleted = await prune_ledger(engine, now=datetime.now(timezone.utc))
+        for topic, n in deleted.items():
+            print(f"[ledger_prune] {topic}: deleted {n}")
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
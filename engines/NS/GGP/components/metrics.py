@@ -0,0 +1,180 @@
+# components/metrics.py
+"""
+In-process metrics for GGP consumers, exposed in Prometheus text format.
+
+Built on prometheus_client: label children are bound once at import
+(ConsumerMetrics), so the hot path is a child's observe()/inc() and no label
+lookups; the endpoint is prometheus_client's HTTP server on a daemon thread, so
+scrapes never run on the consumer's event loop.
+
+Standard consumer metrics (ConsumerMetrics binds them for one service):
+  ggp_consumer_stage_seconds{service,stage}      histogram
+      stages: decode, parse, idempotency, apply, dlq, commit
+      (per event in per-message modes, per polled batch in batched modes;
+      commit is timed by the ConsumerRuntime's CommitManager in every mode)
+  ggp_consumer_events_total{service,outcome}     counter
+      outcomes: processed, duplicate, dlq, retried
+  ggp_consumer_lag{service,topic,partition}      gauge (highwater - position)
+  ggp_dedup_cache_{hits,misses,evictions,expirations}_total{service}  counter
+  ggp_dedup_cache_size{service}                  gauge
+      read from the RecentEventCache at scrape time (ConsumerMetrics.watch_cache)
+
+Env:
+  METRICS_PORT=9102        0 disables the HTTP endpoint (recording stays on)
+  METRICS_LAG_INTERVAL_S=5
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from typing import Callable, Dict, Optional, Tuple
+from wsgiref.simple_server import WSGIServer
+
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, start_http_server
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9102"))
+LAG_INTERVAL_S = float(os.getenv("METRICS_LAG_INTERVAL_S", "5"))
+
+# seconds; covers in-memory steps (~10us) through slow broker/db round trips
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+    0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+)
+
+
+# ---------------------------
+# Standard consumer metrics
+# ---------------------------
+
+STAGE_SECONDS = Histogram(
+    "ggp_consumer_stage_seconds", "Time spent per consumer stage.", ("service", "stage"),
+    buckets=DEFAULT_BUCKETS,
+)
+EVENTS_TOTAL = Counter(
+    "ggp_consumer_events_total", "Consumed events by outcome.", ("service", "outcome"),
+)
+CONSUMER_LAG = Gauge(
+    "ggp_consumer_lag", "Records between the consumer position and the partition highwater.",
+    ("service", "topic", "partition"),
+)
+
+
+class DedupCacheCollector:
+    """
+    Exposes RecentEventCache counters. The cache keeps plain ints on the hot path;
+    they are read here, on the scrape thread, instead of being mirrored per lookup.
+    """
+
+    _COUNTERS = ("hits", "misses", "evictions", "expirations")
+
+    def __init__(self) -> None:
+        self._caches: Dict[str, object] = {}  # service -> RecentEventCache
+
+    def watch(self, service: str, cache) -> None:
+        self._caches[service] = cache
+
+    def collect(self):
+        counters = {
+            name: CounterMetricFamily(
+                f"ggp_dedup_cache_{name}", f"Recent-event dedup cache {name}.", labels=("service",),
+            )
+            for name in self._COUNTERS
+        }
+        size = GaugeMetricFamily("ggp_dedup_cache_size", "Entries in the recent-event dedup cache.", labels=("service",))
+        for service, cache in list(self._caches.items()):
+            stats = cache.stats()
+            for name, family in counters.items():
+                family.add_metric((service,), stats[name])
+            size.add_metric((service,), stats["size"])
+        yield from counters.values()
+        yield size
+
+
+DEDUP_CACHE_STATS = DedupCacheCollector()
+REGISTRY.register(DEDUP_CACHE_STATS)
+
+
+class ConsumerMetrics:
+    """Children of the standard consumer metrics bound to one service label."""
+
+    def __init__(self, service: str) -> None:
+        self.service = service
+        stage = lambda s: STAGE_SECONDS.labels(service, s)
+        outcome = lambda o: EVENTS_TOTAL.labels(service, o)
+        self.decode = stage("decode")
+        self.parse = stage("parse")
+        self.idempotency = stage("idempotency")
+        self.apply = stage("apply")
+        self.dlq = stage("dlq")
+        self.commit = stage("commit")
+        self.processed = outcome("processed")
+        self.duplicate = outcome("duplicate")
+        self.dlq_total = outcome("dlq")
+        self.retried = outcome("retried")
+
+    def timed_decoder(self, decode: Callable[[bytes], object]) -> Callable[[bytes], object]:
+        """Wrap a value_deserializer so every decode is observed under stage="decode"."""
+        hist = self.decode
+        perf = time.perf_counter
+
+        def _decode(raw: bytes):
+            t0 = perf()
+            try:
+                return decode(raw)
+            finally:
+                hist.observe(perf() - t0)
+
+        return _decode
+
+    def watch_cache(self, cache) -> None:
+        """Report a RecentEventCache's hit/miss/eviction counters and size (None: no-op)."""
+        if cache is not None:
+            DEDUP_CACHE_STATS.watch(self.service, cache)
+
+    async def track_lag(self, consumer, *, interval_s: float = LAG_INTERVAL_S) -> None:
+        """Refresh ggp_consumer_lag for the consumer's assignment until cancelled."""
+        reported: set = set()
+        while True:
+            current = set()
+            for tp in consumer.assignment():
+                highwater = consumer.highwater(tp)
+                if highwater is None:
+                    continue
+                try:
+                    position = await consumer.position(tp)
+                except Exception:
+                    continue
+                key = (tp.topic, str(tp.partition))
+                CONSUMER_LAG.labels(self.service, *key).set(max(0, highwater - position))
+                current.add(key)
+            for key in reported - current:
+                CONSUMER_LAG.remove(self.service, *key)  # revoked partitions stop reporting
+            reported = current
+            await asyncio.sleep(interval_s)
+
+
+# ---------------------------
+# HTTP endpoint
+# ---------------------------
+
+def start_metrics_server(
+    port: int = METRICS_PORT,
+    *,
+    host: str = "0.0.0.0",
+    registry: CollectorRegistry = REGISTRY,
+) -> Optional[WSGIServer]:
+    """Serve /metrics on host:port from a daemon thread. Returns None when port is 0."""
+    if not port:
+        return None
+    server, _thread = start_http_server(port, addr=host, registry=registry)
+    return server
+
+
+async def stop_metrics_server(server: Optional[WSGIServer]) -> None:
+    if server is None:
+        return
+    await asyncio.to_thread(server.shutdown)  # waits for the serve loop to notice
+    server.server_close()
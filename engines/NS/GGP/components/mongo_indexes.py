@@ -5,28 +5,37 @@ from motor.motor_asyncio import AsyncIOMotorClient
 MONGO_URI = os.getenv("MONGO_URI", "mongodb://ggp-mongo:27017")
 MONGO_DB = os.getenv("MONGO_DB", "ggp")
 
-async def ensure_indexes():
-    client = AsyncIOMotorClient(MONGO_URI)
-    db = client[MONGO_DB]
-
+async def create_read_model_indexes(db, suffix: str = ""):
+    """
+    Create read-model indexes on db. `suffix` targets shadow collections
+    (e.g. "__next" during a rebuild); index names are the same either way.
+    """
     # rm_sop_index
-    c = db["rm_sop_index"]
-    await c.create_index([("status", 1), ("updated_at", -1)], name="idx_status_updated")
-    await c.create_index([("tags", 1), ("updated_at", -1)], name="idx_tags_updated")
+    c = db["rm_sop_index" + suffix]
+    # _id last so keyset pages on (updated_at, _id) are served from the index (api/routes.py);
+    # supersedes idx_status_updated / idx_tags_updated, which can be dropped once these exist
+    await c.create_index([("status", 1), ("updated_at", -1), ("_id", -1)], name="idx_status_updated_id")
+    await c.create_index([("tags", 1), ("updated_at", -1), ("_id", -1)], name="idx_tags_updated_id")
     # Optional text search on title
     await c.create_index([("title", "text")], name="idx_title_text")
 
     # rm_sop_versions
-    c = db["rm_sop_versions"]
+    c = db["rm_sop_versions" + suffix]
     await c.create_index([("sop_id", 1), ("version", -1)], name="idx_sop_version_desc")
     await c.create_index([("sop_id", 1), ("version", 1)], unique=True, name="uq_sop_version")
 
     # rm_audit_trail
-    c = db["rm_audit_trail"]
+    c = db["rm_audit_trail" + suffix]
     await c.create_index([("occurred_at", -1)], name="idx_occurred_at_desc")
     await c.create_index([("entity_refs.sop_id", 1), ("occurred_at", -1)], name="idx_sop_occurred_at")
 
+async def ensure_indexes():
+    client = AsyncIOMotorClient(MONGO_URI)
+    db = client[MONGO_DB]
+
+    await create_read_model_indexes(db)
+
     client.close()
 
 if __name__ == "__main__":
-    asyncio.run(ensure_indexes())
\ No newline at end of file
+    asyncio.run(ensure_indexes())
@@ -0,0 +1,107 @@
+# components/offsets.py
+"""
+Offset bookkeeping for GGP consumers that complete records out of order.
+
+OffsetTracker (one per TopicPartition):
+- begin(offset) when a record is dispatched (must be called in offset order)
+- complete(offset) when it is durably handled (any order)
+- committable() -> next offset to commit: one past the highest offset below
+  which everything has completed, i.e. never past the lowest unfinished offset
+
+CommittedWatermarks (one per consumer):
+- the group's committed offset per TopicPartition, seeded from the broker and
+  advanced after each successful commit
+- records below it were durably handled before that commit, so they can skip the
+  idempotency ledger (see filter_new)
+"""
+
+from __future__ import annotations
+
+from collections import deque
+from typing import TYPE_CHECKING, Deque, Dict, List, Mapping, Optional, Set
+
+if TYPE_CHECKING:
+    from aiokafka import AIOKafkaConsumer, TopicPartition
+
+
+class OffsetTracker:
+    __slots__ = ("_pending", "_done", "_next", "_committed")
+
+    def __init__(self) -> None:
+        self._pending: Deque[int] = deque()
+        self._done: Set[int] = set()
+        self._next: Optional[int] = None
+        self._committed: Optional[int] = None
+
+    def begin(self, offset: int) -> None:
+        self._pending.append(offset)
+
+    def complete(self, offset: int) -> None:
+        self._done.add(offset)
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._pending)
+
+    def committable(self) -> Optional[int]:
+        pending, done = self._pending, self._done
+        while pending and pending[0] in done:
+            off = pending.popleft()
+            done.discard(off)
+            self._next = off + 1
+        return self._next
+
+    def take_commit(self) -> Optional[int]:
+        """
+        committable() if it moved since the last take_commit(), else None.
+        """
+        nxt = self.committable()
+        if nxt is None or nxt == self._committed:
+            return None
+        self._committed = nxt
+        return nxt
+
+    def retry_commit(self) -> None:
+        """The last take_commit() did not reach the broker: offer it again."""
+        self._committed = None
+
+
+class CommittedWatermarks:
+    """
+    Ledger fast path. A record below the group's committed offset for its partition
+    is a re-read (seek/rewind, stale fetch around a rebalance), not new work, so it
+    is dropped without a ledger round trip. Records at/above the watermark still go
+    through the ledger: crash-before-commit redelivery and producer-side duplicates
+    at new offsets are only caught there.
+
+    Cached marks only ever lag the broker (another member may have committed
+    further), which just means fewer records take the fast path.
+    """
+    __slots__ = ("_consumer", "_marks")
+
+    def __init__(self, consumer: AIOKafkaConsumer) -> None:
+        self._consumer = consumer
+        self._marks: Dict[TopicPartition, int] = {}
+
+    async def mark(self, tp: TopicPartition) -> int:
+        m = self._marks.get(tp)
+        if m is None:
+            m = await self._consumer.committed(tp) or 0
+            self._marks[tp] = m
+        return m
+
+    async def filter_new(self, tp: TopicPartition, msgs: List) -> List:
+        """Records of one partition (offset order) at/above the committed watermark."""
+        if not msgs:
+            return msgs
+        m = await self.mark(tp)
+        if msgs[0].offset >= m:
+            return msgs
+        return [msg for msg in msgs if msg.offset >= m]
+
+    def advance(self, offsets: Mapping[TopicPartition, int]) -> None:
+        """Call after consumer.commit(offsets) succeeded."""
+        marks = self._marks
+        for tp, off in offsets.items():
+            if off > marks.get(tp, -1):
+                marks[tp] = off
@@ -0,0 +1,227 @@
+# components/outbox.py
+"""
+Transactional outbox for GGP event publishing.
+
+Write side (request path):
+  async with engine.begin() as conn:
+      await conn.execute(<insert sop / sop_version>)
+      await enqueue_event(conn, topic=..., payload=..., actor=..., key_entity_id=sop_id)
+  -> one local commit; no broker latency in the API, and the domain row and its
+     event either both exist or neither does.
+
+Relay side (outbox/main.py):
+  relay_once() claims a batch of unpublished rows with FOR UPDATE SKIP LOCKED,
+  publishes them pipelined through components.kafka.KafkaProducer, marks them sent
+  and commits. Several relays can run side by side; each claims disjoint rows.
+  Delivery is at-least-once (a crash after publish but before commit republishes
+  the batch); consumers dedup by event_id.
+  With more than one relay, two events for the same key may be published by
+  different relays and reach Kafka out of order.
+
+The envelope column is text, not jsonb: the bytes encoded at enqueue time are
+exactly the bytes published.
+
+Retention: prune_published() deletes rows published longer ago than a retention
+window, in short batches; the relay runs it periodically.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+from uuid import UUID
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from components.kafka import (
+    DEFAULT_PRODUCER_ID,
+    DEFAULT_SCHEMA_VERSION,
+    Actor,
+    KafkaProducer,
+    OutboundEvent,
+    build_envelope,
+    group_correlation,
+    json_dumps,
+    make_message_key,
+)
+
+_INSERT_SQL = text("""
+    INSERT INTO event_outbox (event_id, topic, message_key, envelope)
+    VALUES (:event_id, :topic, :message_key, :envelope)
+""")
+
+_CLAIM_SQL = text("""
+    SELECT outbox_id, topic, message_key, envelope
+    FROM event_outbox
+    WHERE published_at IS NULL
+      AND available_at <= now()
+    ORDER BY outbox_id
+    LIMIT :limit
+    FOR UPDATE SKIP LOCKED
+""")
+
+_MARK_SENT_SQL = text("""
+    UPDATE event_outbox
+    SET published_at = now(), attempts = attempts + 1, last_error = NULL
+    WHERE outbox_id = ANY(CAST(:ids AS bigint[]))
+""")
+
+_MARK_FAILED_SQL = text("""
+    UPDATE event_outbox
+    SET attempts = attempts + 1,
+        last_error = :err,
+        available_at = now() + make_interval(secs => :delay_s)
+    WHERE outbox_id = ANY(CAST(:ids AS bigint[]))
+""")
+
+_DELETE_PUBLISHED_SQL = text("""
+    DELETE FROM event_outbox
+    WHERE ctid = ANY(ARRAY(
+      SELECT ctid FROM event_outbox
+      WHERE published_at < :cutoff
+      LIMIT :batch
+    ))
+""")
+
+
+def _outbox_row(envelope: Dict[str, Any], key_entity_id: Optional[str]) -> Dict[str, Any]:
+    key = make_message_key(correlation_id=envelope.get("correlation_id"), entity_id=key_entity_id)
+    return {
+        "event_id": envelope["event_id"],
+        "topic": envelope["event_type"],   # per spec: event_type equals topic
+        "message_key": key.decode("utf-8") if key else None,
+        "envelope": json_dumps(envelope).decode("utf-8"),
+    }
+
+
+# ---------------------------
+# Write side (caller's transaction)
+# ---------------------------
+
+async def enqueue_event(
+    conn: AsyncConnection,
+    *,
+    topic: str,
+    payload: Dict[str, Any],
+    actor: Actor,
+    correlation_id: Optional[UUID] = None,
+    causation_id: Optional[UUID] = None,
+    tenant_id: Optional[str] = None,
+    schema_version: int = DEFAULT_SCHEMA_VERSION,
+    key_entity_id: Optional[str] = None,
+    producer_id: str = DEFAULT_PRODUCER_ID,
+) -> Dict[str, Any]:
+    """
+    Same arguments as KafkaProducer.emit, but the event is written to event_outbox
+    on the caller's connection and published after the caller commits.
+    Returns the envelope.
+    """
+    envelope = build_envelope(
+        event_type=topic,
+        payload=payload,
+        actor=actor,
+        producer=producer_id,
+        correlation_id=correlation_id,
+        causation_id=causation_id,
+        tenant_id=tenant_id,
+        schema_version=schema_version,
+    )
+    await conn.execute(_INSERT_SQL, _outbox_row(envelope, key_entity_id))
+    return envelope
+
+
+async def enqueue_events(
+    conn: AsyncConnection,
+    events: Iterable[OutboundEvent],
+    *,
+    correlation_id: Optional[UUID] = None,
+    producer_id: str = DEFAULT_PRODUCER_ID,
+) -> List[Dict[str, Any]]:
+    """
+    Outbox form of KafkaProducer.emit_many (shared correlation_id, one executemany).
+    """
+    cid, cause = group_correlation(correlation_id)
+    envelopes, rows = [], []
+    for ev in events:
+        envelope = build_envelope(
+            event_type=ev.topic,
+            payload=ev.payload,
+            actor=ev.actor,
+            producer=producer_id,
+            correlation_id=ev.correlation_id or cid,
+            causation_id=ev.causation_id or (None if ev.correlation_id else cause),
+            tenant_id=ev.tenant_id,
+            schema_version=ev.schema_version,
+        )
+        envelopes.append(envelope)
+        rows.append(_outbox_row(envelope, ev.key_entity_id))
+    if rows:
+        await conn.execute(_INSERT_SQL, rows)
+    return envelopes
+
+
+# ---------------------------
+# Relay side
+# ---------------------------
+
+async def relay_once(
+    engine: AsyncEngine,
+    producer: KafkaProducer,
+    *,
+    batch_size: int = 500,
+    retry_delay_s: float = 5.0,
+) -> int:
+    """
+    Claim up to batch_size pending rows, publish them pipelined, mark them sent.
+    Returns the number of rows published (0 => nothing pending).
+    On a publish failure the claim is rolled back and the batch is pushed back by
+    retry_delay_s with attempts/last_error recorded; the error is re-raised.
+    """
+    async with engine.connect() as conn:
+        rows = (await conn.execute(_CLAIM_SQL, {"limit": batch_size})).all()
+        if not rows:
+            await conn.rollback()
+            return 0
+
+        ids = [r.outbox_id for r in rows]
+        try:
+            # envelope is stored already encoded; publish the bytes as-is
+            futures = [
+                await producer.send_encoded_async(
+                    r.topic,
+                    r.envelope.encode("utf-8"),
+                    key=r.message_key.encode("utf-8") if r.message_key else None,
+                )
+                for r in rows
+            ]
+            await asyncio.gather(*futures)
+        except Exception as e:
+            await conn.rollback()
+            async with engine.begin() as fail_conn:
+                await fail_conn.execute(_MARK_FAILED_SQL, {
+                    "ids": ids,
+                    "err": f"{type(e).__name__}: {e}"[:2000],
+                    "delay_s": retry_delay_s,
+                })
+            raise
+
+        await conn.execute(_MARK_SENT_SQL, {"ids": ids})
+        await conn.commit()
+        return len(ids)
+
+
+async def prune_published(engine: AsyncEngine, *, cutoff: datetime, batch_size: int = 5000) -> int:
+    """
+    Delete rows published before `cutoff`, batch_size rows per transaction so the
+    relay's claims never queue behind one large DELETE. Returns rows deleted.
+    """
+    total = 0
+    while True:
+        async with engine.begin() as conn:
+            res = await conn.execute(_DELETE_PUBLISHED_SQL, {"cutoff": cutoff, "batch": batch_size})
+        n = res.rowcount or 0
+        total += n
+        if n < batch_size:
+            return total
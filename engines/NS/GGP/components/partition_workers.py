@@ -0,0 +1,133 @@
+# components/partition_workers.py
+"""
+Partition-parallel processing for GGP consumers.
+
+One asyncio worker per assigned TopicPartition, each with a bounded queue of
+polled batches:
+- in-partition order is preserved (a worker handles its batches one at a time)
+- partitions no longer wait on each other (a slow write on p0 does not stall p1/p2)
+- offsets go through the runtime's CommitManager (begun on submit, completed
+  once the handler returns), so nothing past unfinished work is committed
+- a full queue pauses fetching for that partition only; it resumes once drained
+- on revocation the runtime drains the partition's worker (then cancels it past
+  the deadline) and its queue is dropped; an assignment starts a fresh worker, and
+  completions from a previous assignment are ignored, so a stale batch can never
+  move the committed offset
+
+Runs as a components.runtime dispatcher:
+  ConsumerRuntime(..., dispatcher=partition_parallel(handler, queue_size=4))
+so stop and revocation drain the workers (bounded by the runtime's deadline)
+before offsets are committed.
+
+Handler contract: `await handler(msgs)` for a list of records from one partition,
+in offset order. It must only return once every record is durably handled
+(written or DLQ'd); raising stops the consumer without committing that batch.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from typing import TYPE_CHECKING, Awaitable, Callable, Dict, Iterable, List, Optional
+
+from aiokafka import AIOKafkaConsumer, TopicPartition
+
+from components.commits import CommitManager
+
+if TYPE_CHECKING:
+    from components.runtime import ConsumerRuntime
+
+BatchHandler = Callable[[List], Awaitable[None]]
+
+
+class PartitionWorkerPool:
+    def __init__(
+        self,
+        consumer: AIOKafkaConsumer,
+        handler: BatchHandler,
+        commits: CommitManager,
+        *,
+        queue_size: int = 4,
+    ) -> None:
+        self.consumer = consumer
+        self.handler = handler
+        self.commits = commits
+        self.queue_size = max(1, queue_size)
+        self._queues: Dict[TopicPartition, asyncio.Queue] = {}
+        self._workers: Dict[TopicPartition, asyncio.Task] = {}
+        self._paused: set = set()
+        self._failure: Optional[BaseException] = None
+
+    async def submit(self, tp: TopicPartition, msgs: List) -> None:
+        """
+        Hand a polled batch to the partition's worker (never blocks the fetch loop).
+        """
+        q = self._queues.get(tp)
+        if q is None:
+            q = self._start(tp)
+        q.put_nowait((msgs, self.commits.begin_batch(tp, msgs)))
+        if q.qsize() >= self.queue_size and tp not in self._paused:
+            self.consumer.pause(tp)
+            self._paused.add(tp)
+
+    def _start(self, tp: TopicPartition) -> asyncio.Queue:
+        q: asyncio.Queue = asyncio.Queue()
+        self._queues[tp] = q
+        self._workers[tp] = asyncio.create_task(self._run(tp, q), name=f"partition-worker:{tp.topic}:{tp.partition}")
+        return q
+
+    def raise_if_failed(self) -> None:
+        if self._failure is not None:
+            raise self._failure
+
+    def assign(self, partitions: Iterable[TopicPartition]) -> None:
+        """Fresh worker and queue per newly assigned partition (revoked ones were cancelled)."""
+        for tp in partitions:
+            if tp not in self._workers:
+                self._start(tp)
+
+    async def _run(self, tp: TopicPartition, q: asyncio.Queue) -> None:
+        try:
+            while True:
+                msgs, tracker = await q.get()
+                try:
+                    await self.handler(msgs)
+                    self.commits.complete_batch(tp, msgs, tracker)
+                finally:
+                    q.task_done()
+                if tp in self._paused and q.qsize() < self.queue_size:
+                    self._paused.discard(tp)
+                    if tp in self.consumer.assignment():
+                        self.consumer.resume(tp)
+        except asyncio.CancelledError:
+            raise
+        except BaseException as e:
+            self._failure = e
+
+    async def drain(self, partitions: Optional[Iterable[TopicPartition]] = None) -> None:
+        """Wait until the workers of `partitions` (default all) have emptied their queues."""
+        for tp in list(partitions if partitions is not None else self._queues):
+            q, worker = self._queues.get(tp), self._workers.get(tp)
+            if q is None or worker is None:
+                continue
+            joined = asyncio.create_task(q.join())
+            try:
+                # a failed worker stops taking from its queue: don't wait on it forever
+                await asyncio.wait({joined, worker}, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                joined.cancel()
+
+    async def cancel(self, partitions: Optional[Iterable[TopicPartition]] = None) -> None:
+        """Stop the workers of `partitions` (default all) and drop their queued batches."""
+        targets = list(partitions if partitions is not None else self._workers)
+        tasks = [self._workers.pop(tp) for tp in targets if tp in self._workers]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for tp in targets:
+            self._queues.pop(tp, None)
+            self._paused.discard(tp)
+
+
+def partition_parallel(handler: BatchHandler, *, queue_size: int = 4) -> Callable[["ConsumerRuntime"], PartitionWorkerPool]:
+    """Dispatcher factory for ConsumerRuntime(dispatcher=...)."""
+    return lambda runtime: PartitionWorkerPool(runtime.consumer, handler, runtime.commits, queue_size=queue_size)
@@ -1,10 +1,12 @@
 from __future__ import annotations
 from dataclasses import dataclass
-from typing import Optional
+from typing import List, Optional, Sequence, Set, Tuple
 from uuid import UUID
 
 from sqlalchemy import text
-from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from components.dedup_cache import RecentEventCache
 
 @dataclass(frozen=True)
 class KafkaMeta:
@@ -12,32 +14,159 @@ class KafkaMeta:
     partition: Optional[int] = None
     offset: Optional[int] = None
 
+_MARK_ONE_SQL = text("""
+    INSERT INTO consumer_processed_event
+      (consumer_group, event_id, event_type, kafka_topic, kafka_partition, kafka_offset)
+    VALUES
+      (:cg, :eid, :etype, :topic, :part, :offs)
+    ON CONFLICT (consumer_group, event_id) DO NOTHING
+""")
+
+_MARK_MANY_SQL = text("""
+    INSERT INTO consumer_processed_event
+      (consumer_group, event_id, event_type, kafka_topic, kafka_partition, kafka_offset)
+    SELECT :cg, t.eid, t.etype, t.topic, t.part, t.offs
+    FROM unnest(
+      CAST(:eids AS uuid[]),
+      CAST(:etypes AS text[]),
+      CAST(:topics AS text[]),
+      CAST(:parts AS int[]),
+      CAST(:offs AS bigint[])
+    ) AS t(eid, etype, topic, part, offs)
+    ON CONFLICT (consumer_group, event_id) DO NOTHING
+    RETURNING event_id
+""")
+
+# ---------------------------
+# Transactional sink API
+# ---------------------------
+# These run on a caller-owned connection so the ledger insert and the domain
+# write share one transaction (one commit). If the domain write fails and the
+# caller rolls back, the ledger row goes with it.
+#
+# Optional `cache` (RecentEventCache): known duplicates are answered without a
+# round trip, and ids the ledger reports as duplicates are remembered. Newly
+# inserted ids are NOT cached here because the caller's transaction may still
+# roll back; callers add them with cache.add()/add_many() after commit.
+
+async def mark_processed(
+    conn: AsyncConnection,
+    consumer_group: str,
+    event_id: UUID,
+    event_type: str,
+    meta: KafkaMeta,
+    *,
+    cache: Optional[RecentEventCache] = None,
+) -> bool:
+    """
+    Ledger insert inside the caller's transaction.
+    Returns True if inserted (new event for this consumer group),
+    False if already processed.
+    """
+    if cache is not None and cache.seen(event_id):
+        return False
+    res = await conn.execute(_MARK_ONE_SQL, {
+        "cg": consumer_group,
+        "eid": str(event_id),
+        "etype": event_type,
+        "topic": meta.topic,
+        "part": meta.partition,
+        "offs": meta.offset,
+    })
+    # rowcount is 1 if inserted, 0 if conflict (for many DBs/drivers)
+    inserted = (res.rowcount or 0) == 1
+    if cache is not None and not inserted:
+        cache.add(event_id)
+    return inserted
+
+async def mark_processed_many(
+    conn: AsyncConnection,
+    consumer_group: str,
+    items: Sequence[Tuple[UUID, str, KafkaMeta]],
+    *,
+    cache: Optional[RecentEventCache] = None,
+) -> Set[UUID]:
+    """
+    Batch ledger insert inside the caller's transaction: one statement, one round trip.
+    items: (event_id, event_type, meta) per polled event.
+
+    Returns the set of event_ids that were newly inserted for this consumer group.
+    An event_id repeated within the same batch is inserted once; callers should
+    treat only its first occurrence as new (e.g. discard from the set once handled).
+    """
+    if not items:
+        return set()
+
+    seen: Set[UUID] = set()
+    ids: List[UUID] = []
+    eids, etypes, topics, parts, offs = [], [], [], [], []
+    for event_id, event_type, meta in items:
+        if event_id in seen:
+            continue
+        seen.add(event_id)
+        if cache is not None and cache.seen(event_id):
+            continue
+        ids.append(event_id)
+        eids.append(str(event_id))
+        etypes.append(event_type)
+        topics.append(meta.topic)
+        parts.append(meta.partition)
+        offs.append(meta.offset)
+
+    if not eids:
+        return set()
+
+    res = await conn.execute(_MARK_MANY_SQL, {
+        "cg": consumer_group,
+        "eids": eids,
+        "etypes": etypes,
+        "topics": topics,
+        "parts": parts,
+        "offs": offs,
+    })
+    # normalize driver UUID types so membership checks against envelope ids work
+    inserted = {UUID(str(row[0])) for row in res}
+    if cache is not None:
+        cache.add_many(eid for eid in ids if eid not in inserted)
+    return inserted
+
+# ---------------------------
+# Standalone gate (own transaction)
+# ---------------------------
+
 async def try_mark_processed(
     engine: AsyncEngine,
     consumer_group: str,
     event_id: UUID,
     event_type: str,
     meta: KafkaMeta,
+    *,
+    cache: Optional[RecentEventCache] = None,
 ) -> bool:
     """
     Returns True if inserted (new event for this consumer group),
     False if already processed.
     """
-    sql = text("""
-        INSERT INTO consumer_processed_event
-          (consumer_group, event_id, event_type, kafka_topic, kafka_partition, kafka_offset)
-        VALUES
-          (:cg, :eid, :etype, :topic, :part, :offs)
-        ON CONFLICT (consumer_group, event_id) DO NOTHING
-    """)
     async with engine.begin() as conn:
-        res = await conn.execute(sql, {
-            "cg": consumer_group,
-            "eid": str(event_id),
-            "etype": event_type,
-            "topic": meta.topic,
-            "part": meta.partition,
-            "offs": meta.offset,
-        })
-        # rowcount is 1 if inserted, 0 if conflict (for many DBs/drivers)
-        return (res.rowcount or 0) == 1
\ No newline at end of file
+        inserted = await mark_processed(conn, consumer_group, event_id, event_type, meta, cache=cache)
+    if cache is not None and inserted:
+        cache.add(event_id)
+    return inserted
+
+async def try_mark_processed_many(
+    engine: AsyncEngine,
+    consumer_group: str,
+    items: Sequence[Tuple[UUID, str, KafkaMeta]],
+    *,
+    cache: Optional[RecentEventCache] = None,
+) -> Set[UUID]:
+    """
+    Batch form of try_mark_processed; see mark_processed_many.
+    """
+    if not items:
+        return set()
+    async with engine.begin() as conn:
+        inserted = await mark_processed_many(conn, consumer_group, items, cache=cache)
+    if cache is not None:
+        cache.add_many(inserted)
+    return inserted
@@ -0,0 +1,222 @@
+# components/retry_tiers.py
+"""
+Non-blocking retry tiers for GGP consumers.
+
+A record that fails with a transient error is not retried in-line (which stalls
+every partition behind it). It is re-published to the next retry tier topic with
+a not-before timestamp, its offset is committed, and the main stream moves on.
+A separate retry consumer drains the tier topics and only hands a record back to
+the handler once it is due. After the last tier the record goes to the DLQ.
+
+  main topic --fail--> retry.5s --fail--> retry.1m --fail--> retry.10m --fail--> DLQ
+
+Retry records carry the original envelope bytes as value and the original key,
+plus these headers:
+  ggp-retry-attempt     retries already scheduled for this record (1 on the first tier)
+  ggp-retry-not-before  epoch ms before which the record must not be handled
+  ggp-retry-source      original topic:partition:offset (kept across tiers)
+  ggp-retry-error       last error, truncated
+
+The retry consumer runs under components.runtime.ConsumerRuntime with
+retry_dispatcher(): offsets go through its CommitManager (assignment-filtered,
+drained and committed on revocation and shutdown), and a partition paused for a
+not-yet-due record is forgotten when it is revoked.
+
+Trade-off: a retried record is applied after later records for the same key.
+Read-model upserts are idempotent but not commutative, so this has the same
+ordering caveat as a DLQ replay.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from aiokafka import AIOKafkaConsumer, AIOKafkaProducer, TopicPartition
+
+from components.commits import CommitManager
+from components.pg_idempotency import KafkaMeta
+
+if TYPE_CHECKING:
+    from components.runtime import ConsumerRuntime
+
+HEADER_ATTEMPT = "ggp-retry-attempt"
+HEADER_NOT_BEFORE = "ggp-retry-not-before"
+HEADER_SOURCE = "ggp-retry-source"
+HEADER_ERROR = "ggp-retry-error"
+
+
+@dataclass(frozen=True)
+class RetryTier:
+    topic: str
+    delay_ms: int
+
+
+@dataclass(frozen=True)
+class RetryInfo:
+    attempt: int
+    not_before_ms: int
+    source: KafkaMeta
+
+
+def tiers_from(pairs: Sequence[Tuple[str, int]]) -> Tuple[RetryTier, ...]:
+    """(topic, delay_ms) pairs from core/topics.py -> RetryTier tuple, in order."""
+    return tuple(RetryTier(topic=t, delay_ms=d) for t, d in pairs)
+
+
+def read_retry_info(msg) -> RetryInfo:
+    """
+    Retry headers of a consumed record. Records without them (main stream) report
+    attempt 0, due immediately, with the record's own coordinates as source.
+    """
+    headers = dict(msg.headers or ())
+    source = KafkaMeta(topic=msg.topic, partition=msg.partition, offset=msg.offset)
+    raw_source = headers.get(HEADER_SOURCE)
+    if raw_source:
+        topic, partition, offset = raw_source.decode("utf-8").rsplit(":", 2)
+        source = KafkaMeta(topic=topic, partition=int(partition), offset=int(offset))
+    return RetryInfo(
+        attempt=int(headers.get(HEADER_ATTEMPT, b"0")),
+        not_before_ms=int(headers.get(HEADER_NOT_BEFORE, b"0")),
+        source=source,
+    )
+
+
+async def send_to_retry(
+    producer: AIOKafkaProducer,
+    tiers: Sequence[RetryTier],
+    value: bytes,
+    *,
+    key: Optional[bytes],
+    attempt: int,
+    source: KafkaMeta,
+    err: Exception,
+    now_ms: Optional[int] = None,
+) -> Optional["asyncio.Future"]:
+    """
+    Enqueue `value` on the tier after `attempt` retries (0 => first tier).
+    Returns the delivery future, or None when every tier is used up (caller DLQs).
+    """
+    if attempt >= len(tiers):
+        return None
+    tier = tiers[attempt]
+    now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+    headers = [
+        (HEADER_ATTEMPT, str(attempt + 1).encode("utf-8")),
+        (HEADER_NOT_BEFORE, str(now_ms + tier.delay_ms).encode("utf-8")),
+        (HEADER_SOURCE, f"{source.topic}:{source.partition}:{source.offset}".encode("utf-8")),
+        (HEADER_ERROR, f"{type(err).__name__}: {err}"[:500].encode("utf-8")),
+    ]
+    return await producer.send(tier.topic, value, key=key, headers=headers)
+
+
+class PendingDeliveries:
+    """
+    Producer futures collected while handling a batch (DLQ + retry sends).
+    Records are enqueued without waiting; flush() awaits them together, so a batch
+    with many failures costs one broker round trip instead of one per failure.
+    Callers flush before committing offsets.
+    """
+
+    def __init__(self) -> None:
+        self._futures: List["asyncio.Future"] = []
+
+    def add(self, fut: Optional["asyncio.Future"]) -> None:
+        if fut is not None:
+            self._futures.append(fut)
+
+    def __len__(self) -> int:
+        return len(self._futures)
+
+    async def flush(self) -> None:
+        if not self._futures:
+            return
+        futures, self._futures = self._futures, []
+        await asyncio.gather(*futures)
+
+
+RetryHandler = Callable[[object, RetryInfo], Awaitable[None]]
+
+
+class RetryDispatcher:
+    """
+    Runtime dispatcher for retry tier topics, honouring each record's not-before timestamp.
+
+    Every record on a tier topic was produced with the same delay, so not-before is
+    (near) monotonic within a partition: when the next record is not due, the
+    partition is rewound to it and paused until it is; other partitions and tiers
+    keep flowing. Due records are handled in the fetch loop, one at a time;
+    `await handler(msg, info)` must durably handle the record (applied,
+    re-scheduled or DLQ'd) before returning.
+    """
+
+    def __init__(
+        self,
+        consumer: AIOKafkaConsumer,
+        handler: RetryHandler,
+        commits: CommitManager,
+        *,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.consumer = consumer
+        self.handler = handler
+        self.commits = commits
+        self.clock = clock
+        self._resume: Dict[TopicPartition, asyncio.TimerHandle] = {}
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    async def submit(self, tp: TopicPartition, msgs: List) -> None:
+        self._idle.clear()
+        try:
+            for msg in msgs:
+                info = read_retry_info(msg)
+                wait_s = info.not_before_ms / 1000 - self.clock()
+                if wait_s > 0:
+                    self._pause(tp, msg.offset, wait_s)
+                    return
+                tracker = self.commits.begin(tp, msg.offset)
+                await self.handler(msg, info)
+                self.commits.complete(tp, msg.offset, tracker)
+        finally:
+            self._idle.set()
+
+    def _pause(self, tp: TopicPartition, offset: int, wait_s: float) -> None:
+        self.consumer.seek(tp, offset)
+        self.consumer.pause(tp)
+        handle = self._resume.pop(tp, None)
+        if handle is not None:
+            handle.cancel()
+        self._resume[tp] = asyncio.get_running_loop().call_later(wait_s, self._due, tp)
+
+    def _due(self, tp: TopicPartition) -> None:
+        del self._resume[tp]
+        if tp in self.consumer.assignment():
+            self.consumer.resume(tp)
+
+    async def drain(self, partitions: Optional[Iterable[TopicPartition]] = None) -> None:
+        await self._idle.wait()
+
+    async def cancel(self, partitions: Optional[Iterable[TopicPartition]] = None) -> None:
+        # revoked (or shutting down): the next owner starts unpaused at the last commit
+        for tp in list(self._resume if partitions is None else partitions):
+            handle = self._resume.pop(tp, None)
+            if handle is not None:
+                handle.cancel()
+
+    def assign(self, partitions: Iterable[TopicPartition]) -> None:
+        return None
+
+    def raise_if_failed(self) -> None:
+        return None
+
+
+def retry_dispatcher(
+    handler: RetryHandler,
+    *,
+    clock: Callable[[], float] = time.time,
+) -> Callable[["ConsumerRuntime"], RetryDispatcher]:
+    """Dispatcher factory for ConsumerRuntime(dispatcher=...) over the tier topics."""
+    return lambda runtime: RetryDispatcher(runtime.consumer, handler, runtime.commits, clock=clock)
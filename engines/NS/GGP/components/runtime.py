@@ -0,0 +1,256 @@
+# components/runtime.py
+"""
+Shared consumer runtime for GGP services: fetch loop, commits, rebalances and
+shutdown in one place, so a service only supplies how records are handled.
+
+ConsumerRuntime owns:
+- the consumer (components.kafka.make_consumer, subscribed with a rebalance listener)
+- the fetch loop: getmany() -> committed-watermark filter (optional) ->
+  dispatcher.submit(tp, msgs) per partition batch
+- offsets: dispatchers begin/complete records on the runtime's CommitManager,
+  which commits every_n / interval_s, on revocation and on shutdown
+- SIGTERM/SIGINT: stop fetching, drain dispatched work (bounded by
+  drain_timeout_s, then cancelled), commit, then leave the group (consumer.stop())
+- partition revocation: drain the revoked partitions' work (same deadline), then
+  commit them before they move, so the next owner starts where this one stopped
+
+Dispatchers decide where handlers run:
+- InlineDispatcher (default): `await handler(msgs)` in the fetch loop itself
+- components.partition_workers.partition_parallel: one worker per partition
+- components.keyed_executor.key_parallel: per message key, concurrently
+Each implements the Dispatcher protocol below; the runtime never commits past
+a record its dispatcher has not completed.
+
+Handler contract (all dispatchers): return only once every record is durably
+handled (written, skipped as duplicate, or DLQ'd). Raising stops the runtime
+without committing those records.
+
+The work redelivered on a deploy or rebalance is therefore what overran the
+drain deadline (if any), instead of everything since the last commit.
+
+Env:
+  CONSUMER_DRAIN_TIMEOUT_S=20   keep below the orchestrator's termination grace period
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import signal
+from typing import Any, Awaitable, Callable, Iterable, List, Optional, Protocol
+
+from aiokafka import AIOKafkaConsumer, ConsumerRebalanceListener, TopicPartition
+
+from components.commits import CommitManager
+from components.kafka import KAFKA_BOOTSTRAP_SERVERS, make_consumer
+from components.offsets import CommittedWatermarks
+from core import codec
+
+log = logging.getLogger("ggp.runtime")
+
+DRAIN_TIMEOUT_S = float(os.getenv("CONSUMER_DRAIN_TIMEOUT_S", "20"))
+
+BatchHandler = Callable[[List], Awaitable[None]]
+
+
+class Dispatcher(Protocol):
+    async def submit(self, tp: TopicPartition, msgs: List) -> None:
+        """Take a batch of one partition (offset order); may wait for backpressure."""
+
+    async def drain(self, partitions: Optional[Iterable[TopicPartition]] = None) -> None:
+        """Wait until submitted work (of `partitions`, default all) has finished."""
+
+    async def cancel(self, partitions: Optional[Iterable[TopicPartition]] = None) -> None:
+        """Cancel unfinished work (of `partitions`) and forget those partitions."""
+
+    def assign(self, partitions: Iterable[TopicPartition]) -> None:
+        """Partitions were (re)assigned to this member."""
+
+    def raise_if_failed(self) -> None:
+        """Re-raise a handler failure from background work."""
+
+
+DispatcherFactory = Callable[["ConsumerRuntime"], Dispatcher]
+
+
+class InlineDispatcher:
+    """Runs the batch handler in the fetch loop: one batch at a time, in poll order."""
+
+    def __init__(self, handler: BatchHandler, commits: CommitManager) -> None:
+        self.handler = handler
+        self.commits = commits
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    async def submit(self, tp: TopicPartition, msgs: List) -> None:
+        tracker = self.commits.begin_batch(tp, msgs)
+        self._idle.clear()
+        try:
+            await self.handler(msgs)
+        finally:
+            self._idle.set()
+        self.commits.complete_batch(tp, msgs, tracker)
+
+    async def drain(self, partitions: Optional[Iterable[TopicPartition]] = None) -> None:
+        await self._idle.wait()
+
+    async def cancel(self, partitions: Optional[Iterable[TopicPartition]] = None) -> None:
+        # the batch runs in the fetch task itself; run() cancels that task on its deadline
+        return None
+
+    def assign(self, partitions: Iterable[TopicPartition]) -> None:
+        return None
+
+    def raise_if_failed(self) -> None:
+        return None
+
+
+class ConsumerRuntime:
+    def __init__(
+        self,
+        *,
+        topics: Iterable[str],
+        group_id: str,
+        handler: Optional[BatchHandler] = None,
+        dispatcher: Optional[DispatcherFactory] = None,
+        bootstrap_servers: str = KAFKA_BOOTSTRAP_SERVERS,
+        value_deserializer: Callable[[bytes], Any] = codec.loads,
+        max_records: int = 500,
+        max_wait_ms: int = 200,
+        drain_timeout_s: float = DRAIN_TIMEOUT_S,
+        watermark_fastpath: bool = False,
+        commit_timer=None,
+        consumer: Optional[AIOKafkaConsumer] = None,
+    ) -> None:
+        """
+        handler: batch handler for the default InlineDispatcher; dispatcher: a factory
+        (called with this runtime) for a parallel one instead. One of them is required.
+        commit_timer: optional histogram child (components.metrics) for commit round trips.
+        consumer: use an already configured (and subscribed/assigned) consumer instead
+        of make_consumer; its revocations are then not drained.
+        """
+        if (handler is None) == (dispatcher is None):
+            raise ValueError("pass exactly one of handler / dispatcher")
+        self.max_records = max_records
+        self.max_wait_ms = max_wait_ms
+        self.drain_timeout_s = drain_timeout_s
+        self.consumer = consumer or make_consumer(
+            topics=topics,
+            group_id=group_id,
+            bootstrap_servers=bootstrap_servers,
+            value_deserializer=value_deserializer,
+            listener=_DrainOnRevoke(self),
+        )
+        self.watermarks = CommittedWatermarks(self.consumer) if watermark_fastpath else None
+        self.commits = CommitManager(
+            self.consumer,
+            on_commit=self.watermarks.advance if self.watermarks else None,
+            timer=commit_timer,
+        )
+        self.dispatcher: Dispatcher = dispatcher(self) if dispatcher else InlineDispatcher(handler, self.commits)
+        self._stopping = asyncio.Event()
+        self._revoked: set = set()  # revoked, not yet reassigned: fetched records are skipped
+
+    # --- lifecycle ---
+
+    def stop(self) -> None:
+        """Request a graceful stop (idempotent; safe from a signal handler)."""
+        if not self._stopping.is_set():
+            log.info("consumer stop requested; draining")
+            self._stopping.set()
+
+    @property
+    def stopping(self) -> bool:
+        return self._stopping.is_set()
+
+    def install_signal_handlers(self, signals: Iterable[int] = (signal.SIGTERM, signal.SIGINT)) -> None:
+        loop = asyncio.get_running_loop()
+        for sig in signals:
+            try:
+                loop.add_signal_handler(sig, self.stop)
+            except (NotImplementedError, RuntimeError):
+                pass  # not on the main thread / platform without signal support
+
+    async def run(self, *, handle_signals: bool = True) -> None:
+        """
+        Start the consumer and run until stop() (or a signal), then drain, commit and
+        leave the group. Handler failures propagate after the final commit of
+        completed work.
+        """
+        await self.consumer.start()
+        if handle_signals:
+            self.install_signal_handlers()
+        loop = asyncio.get_running_loop()
+        commit_task = asyncio.create_task(self.commits.run_interval())
+        fetch = asyncio.create_task(self._fetch_loop())
+        stop_wait = asyncio.create_task(self._stopping.wait())
+        deadline = None
+        try:
+            await asyncio.wait({fetch, stop_wait}, return_when=asyncio.FIRST_COMPLETED)
+            if not fetch.done():
+                # the fetch loop exits at the next batch boundary
+                deadline = loop.time() + self.drain_timeout_s
+                done, _ = await asyncio.wait({fetch}, timeout=self.drain_timeout_s)
+                if not done:
+                    log.warning("drain deadline (%.1fs) exceeded; in-flight batch will be redelivered", self.drain_timeout_s)
+                    fetch.cancel()
+                await asyncio.gather(fetch, return_exceptions=True)
+                if fetch.cancelled():
+                    return
+            fetch.result()
+        finally:
+            stop_wait.cancel()
+            commit_task.cancel()
+            remaining = self.drain_timeout_s if deadline is None else deadline - loop.time()
+            await self._drain(None, remaining)
+            await self.commits.close()
+            await self.consumer.stop()  # leaves the group: partitions reassign without a session timeout
+
+    async def _drain(self, partitions: Optional[List[TopicPartition]], timeout: float) -> None:
+        """Let dispatched work finish within `timeout`, then cancel what is left."""
+        try:
+            await asyncio.wait_for(self.dispatcher.drain(partitions), max(0.0, timeout))
+        except asyncio.TimeoutError:
+            log.warning("drain deadline exceeded; unfinished records will be redelivered")
+        await self.dispatcher.cancel(partitions)
+
+    # --- fetch loop ---
+
+    async def _fetch_loop(self) -> None:
+        consumer, dispatcher = self.consumer, self.dispatcher
+        while not self._stopping.is_set():
+            batches = await consumer.getmany(timeout_ms=self.max_wait_ms, max_records=self.max_records)
+            dispatcher.raise_if_failed()
+            for tp, msgs in batches.items():
+                if self._stopping.is_set():
+                    break  # not started: left for the next owner, no duplicate work
+                if tp in self._revoked or tp not in consumer.assignment():
+                    continue  # revoked since the fetch
+                if self.watermarks is not None:
+                    msgs = await self.watermarks.filter_new(tp, msgs)
+                if msgs:
+                    await dispatcher.submit(tp, msgs)
+            await self.commits.maybe_commit()
+        dispatcher.raise_if_failed()
+
+    async def _revoke(self, revoked: Iterable[TopicPartition]) -> None:
+        revoked = list(revoked)
+        self._revoked.update(revoked)
+        await self._drain(revoked, self.drain_timeout_s)
+        await self.commits.revoke(revoked)
+
+    def _assign(self, assigned: Iterable[TopicPartition]) -> None:
+        self._revoked.clear()
+        self.dispatcher.assign(assigned)
+
+
+class _DrainOnRevoke(ConsumerRebalanceListener):
+    def __init__(self, runtime: ConsumerRuntime) -> None:
+        self._runtime = runtime
+
+    async def on_partitions_revoked(self, revoked) -> None:
+        await self._runtime._revoke(revoked)
+
+    async def on_partitions_assigned(self, assigned) -> None:
+        self._runtime._assign(assigned)
@@ -0,0 +1,40 @@
+# core/codec.py
+# JSON decoding used on the Kafka hot path.
+# Uses orjson or msgspec when installed (both decode straight from bytes), otherwise stdlib json.
+# GGP_JSON_BACKEND=orjson|msgspec|json forces a backend (falls back to json if unavailable).
+#
+# Note: orjson/msgspec reject NaN/Infinity literals, which stdlib json accepts; envelopes never carry them.
+
+from __future__ import annotations
+
+import json
+import os
+from typing import Any, Callable
+
+ENCODING = "utf-8"
+
+
+def _stdlib_loads(b: bytes) -> Any:
+    return json.loads(b.decode(ENCODING))
+
+
+def _select_backend() -> tuple[str, Callable[[bytes], Any]]:
+    wanted = os.getenv("GGP_JSON_BACKEND", "").strip().lower()
+    order = [wanted] if wanted else ["orjson", "msgspec"]
+    for name in order:
+        if name == "orjson":
+            try:
+                import orjson
+            except ImportError:
+                continue
+            return name, orjson.loads
+        if name == "msgspec":
+            try:
+                import msgspec
+            except ImportError:
+                continue
+            return name, msgspec.json.decode
+    return "json", _stdlib_loads
+
+
+BACKEND, loads = _select_backend()
@@ -0,0 +1,48 @@
+# core/context.py
+# Request-scoped correlation context, carried in a ContextVar.
+# Set by middleware.correlation.CorrelationIdMiddleware for the duration of a request
+# (and inherited by tasks it spawns); read by components.kafka.build_envelope and
+# CorrelationLogFilter, so correlation ids need not be threaded through every call.
+
+from __future__ import annotations
+
+import logging
+from contextvars import ContextVar, Token
+from dataclasses import dataclass
+from typing import Optional
+from uuid import UUID
+
+
+@dataclass(frozen=True)
+class CorrelationContext:
+    correlation_id: UUID
+    causation_id: Optional[UUID] = None
+
+
+_current: ContextVar[Optional[CorrelationContext]] = ContextVar("ggp_correlation", default=None)
+
+
+def current_correlation() -> Optional[CorrelationContext]:
+    return _current.get()
+
+
+def current_correlation_id() -> Optional[UUID]:
+    ctx = _current.get()
+    return ctx.correlation_id if ctx is not None else None
+
+
+def set_correlation(ctx: Optional[CorrelationContext]) -> Token:
+    return _current.set(ctx)
+
+
+def reset_correlation(token: Token) -> None:
+    _current.reset(token)
+
+
+class CorrelationLogFilter(logging.Filter):
+    """Adds record.correlation_id ("-" outside a request) for use in log formats."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        ctx = _current.get()
+        record.correlation_id = str(ctx.correlation_id) if ctx is not None else "-"
+        return True
@@ -1,16 +1,18 @@
 from __future__ import annotations
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Any, Dict, Optional
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Union
 from uuid import UUID
 
-@dataclass(frozen=True)
+
+@dataclass(frozen=True, slots=True)
 class Actor:
     type: str
     id: str
     display: Optional[str] = None
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class EventEnvelope:
     event_id: UUID
     event_type: str
@@ -27,28 +29,61 @@ REQUIRED_TOP_LEVEL = {
     "event_id", "event_type", "occurred_at", "producer",
     "correlation_id", "schema_version", "payload", "actor"
 }
+_REQUIRED_ORDER = tuple(sorted(REQUIRED_TOP_LEVEL))
 
-def parse_envelope(obj: Dict[str, Any]) -> EventEnvelope:
-    missing = REQUIRED_TOP_LEVEL - set(obj.keys())
-    if missing:
-        raise ValueError(f"Missing envelope fields: {sorted(missing)}")
+def _parse_ts(value: str) -> datetime:
+    # accept ISO8601 Z; keep it simple. Deliberately the original parse: it defines
+    # the accepted set, and a guarded native-Z path on 3.11+ measured no faster.
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+@lru_cache(maxsize=4096)
+def _interned_actor(type_: str, id_: str, display: Optional[str]) -> Actor:
+    # a handful of services/users emit most events; Actor is immutable so instances are shared
+    return Actor(type=type_, id=id_, display=display)
 
-    actor = obj["actor"]
+def _make_actor(actor: Any) -> Actor:
     if not isinstance(actor, dict) or "type" not in actor or "id" not in actor:
         raise ValueError("Invalid actor shape")
+    display = actor.get("display")
+    if display is None or type(display) is str:
+        return _interned_actor(str(actor["type"]), str(actor["id"]), display)
+    return Actor(type=str(actor["type"]), id=str(actor["id"]), display=display)
 
-    # parse (accept ISO8601 Z; keep it simple)
-    occurred_at = datetime.fromisoformat(obj["occurred_at"].replace("Z", "+00:00"))
+def parse_envelope(obj: Dict[str, Any]) -> EventEnvelope:
+    if not isinstance(obj, dict):
+        raise ValueError("Envelope must be a JSON object")
+    for key in _REQUIRED_ORDER:
+        if key not in obj:
+            missing = [k for k in _REQUIRED_ORDER if k not in obj]
+            raise ValueError(f"Missing envelope fields: {missing}")
+
+    actor = _make_actor(obj["actor"])
+    causation_id = obj.get("causation_id")
 
     return EventEnvelope(
-        event_id=UUID(obj["event_id"]),
-        event_type=str(obj["event_type"]),
-        occurred_at=occurred_at,
-        producer=str(obj["producer"]),
-        correlation_id=UUID(obj["correlation_id"]),
-        causation_id=UUID(obj["causation_id"]) if obj.get("causation_id") else None,
-        actor=Actor(type=str(actor["type"]), id=str(actor["id"]), display=actor.get("display")),
-        tenant_id=obj.get("tenant_id"),
-        schema_version=int(obj["schema_version"]),
-        payload=obj["payload"],
-    )
\ No newline at end of file
+        UUID(obj["event_id"]),
+        str(obj["event_type"]),
+        _parse_ts(obj["occurred_at"]),
+        str(obj["producer"]),
+        UUID(obj["correlation_id"]),
+        UUID(causation_id) if causation_id else None,
+        actor,
+        obj.get("tenant_id"),
+        int(obj["schema_version"]),
+        obj["payload"],
+    )
+
+def parse_envelopes(objs: Iterable[Dict[str, Any]]) -> List[Union[EventEnvelope, Exception]]:
+    """
+    Batch entry point: one result per input, in order.
+    Each result is either the parsed EventEnvelope or the exception parse_envelope raised,
+    so callers can DLQ bad records individually without aborting the batch.
+    """
+    out: List[Union[EventEnvelope, Exception]] = []
+    append = out.append
+    for obj in objs:
+        try:
+            append(parse_envelope(obj))
+        except Exception as e:
+            append(e)
+    return out
@@ -13,6 +13,7 @@ from __future__ import annotations
 # Domain events: ggp.<bounded_context>.<entity>.<event>
 # Commands:      ggp.<bounded_context>.command.<command_name>
 # DLQ:           ggp.<bounded_context>.dlq.<consumer_or_topic>
+# Retry tiers:   ggp.<bounded_context>.retry.<consumer>.<delay>
 #
 # Slice #1 currently uses: ggp.core.*
 
@@ -28,12 +29,18 @@ CORE_SOP_RETIRED: str = "ggp.core.sop.retired"  # reserved for later
 CORE_DLQ_PROJECTION: str = "ggp.core.dlq.projection"
 CORE_DLQ_AUDIT: str = "ggp.core.dlq.audit"
 
+# Retry tiers (non-blocking retries; see components/retry_tiers.py)
+CORE_RETRY_PROJECTION_5S: str = "ggp.core.retry.projection.5s"
+CORE_RETRY_PROJECTION_1M: str = "ggp.core.retry.projection.1m"
+CORE_RETRY_PROJECTION_10M: str = "ggp.core.retry.projection.10m"
+
 
 # -------------------------
 # Consumer groups
 # -------------------------
 CG_PROJECTION_V1: str = "ggp-projection-v1"
 CG_AUDIT_V1: str = "ggp-audit-v1"
+CG_PROJECTION_RETRY_V1: str = "ggp-projection-retry-v1"
 
 
 # -------------------------
@@ -50,4 +57,13 @@ DLQ_TOPICS: tuple[str, ...] = (
     CORE_DLQ_AUDIT,
 )
 
-ALL_KNOWN_TOPICS: tuple[str, ...] = SLICE1_TOPICS + DLQ_TOPICS
\ No newline at end of file
+# (topic, delay_ms), in escalation order
+PROJECTION_RETRY_TIERS: tuple[tuple[str, int], ...] = (
+    (CORE_RETRY_PROJECTION_5S, 5_000),
+    (CORE_RETRY_PROJECTION_1M, 60_000),
+    (CORE_RETRY_PROJECTION_10M, 600_000),
+)
+
+RETRY_TOPICS: tuple[str, ...] = tuple(t for t, _ in PROJECTION_RETRY_TIERS)
+
+ALL_KNOWN_TOPICS: tuple[str, ...] = SLICE1_TOPICS + RETRY_TOPICS + DLQ_TOPICS
\ No newline at end of file
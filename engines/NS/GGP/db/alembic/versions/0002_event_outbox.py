@@ -0,0 +1,42 @@
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    # event_outbox (transactional outbox; written in the same transaction as the domain row,
+    # drained to Kafka by the outbox relay)
+    op.create_table(
+        "event_outbox",
+        sa.Column("outbox_id", sa.BigInteger(), sa.Identity(always=False), primary_key=True),
+        sa.Column("event_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("topic", sa.Text(), nullable=False),
+        sa.Column("message_key", sa.Text(), nullable=True),
+        # text, not jsonb: the relay publishes the stored bytes as-is, and jsonb would
+        # re-render them (key order, whitespace, number formatting)
+        sa.Column("envelope", sa.Text(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.text("now()")),
+        sa.Column("available_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.text("now()")),
+        sa.Column("published_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.UniqueConstraint("event_id", name="uq_event_outbox_event_id"),
+    )
+    # relay claim path: oldest unpublished rows first; stays small as rows get published
+    op.create_index(
+        "idx_event_outbox_pending",
+        "event_outbox",
+        ["outbox_id"],
+        postgresql_where=sa.text("published_at IS NULL"),
+    )
+    op.create_index("idx_event_outbox_published_at", "event_outbox", ["published_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("idx_event_outbox_published_at", table_name="event_outbox")
+    op.drop_index("idx_event_outbox_pending", table_name="event_outbox")
+    op.drop_table("event_outbox")
@@ -0,0 +1,128 @@
+from alembic import op
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+# audit_event becomes RANGE-partitioned by month on occurred_at (UTC month boundaries).
+# - partitions are named audit_event_pYYYY_MM; audit/partitions.py pre-creates future
+#   months and detaches/archives old ones
+# - occurred_at is indexed with BRIN (rows arrive in roughly time order, so a few
+#   hundred bytes per partition replace a B-tree that grew with the table)
+# - a Postgres primary key on a partitioned table must contain the partition key,
+#   so the PK is (event_id, occurred_at); writers use ON CONFLICT (event_id, occurred_at).
+#   Global event_id dedup is still enforced by consumer_processed_event.
+# - audit_event_default catches rows outside every month partition so an unexpected
+#   timestamp never fails the audit insert; the maintenance job reports it if non-empty.
+#
+# The copy from the old heap runs inside the migration transaction; on very large tables
+# run it in a maintenance window.
+
+MONTHS_AHEAD = 3
+
+_CREATE_PARTITIONS = """
+DO $$
+DECLARE
+  m date := date_trunc('month', coalesce((SELECT min(occurred_at) FROM audit_event_legacy), now()) AT TIME ZONE 'UTC')::date;
+  stop date := (date_trunc('month', now() AT TIME ZONE 'UTC') + interval '{months} months')::date;
+BEGIN
+  WHILE m <= stop LOOP
+    EXECUTE 'CREATE TABLE IF NOT EXISTS ' || quote_ident('audit_event_p' || to_char(m, 'YYYY_MM'))
+      || ' PARTITION OF audit_event FOR VALUES FROM ('
+      || quote_literal(m::text || ' 00:00:00+00') || ') TO ('
+      || quote_literal((m + interval '1 month')::date::text || ' 00:00:00+00') || ')';
+    m := (m + interval '1 month')::date;
+  END LOOP;
+END $$;
+"""
+
+def upgrade() -> None:
+    op.execute("ALTER TABLE audit_event RENAME TO audit_event_legacy;")
+    op.execute("ALTER INDEX idx_audit_event_occurred_at RENAME TO idx_audit_event_legacy_occurred_at;")
+    op.execute("ALTER INDEX idx_audit_event_type RENAME TO idx_audit_event_legacy_type;")
+    op.execute("ALTER INDEX idx_audit_event_correlation RENAME TO idx_audit_event_legacy_correlation;")
+
+    op.execute("""
+        CREATE TABLE audit_event (
+          event_id uuid NOT NULL,
+          event_type text NOT NULL,
+          occurred_at timestamptz NOT NULL,
+
+          producer text NOT NULL,
+          correlation_id uuid NOT NULL,
+          causation_id uuid NULL,
+
+          actor_type text NOT NULL,
+          actor_id text NOT NULL,
+          actor_display text NULL,
+
+          tenant_id text NULL,
+          schema_version integer NOT NULL,
+
+          payload jsonb NOT NULL,
+
+          kafka_topic text NULL,
+          kafka_partition integer NULL,
+          kafka_offset bigint NULL,
+
+          ingested_at timestamptz NOT NULL DEFAULT now(),
+
+          CONSTRAINT pk_audit_event PRIMARY KEY (event_id, occurred_at)
+        ) PARTITION BY RANGE (occurred_at);
+    """)
+    # partitioned indexes: created on every existing and future partition
+    op.execute("CREATE INDEX idx_audit_event_occurred_at_brin ON audit_event USING brin (occurred_at);")
+    op.execute("CREATE INDEX idx_audit_event_type ON audit_event (event_type);")
+    op.execute("CREATE INDEX idx_audit_event_correlation ON audit_event (correlation_id);")
+
+    op.execute(_CREATE_PARTITIONS.format(months=MONTHS_AHEAD))
+    op.execute("CREATE TABLE audit_event_default PARTITION OF audit_event DEFAULT;")
+
+    op.execute("""
+        INSERT INTO audit_event
+        SELECT event_id, event_type, occurred_at, producer, correlation_id, causation_id,
+               actor_type, actor_id, actor_display, tenant_id, schema_version, payload,
+               kafka_topic, kafka_partition, kafka_offset, ingested_at
+        FROM audit_event_legacy;
+    """)
+    op.execute("DROP TABLE audit_event_legacy;")
+
+
+def downgrade() -> None:
+    # back to a single heap (partitions detached/archived by the maintenance job are not restored)
+    op.execute("ALTER TABLE audit_event RENAME TO audit_event_partitioned;")
+    op.execute("ALTER INDEX idx_audit_event_type RENAME TO idx_audit_event_partitioned_type;")
+    op.execute("ALTER INDEX idx_audit_event_correlation RENAME TO idx_audit_event_partitioned_correlation;")
+    op.execute("""
+        CREATE TABLE audit_event (
+          event_id uuid PRIMARY KEY,
+          event_type text NOT NULL,
+          occurred_at timestamptz NOT NULL,
+          producer text NOT NULL,
+          correlation_id uuid NOT NULL,
+          causation_id uuid NULL,
+          actor_type text NOT NULL,
+          actor_id text NOT NULL,
+          actor_display text NULL,
+          tenant_id text NULL,
+          schema_version integer NOT NULL,
+          payload jsonb NOT NULL,
+          kafka_topic text NULL,
+          kafka_partition integer NULL,
+          kafka_offset bigint NULL,
+          ingested_at timestamptz NOT NULL DEFAULT now()
+        );
+    """)
+    op.execute("""
+        INSERT INTO audit_event
+        SELECT event_id, event_type, occurred_at, producer, correlation_id, causation_id,
+               actor_type, actor_id, actor_display, tenant_id, schema_version, payload,
+               kafka_topic, kafka_partition, kafka_offset, ingested_at
+        FROM audit_event_partitioned
+        ON CONFLICT (event_id) DO NOTHING;
+    """)
+    op.execute("DROP TABLE audit_event_partitioned;")
+    op.execute("CREATE INDEX idx_audit_event_occurred_at ON audit_event (occurred_at DESC);")
+    op.execute("CREATE INDEX idx_audit_event_type ON audit_event (event_type);")
+    op.execute("CREATE INDEX idx_audit_event_correlation ON audit_event (correlation_id);")
@@ -0,0 +1,40 @@
+from alembic import op
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+# NOTIFY ggp_audit_event for every INSERT statement on audit_event, with the
+# distinct correlation_ids of the rows it actually inserted (transition table, so
+# ON CONFLICT DO NOTHING rows are skipped), comma-separated in chunks of 200 to
+# stay under the 8000-byte payload limit. A batched audit insert sends one
+# notification per chunk instead of one per row. Notifications are delivered on
+# commit; the API's trace cache (api/trace.py) listens and drops the affected traces.
+
+def upgrade() -> None:
+    op.execute("""
+        CREATE OR REPLACE FUNCTION ggp_notify_audit_event() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+          PERFORM pg_notify('ggp_audit_event', string_agg(cid, ','))
+          FROM (
+            SELECT cid, (row_number() OVER () - 1) / 200 AS chunk
+            FROM (SELECT DISTINCT correlation_id::text AS cid FROM inserted) d
+          ) c
+          GROUP BY chunk;
+          RETURN NULL;
+        END $$;
+    """)
+    # defined on the partitioned parent => fires for inserts routed to any partition
+    op.execute("""
+        CREATE TRIGGER trg_audit_event_notify
+        AFTER INSERT ON audit_event
+        REFERENCING NEW TABLE AS inserted
+        FOR EACH STATEMENT EXECUTE FUNCTION ggp_notify_audit_event();
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS trg_audit_event_notify ON audit_event;")
+    op.execute("DROP FUNCTION IF EXISTS ggp_notify_audit_event();")
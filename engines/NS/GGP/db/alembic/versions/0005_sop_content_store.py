@@ -0,0 +1,45 @@
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+# sop_content: SOP version content addressed by content_hash (written by
+# versioning/manager.py). One row per distinct document, shared by every
+# sop_version that has that hash. A row is either a full keyframe or a delta
+# against base_hash; depth counts the deltas back to the keyframe and is capped
+# by SOP_KEYFRAME_INTERVAL, which bounds reconstruction.
+#
+# body is text holding the canonical JSON bytes that were hashed, not jsonb:
+# jsonb re-renders numbers (1e+20 reads back as 100000000000000000000), so a
+# document rebuilt from it could hash differently from its content_hash.
+#
+# New sop_version rows leave content_json NULL; rows written before this
+# revision keep their content_json and are read from it.
+
+def upgrade() -> None:
+    op.create_table(
+        "sop_content",
+        sa.Column("content_hash", sa.Text(), primary_key=True),
+        sa.Column("encoding", sa.Text(), nullable=False),
+        sa.Column("base_hash", sa.Text(), sa.ForeignKey("sop_content.content_hash"), nullable=True),
+        sa.Column("depth", sa.SmallInteger(), nullable=False, server_default="0"),
+        sa.Column("body", sa.Text(), nullable=False),
+        sa.Column("content_size", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.text("now()")),
+    )
+    op.create_check_constraint(
+        "ck_sop_content_encoding",
+        "sop_content",
+        "(encoding = 'full' AND base_hash IS NULL AND depth = 0)"
+        " OR (encoding = 'delta' AND base_hash IS NOT NULL AND depth > 0)"
+    )
+
+
+def downgrade() -> None:
+    # versions published after upgrade have no content_json: materialize them
+    # (versioning.manager.load_version) before downgrading, or their content is lost
+    op.drop_constraint("ck_sop_content_encoding", "sop_content", type_="check")
+    op.drop_table("sop_content")
@@ -0,0 +1,26 @@
+from alembic import op
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+# Indexes for replaying audit_event (projection/rebuild.py):
+# - (occurred_at, event_id) B-tree: the rebuild pages each month partition with
+#   WHERE (occurred_at, event_id) > (:last_ts, :last_id) ORDER BY occurred_at, event_id
+#   LIMIT n, which is an index range scan instead of sorting the partition per page.
+#   Partitioned index => one B-tree per month, archived together with its partition.
+# - ingested_at BRIN: rows are appended in ingest order, so the catch-up pass
+#   (ingested_at >= load start) reads only the recent block ranges of each partition.
+#
+# CREATE INDEX on a partitioned table cannot run CONCURRENTLY and blocks inserts
+# while it builds; on a large audit_event run it in a maintenance window.
+
+def upgrade() -> None:
+    op.execute("CREATE INDEX idx_audit_event_occurred_at_event_id ON audit_event (occurred_at, event_id);")
+    op.execute("CREATE INDEX idx_audit_event_ingested_at_brin ON audit_event USING brin (ingested_at);")
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS idx_audit_event_ingested_at_brin;")
+    op.execute("DROP INDEX IF EXISTS idx_audit_event_occurred_at_event_id;")
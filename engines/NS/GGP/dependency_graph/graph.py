@@ -0,0 +1,287 @@
+# dependency_graph/graph.py
+"""
+In-memory governance dependency graph: components and SOPs as nodes, "B depends
+on A" as an edge A -> B (a change to A may require updating B).
+
+Kept acyclic at all times:
+- forward (dependents) and reverse (dependencies) adjacency sets per node
+- a topological rank per node, maintained incrementally on edge insertion
+  (Pearce-Kelly dynamic topological order): an edge that already agrees with the
+  ranks costs O(1); otherwise only the nodes ranked between its endpoints are
+  visited and re-ranked, never the whole graph. An edge that would close a
+  cycle is rejected with CycleError (carrying the cycle path) and nothing changes.
+- removals never invalidate the ranks, so they are O(degree)
+
+impact(changed) walks the dependents of the changed node(s) and returns the
+affected set plus an update order (sorted by rank: every node comes after
+everything it depends on within the set). Cost is proportional to the affected
+subgraph, not the graph size.
+
+from_edges() bulk-loads with one Kahn pass (O(V + E)), for startup from storage.
+"""
+
+from __future__ import annotations
+
+from collections import deque
+from itertools import count
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+COMPONENT = "component"
+SOP = "sop"
+
+
+class CycleError(ValueError):
+    """Adding the dependency would create a cycle; `cycle` is the path [a, ..., a]."""
+
+    def __init__(self, cycle: List[str]) -> None:
+        super().__init__("Dependency cycle: " + " -> ".join(cycle))
+        self.cycle = cycle
+
+
+class Impact(NamedTuple):
+    affected: Set[str]
+    order: List[str]
+
+
+class DependencyGraph:
+    def __init__(self) -> None:
+        self._kind: Dict[str, str] = {}
+        self._dependents: Dict[str, Set[str]] = {}    # forward: node -> nodes depending on it
+        self._dependencies: Dict[str, Set[str]] = {}  # reverse: node -> nodes it depends on
+        self._rank: Dict[str, int] = {}
+        self._next_rank = count()
+        self._edges = 0
+
+    # ---------------------------
+    # Nodes
+    # ---------------------------
+
+    def add_node(self, node: str, kind: Optional[str] = None) -> None:
+        """Add a node (idempotent; an existing node keeps its kind unless one is given)."""
+        if node in self._kind:
+            if kind is not None:
+                self._kind[node] = kind
+            return
+        self._kind[node] = kind or COMPONENT
+        self._dependents[node] = set()
+        self._dependencies[node] = set()
+        self._rank[node] = next(self._next_rank)
+
+    def remove_node(self, node: str) -> None:
+        if node not in self._kind:
+            raise KeyError(node)
+        for dep in self._dependencies.pop(node):
+            self._dependents[dep].discard(node)
+            self._edges -= 1
+        for dependent in self._dependents.pop(node):
+            self._dependencies[dependent].discard(node)
+            self._edges -= 1
+        del self._kind[node]
+        del self._rank[node]
+
+    def __contains__(self, node: object) -> bool:
+        return node in self._kind
+
+    def __len__(self) -> int:
+        return len(self._kind)
+
+    @property
+    def edge_count(self) -> int:
+        return self._edges
+
+    def kind(self, node: str) -> str:
+        return self._kind[node]
+
+    def nodes(self, kind: Optional[str] = None) -> List[str]:
+        if kind is None:
+            return list(self._kind)
+        return [n for n, k in self._kind.items() if k == kind]
+
+    def dependents(self, node: str) -> Set[str]:
+        """Direct dependents (nodes that depend on `node`)."""
+        return set(self._dependents[node])
+
+    def dependencies(self, node: str) -> Set[str]:
+        """Direct dependencies of `node`."""
+        return set(self._dependencies[node])
+
+    # ---------------------------
+    # Edges
+    # ---------------------------
+
+    def add_dependency(self, dependent: str, dependency: str) -> bool:
+        """
+        Record that `dependent` depends on `dependency` (both must exist).
+        Returns False if the edge was already present.
+        Raises CycleError (graph unchanged) if `dependency` already depends on `dependent`.
+        """
+        if dependent == dependency:
+            raise CycleError([dependent, dependent])
+        fwd = self._dependents[dependency]
+        if dependent in fwd:
+            return False
+        if dependent not in self._kind:
+            raise KeyError(dependent)
+
+        rank = self._rank
+        lower, upper = rank[dependent], rank[dependency]
+        if lower < upper:
+            # ranks disagree with the new edge: re-rank the nodes between the endpoints
+            ahead = self._reachable_forward(dependent, upper, dependency)
+            behind = self._reachable_backward(dependency, lower)
+            self._reorder(behind, ahead)
+
+        fwd.add(dependent)
+        self._dependencies[dependent].add(dependency)
+        self._edges += 1
+        return True
+
+    def remove_dependency(self, dependent: str, dependency: str) -> bool:
+        """Returns False if the edge was not present. Ranks stay valid; no re-ranking."""
+        fwd = self._dependents.get(dependency)
+        if fwd is None or dependent not in fwd:
+            return False
+        fwd.discard(dependent)
+        self._dependencies[dependent].discard(dependency)
+        self._edges -= 1
+        return True
+
+    def would_create_cycle(self, dependent: str, dependency: str) -> bool:
+        if dependent == dependency:
+            return True
+        upper = self._rank[dependency]
+        if self._rank[dependent] > upper:
+            return False  # ranks already agree: no path dependent ~> dependency exists
+        try:
+            self._reachable_forward(dependent, upper, dependency)
+        except CycleError:
+            return True
+        return False
+
+    def _reachable_forward(self, start: str, upper: int, target: str) -> List[str]:
+        """Nodes reachable from `start` with rank <= upper; CycleError if `target` is among them."""
+        rank, dependents = self._rank, self._dependents
+        parent: Dict[str, Optional[str]] = {start: None}
+        stack = [start]
+        while stack:
+            node = stack.pop()
+            for nxt in dependents[node]:
+                if nxt == target:
+                    path = [target, node]
+                    while parent[path[-1]] is not None:
+                        path.append(parent[path[-1]])
+                    path.reverse()
+                    # path: start ... node -> target; the new edge closes it
+                    raise CycleError([target] + path)
+                if nxt not in parent and rank[nxt] <= upper:
+                    parent[nxt] = node
+                    stack.append(nxt)
+        return list(parent)
+
+    def _reachable_backward(self, start: str, lower: int) -> List[str]:
+        """Nodes that `start` (transitively) depends on with rank >= lower."""
+        rank, dependencies = self._rank, self._dependencies
+        seen = {start}
+        stack = [start]
+        while stack:
+            node = stack.pop()
+            for prev in dependencies[node]:
+                if prev not in seen and rank[prev] >= lower:
+                    seen.add(prev)
+                    stack.append(prev)
+        return list(seen)
+
+    def _reorder(self, behind: List[str], ahead: List[str]) -> None:
+        # reuse the same rank slots: everything `dependency` needs first, then `dependent` and what follows it
+        rank = self._rank
+        behind.sort(key=rank.__getitem__)
+        ahead.sort(key=rank.__getitem__)
+        nodes = behind + ahead
+        slots = sorted(rank[n] for n in nodes)
+        for node, slot in zip(nodes, slots):
+            rank[node] = slot
+
+    # ---------------------------
+    # Queries
+    # ---------------------------
+
+    def impact(self, changed, *, kind: Optional[str] = None) -> Impact:
+        """
+        Everything downstream of `changed` (a node or an iterable of nodes), excluding
+        the changed nodes themselves, and an update order over it in which every node
+        follows the affected nodes it depends on. `kind` filters both (e.g. SOP only).
+        """
+        roots = [changed] if isinstance(changed, str) else list(changed)
+        dependents = self._dependents
+        affected: Set[str] = set()
+        stack = []
+        for root in roots:
+            stack.extend(dependents[root])
+        while stack:
+            node = stack.pop()
+            if node in affected:
+                continue
+            affected.add(node)
+            stack.extend(dependents[node])
+        affected.difference_update(roots)
+        if kind is not None:
+            kinds = self._kind
+            affected = {n for n in affected if kinds[n] == kind}
+        return Impact(affected, sorted(affected, key=self._rank.__getitem__))
+
+    def topological_order(self) -> List[str]:
+        """All nodes, dependencies first."""
+        return sorted(self._kind, key=self._rank.__getitem__)
+
+    # ---------------------------
+    # Bulk load
+    # ---------------------------
+
+    @classmethod
+    def from_edges(cls, nodes: Iterable[Tuple[str, str]], edges: Iterable[Tuple[str, str]]) -> "DependencyGraph":
+        """
+        nodes: (node, kind); edges: (dependent, dependency).
+        One Kahn pass ranks everything; raises CycleError naming one cycle if the input has any.
+        """
+        g = cls()
+        for node, kind in nodes:
+            g.add_node(node, kind)
+        for dependent, dependency in edges:
+            if dependent == dependency:
+                raise CycleError([dependent, dependent])
+            fwd = g._dependents[dependency]
+            if dependent not in fwd:
+                if dependent not in g._kind:
+                    raise KeyError(dependent)
+                fwd.add(dependent)
+                g._dependencies[dependent].add(dependency)
+                g._edges += 1
+
+        indegree = {n: len(deps) for n, deps in g._dependencies.items()}
+        queue = deque(n for n, d in indegree.items() if d == 0)
+        ranks = count()
+        rank = g._rank
+        while queue:
+            node = queue.popleft()
+            rank[node] = next(ranks)
+            for nxt in g._dependents[node]:
+                indegree[nxt] -= 1
+                if indegree[nxt] == 0:
+                    queue.append(nxt)
+        g._next_rank = ranks
+        if any(d > 0 for d in indegree.values()):
+            raise CycleError(g._find_cycle({n for n, d in indegree.items() if d > 0}))
+        return g
+
+    def _find_cycle(self, candidates: Set[str]) -> List[str]:
+        # every unranked node has an unranked dependency: walk back until a node repeats
+        node = next(iter(candidates))
+        path: List[str] = []
+        index: Dict[str, int] = {}
+        while node not in index:
+            index[node] = len(path)
+            path.append(node)
+            node = next(d for d in self._dependencies[node] if d in candidates)
+        cycle = path[index[node]:] + [node]
+        cycle.reverse()  # dependency -> dependent direction
+        return cycle
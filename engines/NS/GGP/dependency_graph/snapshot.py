@@ -0,0 +1,360 @@
+# dependency_graph/snapshot.py
+"""
+Compact on-disk snapshot of the dependency graph, loaded with mmap.
+
+File layout (all arrays uint32, native byte order, 8-byte aligned):
+  magic "GGPSNAP1" | u32 header length | JSON header | padding | body
+  body sections:
+    fwd_offsets [n+1], fwd_targets [e]   dependents (CSR)
+    rev_offsets [n+1], rev_targets [e]   dependencies (CSR)
+    kinds [n] (uint8 index into header "kinds")
+    name_offsets [n+1], names (utf-8 blob)
+    by_name [n]                          node indices sorted by name (lookup)
+
+Node index == position in a canonical topological order (Kahn, ties broken by
+name), so identical graphs give identical bytes, the blake2b content hash of the
+body names the file (graph-<hash16>.snap), and an impact query's update order is
+just its affected indices sorted.
+
+GraphSnapshot serves the DependencyGraph read API straight from the mapping:
+no per-node Python objects, so startup is one mmap and the pages are shared by
+every process mapping the same file (page cache, read-only). to_graph() builds a
+mutable DependencyGraph when a process needs to edit.
+
+Env:
+  GRAPH_SNAPSHOT_DIR=/var/lib/ggp/graph   write_snapshot / load_current default
+"""
+
+from __future__ import annotations
+
+import hashlib
+import heapq
+import json
+import mmap
+import os
+import sys
+from array import array
+from itertools import count
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from dependency_graph.graph import DependencyGraph, Impact
+
+SNAPSHOT_DIR = os.getenv("GRAPH_SNAPSHOT_DIR", "/var/lib/ggp/graph")
+
+MAGIC = b"GGPSNAP1"
+FORMAT_VERSION = 1
+CURRENT_FILE = "CURRENT"
+_ALIGN = 8
+_U32 = "I"
+
+if array(_U32).itemsize != 4:  # pragma: no cover - every supported platform
+    raise ImportError("dependency_graph.snapshot needs a 4-byte array('I')")
+
+
+class SnapshotError(ValueError):
+    """Missing, truncated, foreign or corrupt snapshot file."""
+
+
+# ---------------------------
+# Write
+# ---------------------------
+
+def _canonical_order(graph: DependencyGraph) -> List[str]:
+    dependencies, dependents = graph._dependencies, graph._dependents
+    indegree = {n: len(d) for n, d in dependencies.items()}
+    heap = [n for n, d in indegree.items() if d == 0]
+    heapq.heapify(heap)
+    order = []
+    while heap:
+        node = heapq.heappop(heap)
+        order.append(node)
+        for nxt in dependents[node]:
+            indegree[nxt] -= 1
+            if indegree[nxt] == 0:
+                heapq.heappush(heap, nxt)
+    return order
+
+
+def _csr(order: List[str], index: Dict[str, int], adjacency: Dict[str, set]) -> Tuple[array, array]:
+    offsets = array(_U32, [0])
+    targets = array(_U32)
+    for node in order:
+        targets.extend(sorted(index[m] for m in adjacency[node]))
+        offsets.append(len(targets))
+    return offsets, targets
+
+
+def encode_snapshot(graph: DependencyGraph) -> Tuple[bytes, str]:
+    """Serialize `graph`; returns (file bytes, content hash hex)."""
+    order = _canonical_order(graph)
+    index = {node: i for i, node in enumerate(order)}
+
+    kinds_table: List[str] = []
+    kind_ids: Dict[str, int] = {}
+    kinds = bytearray()
+    name_offsets = array(_U32, [0])
+    names = bytearray()
+    for node in order:
+        kind = graph._kind[node]
+        kid = kind_ids.get(kind)
+        if kid is None:
+            kid = kind_ids[kind] = len(kinds_table)
+            kinds_table.append(kind)
+        kinds.append(kid)
+        names += node.encode("utf-8")
+        name_offsets.append(len(names))
+    if len(kinds_table) > 256:
+        raise ValueError("snapshot supports at most 256 node kinds")
+
+    fwd_offsets, fwd_targets = _csr(order, index, graph._dependents)
+    rev_offsets, rev_targets = _csr(order, index, graph._dependencies)
+    by_name = array(_U32, sorted(range(len(order)), key=order.__getitem__))
+
+    sections = [
+        ("fwd_offsets", fwd_offsets.tobytes()),
+        ("fwd_targets", fwd_targets.tobytes()),
+        ("rev_offsets", rev_offsets.tobytes()),
+        ("rev_targets", rev_targets.tobytes()),
+        ("kinds", bytes(kinds)),
+        ("name_offsets", name_offsets.tobytes()),
+        ("names", bytes(names)),
+        ("by_name", by_name.tobytes()),
+    ]
+    body = bytearray()
+    layout = {}
+    for name, data in sections:
+        body += b"\0" * (-len(body) % _ALIGN)
+        layout[name] = [len(body), len(data)]
+        body += data
+    content_hash = hashlib.blake2b(body, digest_size=32).hexdigest()
+
+    header = json.dumps({
+        "format": FORMAT_VERSION,
+        "byteorder": sys.byteorder,
+        "nodes": len(order),
+        "edges": len(fwd_targets),
+        "kinds": kinds_table,
+        "sections": layout,
+        "content_hash": content_hash,
+    }, separators=(",", ":")).encode("utf-8")
+    prefix = MAGIC + len(header).to_bytes(4, "little") + header
+    prefix += b"\0" * (-len(prefix) % _ALIGN)
+    return prefix + bytes(body), content_hash
+
+
+def snapshot_filename(content_hash: str) -> str:
+    return f"graph-{content_hash[:16]}.snap"
+
+
+def write_snapshot(graph: DependencyGraph, directory: str = SNAPSHOT_DIR) -> str:
+    """
+    Write the snapshot (skipped if a file with the same content hash exists) and
+    point CURRENT at it. Both steps are atomic renames, so readers never see a
+    partial file. Returns the snapshot path.
+    """
+    data, content_hash = encode_snapshot(graph)
+    os.makedirs(directory, exist_ok=True)
+    filename = snapshot_filename(content_hash)
+    path = os.path.join(directory, filename)
+    if not os.path.exists(path):
+        _atomic_write(path, data)
+    _atomic_write(os.path.join(directory, CURRENT_FILE), (filename + "\n").encode("ascii"))
+    return path
+
+
+def _atomic_write(path: str, data: bytes) -> None:
+    tmp = f"{path}.tmp-{os.getpid()}"
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+# ---------------------------
+# Read
+# ---------------------------
+
+def load_snapshot(path: str, *, verify: bool = True) -> "GraphSnapshot":
+    """mmap a snapshot read-only. verify=True checks the body against its content hash."""
+    with open(path, "rb") as f:
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            raise SnapshotError(f"{path}: empty file")
+    try:
+        return GraphSnapshot(mm, verify=verify)
+    except Exception:
+        mm.close()
+        raise
+
+
+def load_current(directory: str = SNAPSHOT_DIR, *, verify: bool = True) -> "GraphSnapshot":
+    try:
+        with open(os.path.join(directory, CURRENT_FILE), "r", encoding="ascii") as f:
+            filename = f.read().strip()
+    except FileNotFoundError:
+        raise SnapshotError(f"{directory}: no {CURRENT_FILE} snapshot pointer")
+    return load_snapshot(os.path.join(directory, filename), verify=verify)
+
+
+class GraphSnapshot:
+    """Read-only DependencyGraph view over a mapped snapshot (node names in, node names out)."""
+
+    def __init__(self, buf, *, verify: bool = True) -> None:
+        # validate through short-lived views, so a rejected mmap can still be closed
+        with memoryview(buf) as view:
+            if len(view) < 12 or bytes(view[:8]) != MAGIC:
+                raise SnapshotError("not a dependency graph snapshot")
+            header_len = int.from_bytes(view[8:12], "little")
+            try:
+                header = json.loads(bytes(view[12:12 + header_len]))
+            except ValueError:
+                raise SnapshotError("corrupt snapshot header")
+            if header.get("format") != FORMAT_VERSION:
+                raise SnapshotError(f"unsupported snapshot format {header.get('format')}")
+            if header.get("byteorder") != sys.byteorder:
+                raise SnapshotError("snapshot written on a machine with a different byte order")
+
+            start = 12 + header_len
+            start += -start % _ALIGN
+            body_len = len(view) - start
+            layout = header["sections"]
+            if any(off + size > body_len for off, size in layout.values()):
+                raise SnapshotError("truncated snapshot")
+            if verify:
+                with view[start:] as body:
+                    if hashlib.blake2b(body, digest_size=32).hexdigest() != header["content_hash"]:
+                        raise SnapshotError("snapshot content hash mismatch")
+
+        self._buf = buf
+        self._view = memoryview(buf)
+
+        def section(name: str, fmt: Optional[str] = _U32) -> memoryview:
+            off, size = layout[name]
+            raw = self._view[start + off:start + off + size]
+            return raw.cast(fmt) if fmt else raw
+
+        self.content_hash: str = header["content_hash"]
+        self.node_count: int = header["nodes"]
+        self.edge_count: int = header["edges"]
+        self._kinds_table: List[str] = header["kinds"]
+        self._fwd_off = section("fwd_offsets")
+        self._fwd = section("fwd_targets")
+        self._rev_off = section("rev_offsets")
+        self._rev = section("rev_targets")
+        self._kinds = section("kinds", "B")
+        self._name_off = section("name_offsets")
+        self._names = section("names", None)
+        self._by_name = section("by_name")
+
+    def close(self) -> None:
+        for attr in ("_fwd_off", "_fwd", "_rev_off", "_rev", "_kinds", "_name_off", "_names", "_by_name"):
+            getattr(self, attr).release()
+        self._view.release()
+        if isinstance(self._buf, mmap.mmap):
+            self._buf.close()
+
+    def __enter__(self) -> "GraphSnapshot":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # --- indices ---
+
+    def __len__(self) -> int:
+        return self.node_count
+
+    def name(self, i: int) -> str:
+        off = self._name_off
+        return str(self._names[off[i]:off[i + 1]], "utf-8")
+
+    def index(self, node: str) -> int:
+        """Node index (== topological position); KeyError if absent. Binary search, no dict."""
+        key = node.encode("utf-8")
+        by_name, off, names = self._by_name, self._name_off, self._names
+        lo, hi = 0, len(by_name)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            i = by_name[mid]
+            probe = names[off[i]:off[i + 1]].tobytes()
+            if probe < key:
+                lo = mid + 1
+            elif probe > key:
+                hi = mid
+            else:
+                return i
+        raise KeyError(node)
+
+    def __contains__(self, node: object) -> bool:
+        try:
+            self.index(node)  # type: ignore[arg-type]
+        except (KeyError, AttributeError):
+            return False
+        return True
+
+    # --- DependencyGraph read API ---
+
+    def kind(self, node: str) -> str:
+        return self._kinds_table[self._kinds[self.index(node)]]
+
+    def dependents(self, node: str) -> set:
+        i = self.index(node)
+        return {self.name(j) for j in self._fwd[self._fwd_off[i]:self._fwd_off[i + 1]]}
+
+    def dependencies(self, node: str) -> set:
+        i = self.index(node)
+        return {self.name(j) for j in self._rev[self._rev_off[i]:self._rev_off[i + 1]]}
+
+    def impact(self, changed, *, kind: Optional[str] = None) -> Impact:
+        """Same contract as DependencyGraph.impact."""
+        roots = [changed] if isinstance(changed, str) else list(changed)
+        root_ids = {self.index(r) for r in roots}
+        off, targets = self._fwd_off, self._fwd
+        affected = set()
+        stack = []
+        for i in root_ids:
+            stack.extend(targets[off[i]:off[i + 1]])
+        while stack:
+            i = stack.pop()
+            if i in affected:
+                continue
+            affected.add(i)
+            stack.extend(targets[off[i]:off[i + 1]])
+        affected -= root_ids
+        if kind is not None:
+            try:
+                kid = self._kinds_table.index(kind)
+            except ValueError:
+                return Impact(set(), [])
+            kinds = self._kinds
+            affected = {i for i in affected if kinds[i] == kid}
+        order = [self.name(i) for i in sorted(affected)]
+        return Impact(set(order), order)
+
+    def topological_order(self) -> List[str]:
+        return [self.name(i) for i in range(self.node_count)]
+
+    def edges(self) -> Iterable[Tuple[str, str]]:
+        """(dependent, dependency) pairs."""
+        names = [self.name(i) for i in range(self.node_count)]
+        off, targets = self._rev_off, self._rev
+        for i in range(self.node_count):
+            for j in targets[off[i]:off[i + 1]]:
+                yield names[i], names[j]
+
+    def to_graph(self) -> DependencyGraph:
+        """Mutable copy; snapshot order becomes the ranks, so no Kahn pass is needed."""
+        g = DependencyGraph()
+        names = [self.name(i) for i in range(self.node_count)]
+        kinds_table, kinds = self._kinds_table, self._kinds
+        fwd_off, fwd, rev_off, rev = self._fwd_off, self._fwd, self._rev_off, self._rev
+        for i, node in enumerate(names):
+            g._kind[node] = kinds_table[kinds[i]]
+            g._rank[node] = i
+            g._dependents[node] = {names[j] for j in fwd[fwd_off[i]:fwd_off[i + 1]]}
+            g._dependencies[node] = {names[j] for j in rev[rev_off[i]:rev_off[i + 1]]}
+        g._next_rank = count(self.node_count)
+        g._edges = self.edge_count
+        return g
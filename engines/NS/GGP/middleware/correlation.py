@@ -1,23 +1,29 @@
 # api/middleware/correlation.py
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Callable, Optional
+from typing import Optional
 from uuid import UUID, uuid4
 
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.datastructures import MutableHeaders
 from starlette.requests import Request
-from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from core.context import CorrelationContext, reset_correlation, set_correlation
 
 # Header conventions
 CORRELATION_HEADER = "X-Correlation-Id"
 CAUSATION_HEADER = "X-Causation-Id"  # optional (advanced), can be omitted by clients
 
+_CORRELATION_HEADER_RAW = CORRELATION_HEADER.lower().encode("latin-1")
+_CAUSATION_HEADER_RAW = CAUSATION_HEADER.lower().encode("latin-1")
 
-@dataclass(frozen=True)
-class CorrelationContext:
-    correlation_id: UUID
-    causation_id: Optional[UUID] = None
+__all__ = [
+    "CORRELATION_HEADER",
+    "CAUSATION_HEADER",
+    "CorrelationContext",
+    "CorrelationIdMiddleware",
+    "get_correlation_context",
+]
 
 
 def _parse_uuid(value: Optional[str]) -> Optional[UUID]:
@@ -36,28 +42,72 @@ def get_correlation_context(request: Request) -> CorrelationContext:
     - Otherwise a new UUID is generated.
     - X-Causation-Id is optional and only used if provided and valid.
     """
+    ctx = getattr(request.state, "correlation", None)
+    if ctx is not None:
+        return ctx
     cid = _parse_uuid(request.headers.get(CORRELATION_HEADER)) or uuid4()
     caus = _parse_uuid(request.headers.get(CAUSATION_HEADER))
     return CorrelationContext(correlation_id=cid, causation_id=caus)
 
 
-class CorrelationIdMiddleware(BaseHTTPMiddleware):
+def _context_from_scope(scope: Scope) -> CorrelationContext:
+    cid_raw = caus_raw = None
+    for name, value in scope.get("headers", ()):
+        if name == _CORRELATION_HEADER_RAW:
+            cid_raw = value
+        elif name == _CAUSATION_HEADER_RAW:
+            caus_raw = value
+    cid = _parse_uuid(cid_raw.decode("latin-1")) if cid_raw else None
+    caus = _parse_uuid(caus_raw.decode("latin-1")) if caus_raw else None
+    return CorrelationContext(correlation_id=cid or uuid4(), causation_id=caus)
+
+
+class CorrelationIdMiddleware:
     """
-    Middleware that:
+    Pure ASGI middleware that:
     - Establishes a correlation_id for every request
-    - Stores it on request.state.correlation (CorrelationContext)
+    - Stores it on request.state.correlation (CorrelationContext) and in the
+      core.context ContextVar for the duration of the request, so
+      KafkaProducer.emit and CorrelationLogFilter pick it up without plumbing
     - Returns it to callers via X-Correlation-Id response header
+
+    Unlike a BaseHTTPMiddleware subclass it runs the app in the caller's task and
+    passes response messages straight through, so streaming responses and
+    contextvars set by the app behave normally.
     """
 
-    async def dispatch(self, request: Request, call_next: Callable):
-        ctx = get_correlation_context(request)
-        request.state.correlation = ctx
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        ctx = _context_from_scope(scope)
+        scope.setdefault("state", {})["correlation"] = ctx
+        token = set_correlation(ctx)
+
+        if scope["type"] == "websocket":
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                reset_correlation(token)
+            return
 
-        response: Response = await call_next(request)
+        correlation_value = str(ctx.correlation_id)
+        causation_value = str(ctx.causation_id) if ctx.causation_id else None
 
-        # Always return correlation id (helps client-side tracing/debugging)
-        response.headers[CORRELATION_HEADER] = str(ctx.correlation_id)
-        if ctx.causation_id:
-            response.headers[CAUSATION_HEADER] = str(ctx.causation_id)
+        async def send_with_correlation(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                # Always return correlation id (helps client-side tracing/debugging)
+                headers = MutableHeaders(scope=message)
+                headers[CORRELATION_HEADER] = correlation_value
+                if causation_value:
+                    headers[CAUSATION_HEADER] = causation_value
+            await send(message)
 
-        return response
\ No newline at end of file
+        try:
+            await self.app(scope, receive, send_with_correlation)
+        finally:
+            reset_correlation(token)
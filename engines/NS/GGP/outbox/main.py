@@ -0,0 +1,66 @@
+import os
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from components.kafka import KafkaProducer
+from components.outbox import prune_published, relay_once
+
+POSTGRES_DSN = os.getenv("POSTGRES_DSN")  # required
+
+# Rows claimed (and published pipelined) per relay transaction.
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "500"))
+# Sleep between polls when the outbox is empty.
+OUTBOX_POLL_INTERVAL_MS = int(os.getenv("OUTBOX_POLL_INTERVAL_MS", "100"))
+# Delay before a batch that failed to publish is retried.
+OUTBOX_RETRY_DELAY_S = float(os.getenv("OUTBOX_RETRY_DELAY_S", "5"))
+# Published rows older than this are deleted (kept meanwhile for inspection/replay).
+OUTBOX_RETENTION_S = float(os.getenv("OUTBOX_RETENTION_S", "86400"))
+# How often the relay prunes, and rows per DELETE transaction.
+OUTBOX_PRUNE_INTERVAL_S = float(os.getenv("OUTBOX_PRUNE_INTERVAL_S", "300"))
+OUTBOX_PRUNE_BATCH = int(os.getenv("OUTBOX_PRUNE_BATCH", "5000"))
+
+log = logging.getLogger("ggp.outbox")
+
+
+async def main():
+    if not POSTGRES_DSN:
+        raise RuntimeError("POSTGRES_DSN is required")
+
+    pg = create_async_engine(POSTGRES_DSN, pool_pre_ping=True)
+    # the relay is the only producer path for outboxed events; let records share requests
+    producer = KafkaProducer(linger_ms=int(os.getenv("KAFKA_PRODUCER_LINGER_MS", "5")))
+
+    await producer.start()
+    next_prune = time.monotonic()
+    try:
+        while True:
+            if time.monotonic() >= next_prune:
+                next_prune = time.monotonic() + OUTBOX_PRUNE_INTERVAL_S
+                try:
+                    cutoff = datetime.now(timezone.utc) - timedelta(seconds=OUTBOX_RETENTION_S)
+                    deleted = await prune_published(pg, cutoff=cutoff, batch_size=OUTBOX_PRUNE_BATCH)
+                    if deleted:
+                        log.info("pruned %d published outbox rows", deleted)
+                except Exception:
+                    log.exception("outbox prune failed")
+            try:
+                sent = await relay_once(
+                    pg,
+                    producer,
+                    batch_size=OUTBOX_BATCH_SIZE,
+                    retry_delay_s=OUTBOX_RETRY_DELAY_S,
+                )
+            except Exception:
+                log.exception("outbox relay batch failed; rows rescheduled")
+                sent = 0
+            if sent < OUTBOX_BATCH_SIZE:
+                await asyncio.sleep(OUTBOX_POLL_INTERVAL_MS / 1000)
+    finally:
+        await producer.stop()
+        await pg.dispose()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,64 @@
+# projection/bulk.py
+"""
+Coalescing bulk writer for the Mongo read models.
+
+Events are reduced to (collection, _id, $set) operations (see projection.main.projection_ops).
+ProjectionBatch folds every operation for the same (collection, _id) into one
+$set in arrival order, so the last writer wins per field exactly as if the
+update_one calls had run one after another, then flushes each collection with
+a single unordered bulk_write.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Dict, Iterable, Tuple
+
+from pymongo import UpdateOne
+
+# (collection, _id, $set document)
+ProjectionOp = Tuple[str, str, Dict[str, Any]]
+
+
+class ProjectionBatch:
+    def __init__(self) -> None:
+        # collection -> _id -> merged $set (dicts keep first-seen _id order)
+        self._sets: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self.ops_added = 0
+
+    def add(self, ops: Iterable[ProjectionOp]) -> None:
+        for coll, _id, doc in ops:
+            by_id = self._sets.setdefault(coll, {})
+            merged = by_id.get(_id)
+            if merged is None:
+                by_id[_id] = dict(doc)
+            else:
+                merged.update(doc)
+            self.ops_added += 1
+
+    def __len__(self) -> int:
+        return sum(len(by_id) for by_id in self._sets.values())
+
+    def clear(self) -> None:
+        self._sets.clear()
+        self.ops_added = 0
+
+    async def flush(self, db, *, collection_suffix: str = "") -> int:
+        """
+        One unordered bulk_write per collection, issued concurrently.
+        collection_suffix redirects writes (e.g. "__next" for rebuild shadow collections).
+        Returns the number of write operations sent (after coalescing).
+        The batch is left intact on failure so the caller can fall back.
+        """
+        writes = []
+        sent = 0
+        for coll, by_id in self._sets.items():
+            if not by_id:
+                continue
+            requests = [UpdateOne({"_id": _id}, {"$set": doc}, upsert=True) for _id, doc in by_id.items()]
+            sent += len(requests)
+            writes.append(db[coll + collection_suffix].bulk_write(requests, ordered=False))
+        if writes:
+            await asyncio.gather(*writes)
+        self.clear()
+        return sent
@@ -1,4 +1,4 @@
- import os
+import os
 import json
 import asyncio
 import random
@@ -6,8 +6,17 @@ from motor.motor_asyncio import AsyncIOMotorClient
 from aiokafka import AIOKafkaConsumer, AIOKafkaProducer
 from sqlalchemy.ext.asyncio import create_async_engine
 
-from core.events import parse_envelope
-from components.pg_idempotency import try_mark_processed, KafkaMeta
+from core import codec
+from core.events import parse_envelope, parse_envelopes
+from components.dedup_cache import cache_from_env
+from components.keyed_executor import key_parallel
+from components.metrics import ConsumerMetrics, start_metrics_server, stop_metrics_server
+from components.partition_workers import partition_parallel
+from components.pg_idempotency import try_mark_processed, try_mark_processed_many, KafkaMeta
+from components.retry_tiers import PendingDeliveries, retry_dispatcher, send_to_retry, tiers_from
+from components.runtime import ConsumerRuntime
+from core.topics import PROJECTION_RETRY_TIERS
+from projection.bulk import ProjectionBatch
 
 BOOTSTRAP = os.getenv("KAFKA_BOOTSTRAP_SERVERS", "ggp-kafka:9092")
 CONSUMER_GROUP = os.getenv("KAFKA_CONSUMER_GROUP", "ggp-projection-v1")
@@ -24,6 +33,37 @@ TOPICS = [
 
 MAX_RETRIES = int(os.getenv("MAX_RETRIES", "5"))
 
+# Transient failures: "tiers" re-publishes the event to delayed retry topics and keeps the
+# main stream moving (a retry consumer applies it once due); "inline" is the old
+# in-consumer exponential backoff (MAX_RETRIES sleeps, blocking the consumer).
+RETRY_MODE = os.getenv("PROJECTION_RETRY_MODE", "tiers").strip().lower()
+RETRY_TIERS = tiers_from(PROJECTION_RETRY_TIERS)
+RETRY_CONSUMER_GROUP = os.getenv("RETRY_CONSUMER_GROUP", "ggp-projection-retry-v1")
+
+# Recently confirmed event_ids, checked before the Postgres ledger (DEDUP_CACHE_SIZE=0 disables).
+DEDUP_CACHE = cache_from_env()
+
+# Per-stage latency, outcome counters, lag and dedup cache hit/miss counts, served on METRICS_PORT (see components/metrics.py).
+METRICS = ConsumerMetrics("projection")
+METRICS.watch_cache(DEDUP_CACHE)
+
+# Skip the ledger for records below the group's committed offset (batched and default modes).
+WATERMARK_FASTPATH = os.getenv("LEDGER_WATERMARK_FASTPATH", "false").strip().lower() in {"1", "true", "yes", "y", "on"}
+
+# Batched mode: drain getmany() batches, coalesce read-model updates and flush with bulk_write.
+BATCH_MODE = os.getenv("PROJECTION_BATCH_MODE", "false").strip().lower() in {"1", "true", "yes", "y", "on"}
+BATCH_MAX_RECORDS = int(os.getenv("BATCH_MAX_RECORDS", "500"))
+BATCH_MAX_WAIT_MS = int(os.getenv("BATCH_MAX_WAIT_MS", "200"))
+
+# Partition-parallel mode: one worker per assigned partition (order kept within a partition).
+PARTITION_PARALLEL = os.getenv("PARTITION_PARALLEL", "false").strip().lower() in {"1", "true", "yes", "y", "on"}
+PARTITION_QUEUE_SIZE = int(os.getenv("PARTITION_QUEUE_SIZE", "4"))
+
+# Key-ordered parallel mode: same message key (sop_id) stays ordered, different keys run
+# concurrently up to KEY_PARALLELISM. 0 disables; when set it takes precedence over the modes above.
+KEY_PARALLELISM = int(os.getenv("KEY_PARALLELISM", "0"))
+KEY_MAX_IN_FLIGHT = int(os.getenv("KEY_MAX_IN_FLIGHT", "1000"))
+
 def is_transient(exc: Exception) -> bool:
     msg = str(exc).lower()
     return any(k in msg for k in ["timeout", "temporar", "connection", "network", "reset", "unavailable"])
@@ -33,7 +73,11 @@ async def backoff_sleep(attempt: int) -> None:
     jitter = random.random() * 0.2 * base
     await asyncio.sleep(base + jitter)
 
-async def publish_dlq(producer: AIOKafkaProducer, dlq_topic: str, *, original: dict, meta: KafkaMeta, err: Exception, retry_count: int):
+async def publish_dlq(producer: AIOKafkaProducer, dlq_topic: str, *, original: dict, meta: KafkaMeta, err: Exception, retry_count: int) -> asyncio.Future:
+    """
+    Enqueue a DLQ record without waiting; returns the delivery future.
+    Callers collect it in PendingDeliveries and flush before committing offsets.
+    """
     dlq_msg = {
         "failed_at": __import__("datetime").datetime.utcnow().isoformat() + "Z",
         "consumer_group": CONSUMER_GROUP,
@@ -45,29 +89,34 @@ async def publish_dlq(producer: AIOKafkaProducer, dlq_topic: str, *, original: d
         "error_message": str(err)[:2000],
         "event": original,
     }
-    await producer.send_and_wait(dlq_topic, json.dumps(dlq_msg).encode("utf-8"))
+    with METRICS.dlq.time():
+        fut = await producer.send(dlq_topic, json.dumps(dlq_msg).encode("utf-8"))
+    METRICS.dlq_total.inc()
+    return fut
 
-async def project_event(db, env):
+def projection_ops(env):
+    """
+    Reduce an event to read-model upserts: list of (collection, _id, $set).
+    Raises for events the projector cannot handle (invariant failure => DLQ).
+    """
     et = env.event_type
     p = env.payload
 
     if et == "ggp.core.sop.created":
         sop_id = p["sop_id"]
-        doc = {
-            "_id": sop_id,
-            "sop_id": sop_id,
-            "title": p["title"],
-            "status": p.get("status", "draft"),
-            "tags": p.get("tags", []),
-            "current_version": 0,
-            "created_at": env.occurred_at,
-            "updated_at": env.occurred_at,
-        }
-        await db["rm_sop_index"].update_one({"_id": sop_id}, {"$set": doc}, upsert=True)
-        # optional rm_audit_trail
-        await db["rm_audit_trail"].update_one(
-            {"_id": str(env.event_id)},
-            {"$set": {
+        return [
+            ("rm_sop_index", sop_id, {
+                "_id": sop_id,
+                "sop_id": sop_id,
+                "title": p["title"],
+                "status": p.get("status", "draft"),
+                "tags": p.get("tags", []),
+                "current_version": 0,
+                "created_at": env.occurred_at,
+                "updated_at": env.occurred_at,
+            }),
+            # optional rm_audit_trail
+            ("rm_audit_trail", str(env.event_id), {
                 "_id": str(env.event_id),
                 "event_id": str(env.event_id),
                 "event_type": env.event_type,
@@ -77,46 +126,37 @@ async def project_event(db, env):
                 "entity_refs": {"sop_id": sop_id},
                 "summary": f"SOP created: {p['title']}",
                 "severity": "info",
-            }},
-            upsert=True
-        )
+            }),
+        ]
 
     elif et == "ggp.core.sop.version_published":
         sop_id = p["sop_id"]
         version = int(p["version"])
         _id = f"{sop_id}:{version}"
-
-        # rm_sop_versions
-        await db["rm_sop_versions"].update_one(
-            {"_id": _id},
-            {"$set": {
-                "_id": _id,
-                "sop_id": sop_id,
-                "version": version,
-                "content_hash": p["content_hash"],
-                "content": p.get("content"),
-                "content_ref": p.get("content_ref"),
-                "published_at": env.occurred_at,
-                "published_by": env.actor.id,
-            }},
-            upsert=True
-        )
-
-        # rm_sop_index
-        await db["rm_sop_index"].update_one(
-            {"_id": sop_id},
-            {"$set": {
+        version_doc = {
+            "_id": _id,
+            "sop_id": sop_id,
+            "version": version,
+            "content_hash": p["content_hash"],
+            "published_at": env.occurred_at,
+            "published_by": env.actor.id,
+        }
+        # content lives in Postgres sop_content (versioning/manager.py); only events
+        # published before it existed carry it inline
+        for field in ("content", "content_ref"):
+            if p.get(field) is not None:
+                version_doc[field] = p[field]
+        return [
+            # rm_sop_versions
+            ("rm_sop_versions", _id, version_doc),
+            # rm_sop_index
+            ("rm_sop_index", sop_id, {
                 "status": "published",
                 "current_version": version,
                 "updated_at": env.occurred_at,
-            }},
-            upsert=True
-        )
-
-        # optional rm_audit_trail
-        await db["rm_audit_trail"].update_one(
-            {"_id": str(env.event_id)},
-            {"$set": {
+            }),
+            # optional rm_audit_trail
+            ("rm_audit_trail", str(env.event_id), {
                 "_id": str(env.event_id),
                 "event_id": str(env.event_id),
                 "event_type": env.event_type,
@@ -126,13 +166,185 @@ async def project_event(db, env):
                 "entity_refs": {"sop_id": sop_id},
                 "summary": f"SOP published v{version}",
                 "severity": "info",
-            }},
-            upsert=True
-        )
+            }),
+        ]
     else:
         # Unknown event type: treat as invariant failure (DLQ)
         raise ValueError(f"Unhandled event_type for projector: {et}")
 
+async def project_event(db, env):
+    for coll, _id, doc in projection_ops(env):
+        await db[coll].update_one({"_id": _id}, {"$set": doc}, upsert=True)
+
+async def apply_with_retries(mdb, producer: AIOKafkaProducer, env, meta: KafkaMeta, raw: dict, sends: PendingDeliveries, *, key=None, attempt: int = 0) -> None:
+    """
+    Apply projection. Transient failures go to the next retry tier (or are retried here
+    with backoff when RETRY_MODE=inline); anything else, or a failure after the last
+    retry, goes to the DLQ. `attempt` is the retries already spent on this event.
+    Sends are added to `sends`; the caller flushes them before committing.
+    """
+    while True:
+        try:
+            with METRICS.apply.time():
+                await project_event(mdb, env)
+            METRICS.processed.inc()
+            return
+        except Exception as e:
+            if is_transient(e):
+                if RETRY_MODE == "inline":
+                    if attempt < MAX_RETRIES:
+                        METRICS.retried.inc()
+                        await backoff_sleep(attempt)
+                        attempt += 1
+                        continue
+                else:
+                    fut = await send_to_retry(
+                        producer, RETRY_TIERS, json.dumps(raw).encode("utf-8"),
+                        key=key, attempt=attempt, source=meta, err=e,
+                    )
+                    if fut is not None:
+                        METRICS.retried.inc()
+                        sends.add(fut)
+                        return
+
+            # Non-transient or out of retries => DLQ; commit only after DLQ success
+            sends.add(await publish_dlq(producer, DLQ_TOPIC, original=raw, meta=meta, err=e, retry_count=attempt))
+            return
+
+async def process_message(pg, mdb, producer: AIOKafkaProducer, msg) -> None:
+    """
+    Per-message path (default mode). Caller commits after this returns.
+    """
+    meta = KafkaMeta(topic=msg.topic, partition=msg.partition, offset=msg.offset)
+    raw = msg.value
+    sends = PendingDeliveries()
+
+    # Phase 1: validate envelope
+    try:
+        with METRICS.parse.time():
+            env = parse_envelope(raw)
+    except Exception as e:
+        # envelope invalid => DLQ and commit
+        sends.add(await publish_dlq(producer, DLQ_TOPIC, original=raw, meta=meta, err=e, retry_count=0))
+        await sends.flush()
+        return
+
+    # Phase 2: idempotency gate (durable)
+    with METRICS.idempotency.time():
+        inserted = await try_mark_processed(pg, CONSUMER_GROUP, env.event_id, env.event_type, meta, cache=DEDUP_CACHE)
+    if not inserted:
+        # already processed => skip and commit
+        METRICS.duplicate.inc()
+        return
+
+    # Phase 3: apply projection (transient failures => retry tier)
+    await apply_with_retries(mdb, producer, env, meta, raw, sends, key=msg.key)
+    await sends.flush()
+
+async def process_retry(mdb, producer: AIOKafkaProducer, msg, info) -> None:
+    """
+    Retry tier path. The event already passed the idempotency gate on the main stream,
+    so it goes straight to the projection (upserts are idempotent). DLQ records keep
+    the original topic/partition/offset.
+    """
+    meta = info.source
+    raw = msg.value
+    sends = PendingDeliveries()
+    try:
+        env = parse_envelope(raw)
+    except Exception as e:
+        sends.add(await publish_dlq(producer, DLQ_TOPIC, original=raw, meta=meta, err=e, retry_count=info.attempt))
+    else:
+        await apply_with_retries(mdb, producer, env, meta, raw, sends, key=msg.key, attempt=info.attempt)
+    await sends.flush()
+
+async def process_batch(pg, mdb, producer: AIOKafkaProducer, msgs) -> None:
+    """
+    Batched path: same phases as process_message, but the idempotency gate is one
+    try_mark_processed_many round trip and all read-model updates are coalesced
+    into one bulk_write per collection. DLQ/retry records for the batch are sent
+    pipelined and awaited together. Caller commits offsets once after this returns.
+    """
+    sends = PendingDeliveries()
+
+    # Phase 1: validate envelopes
+    with METRICS.parse.time():
+        results = parse_envelopes([m.value for m in msgs])
+    parsed = []
+    for msg, env in zip(msgs, results):
+        meta = KafkaMeta(topic=msg.topic, partition=msg.partition, offset=msg.offset)
+        if isinstance(env, Exception):
+            sends.add(await publish_dlq(producer, DLQ_TOPIC, original=msg.value, meta=meta, err=env, retry_count=0))
+            continue
+        parsed.append((env, meta, msg.value, msg.key))
+
+    # Phase 2: idempotency gate for the whole batch
+    with METRICS.idempotency.time():
+        new_ids = await try_mark_processed_many(
+            pg, CONSUMER_GROUP, [(env.event_id, env.event_type, meta) for env, meta, _, _ in parsed],
+            cache=DEDUP_CACHE,
+        )
+    METRICS.duplicate.inc(len(parsed) - len(new_ids))
+
+    # Phase 3: coalesce in offset order (last writer wins per _id/field)
+    batch = ProjectionBatch()
+    pending = []
+    for env, meta, raw, key in parsed:
+        if env.event_id not in new_ids:
+            continue
+        new_ids.discard(env.event_id)  # in-batch duplicates only count once
+        try:
+            batch.add(projection_ops(env))
+        except Exception as e:
+            sends.add(await publish_dlq(producer, DLQ_TOPIC, original=raw, meta=meta, err=e, retry_count=0))
+            continue
+        pending.append((env, meta, raw, key))
+
+    if pending:
+        await flush_batch(mdb, producer, batch, pending, sends)
+    await sends.flush()
+
+async def flush_batch(mdb, producer: AIOKafkaProducer, batch: ProjectionBatch, pending, sends: PendingDeliveries) -> None:
+    attempt = 0
+    while True:
+        try:
+            with METRICS.apply.time():
+                await batch.flush(mdb)
+            METRICS.processed.inc(len(pending))
+            return
+        except Exception as e:
+            if RETRY_MODE == "inline" and is_transient(e) and attempt < MAX_RETRIES:
+                METRICS.retried.inc(len(pending))
+                await backoff_sleep(attempt)
+                attempt += 1
+                continue
+            break
+
+    # Bulk flush failed: upserts are idempotent, so replay event by event to isolate
+    # the failing records (each gets its own retry tier/DLQ).
+    for env, meta, raw, key in pending:
+        await apply_with_retries(mdb, producer, env, meta, raw, sends, key=key)
+
+async def handle_batch(pg, mdb, producer: AIOKafkaProducer, msgs) -> None:
+    """Runtime handler: one partition's records, in offset order."""
+    if BATCH_MODE:
+        await process_batch(pg, mdb, producer, msgs)
+    else:
+        for msg in msgs:
+            await process_message(pg, mdb, producer, msg)
+
+def make_dispatcher(pg, mdb, producer: AIOKafkaProducer):
+    """Runtime dispatcher for the parallel consume modes (None => inline batches)."""
+    if KEY_PARALLELISM > 0:
+        return key_parallel(
+            lambda msg: process_message(pg, mdb, producer, msg),
+            max_concurrency=KEY_PARALLELISM,
+            max_in_flight=KEY_MAX_IN_FLIGHT,
+        )
+    if PARTITION_PARALLEL:
+        return partition_parallel(lambda msgs: handle_batch(pg, mdb, producer, msgs), queue_size=PARTITION_QUEUE_SIZE)
+    return None
+
 async def main():
     if not POSTGRES_DSN:
         raise RuntimeError("POSTGRES_DSN is required")
@@ -141,64 +353,62 @@ async def main():
     mongo = AsyncIOMotorClient(MONGO_URI)
     mdb = mongo[MONGO_DB]
 
-    consumer = AIOKafkaConsumer(
-        *TOPICS,
-        bootstrap_servers=BOOTSTRAP,
+    # values are pre-encoded bytes (DLQ records, retry tier records)
+    producer = AIOKafkaProducer(bootstrap_servers=BOOTSTRAP)
+
+    # fetch loop, batched commits, SIGTERM drain and revocation drain (components/runtime.py);
+    # every consume mode runs under it, the parallel ones as dispatchers
+    dispatcher = make_dispatcher(pg, mdb, producer)
+    runtime = ConsumerRuntime(
+        topics=TOPICS,
         group_id=CONSUMER_GROUP,
-        enable_auto_commit=False,
-        value_deserializer=lambda b: json.loads(b.decode("utf-8")),
-        auto_offset_reset="earliest",
-    )
-    producer = AIOKafkaProducer(
+        handler=None if dispatcher else (lambda msgs: handle_batch(pg, mdb, producer, msgs)),
+        dispatcher=dispatcher,
         bootstrap_servers=BOOTSTRAP,
-        value_serializer=lambda o: json.dumps(o).encode("utf-8"),
+        value_deserializer=METRICS.timed_decoder(codec.loads),
+        max_records=BATCH_MAX_RECORDS,
+        max_wait_ms=BATCH_MAX_WAIT_MS,
+        watermark_fastpath=WATERMARK_FASTPATH,
+        commit_timer=METRICS.commit,
     )
 
-    await consumer.start()
+    # retry tiers run under their own runtime (group, commits, revocation drain)
+    retry_runtime = None
+    if RETRY_MODE != "inline":
+        retry_runtime = ConsumerRuntime(
+            topics=[tier.topic for tier in RETRY_TIERS],
+            group_id=RETRY_CONSUMER_GROUP,
+            dispatcher=retry_dispatcher(lambda msg, info: process_retry(mdb, producer, msg, info)),
+            bootstrap_servers=BOOTSTRAP,
+            max_records=BATCH_MAX_RECORDS,
+            max_wait_ms=BATCH_MAX_WAIT_MS,
+        )
+
     await producer.start()
+    metrics_server = start_metrics_server()
+    lag_task = asyncio.create_task(METRICS.track_lag(runtime.consumer))
+    main_task = asyncio.create_task(runtime.run())
+    # SIGTERM/SIGINT go to the main runtime; the retry runtime is stopped along with it
+    retry_task = asyncio.create_task(retry_runtime.run(handle_signals=False)) if retry_runtime else None
     try:
-        async for msg in consumer:
-            meta = KafkaMeta(topic=msg.topic, partition=msg.partition, offset=msg.offset)
-            raw = msg.value
-
-            # Phase 1: validate envelope
-            try:
-                env = parse_envelope(raw)
-            except Exception as e:
-                # envelope invalid => DLQ and commit
-                await publish_dlq(producer, DLQ_TOPIC, original=raw, meta=meta, err=e, retry_count=0)
-                await consumer.commit()
-                continue
-
-            # Phase 2: idempotency gate (durable)
-            inserted = await try_mark_processed(pg, CONSUMER_GROUP, env.event_id, env.event_type, meta)
-            if not inserted:
-                # already processed => skip and commit
-                await consumer.commit()
-                continue
-
-            # Phase 3: apply projection with retries for transient failures
-            attempt = 0
-            while True:
-                try:
-                    await project_event(mdb, env)
-                    await consumer.commit()
-                    break
-                except Exception as e:
-                    if is_transient(e) and attempt < MAX_RETRIES:
-                        await backoff_sleep(attempt)
-                        attempt += 1
-                        continue
-
-                    # Non-transient or out of retries => DLQ; commit only after DLQ success
-                    await publish_dlq(producer, DLQ_TOPIC, original=raw, meta=meta, err=e, retry_count=attempt)
-                    await consumer.commit()
-                    break
+        if retry_task is not None:
+            await asyncio.wait({main_task, retry_task}, return_when=asyncio.FIRST_COMPLETED)
+            # either one ending (stop or failure) stops the other; each drains and commits
+            runtime.stop()
+            retry_runtime.stop()
+            await asyncio.gather(main_task, retry_task, return_exceptions=True)
+            retry_task.result()
+        await main_task
     finally:
-        await consumer.stop()
+        lag_task.cancel()
+        await stop_metrics_server(metrics_server)
+        for task in (main_task, retry_task):
+            if task is not None and not task.done():
+                task.cancel()
+        await asyncio.gather(*(t for t in (main_task, retry_task) if t is not None), return_exceptions=True)
         await producer.stop()
         await pg.dispose()
         mongo.close()
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
@@ -0,0 +1,256 @@
+# projection/rebuild.py
+"""
+Rebuild the Mongo read models from Postgres audit_event (the durable event log).
+
+Unlike resetting ggp-projection-v1 and replaying Kafka, this:
+- covers the full history (Kafka retention is 7d/30d; audit_event keeps every
+  partition not yet archived by audit.partitions)
+- bypasses the per-event idempotency ledger (shadow collections start empty)
+- reads audit_event one month partition at a time in (occurred_at, event_id)
+  order, paging with a keyset on the (occurred_at, event_id) index (migration
+  0006) instead of one sorted cursor over the whole history, and applies
+  projection_ops in coalesced bulk writes, flushing chunk N while chunk N+1 is
+  being reduced
+- writes into shadow collections (rm_sop_index__next, ...), builds indexes after
+  the load, then renames each shadow over its live collection (renameCollection
+  with dropTarget is atomic per collection)
+
+Usage (one-shot, same image as the projector):
+  python -m projection.rebuild
+
+Env:
+  POSTGRES_DSN                    (required)
+  MONGO_URI / MONGO_DB            (same as projector)
+  REBUILD_CHUNK_SIZE=5000         audit rows per bulk flush
+  REBUILD_SUFFIX=__next           shadow collection suffix
+  REBUILD_SWAP=true               false => load + index only, leave shadows for inspection
+
+Cut-over: after the main load a catch-up pass re-applies rows ingested since the
+load started (ingested_at BRIN, so only recent blocks are read). Rows in
+audit_event_default are replayed before the month partitions when they are older
+than the first one, after them otherwise. For an exact cut-over, pause the projector for the catch-up + swap;
+events it projects into the old collections after the catch-up are not carried over.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+from uuid import UUID
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from audit.partitions import PARENT, list_partitions, partition_month
+from core import codec
+from core.events import Actor, EventEnvelope
+from components.mongo_indexes import create_read_model_indexes
+from projection.bulk import ProjectionBatch
+from projection.main import projection_ops
+
+POSTGRES_DSN = os.getenv("POSTGRES_DSN")  # required
+MONGO_URI = os.getenv("MONGO_URI", "mongodb://ggp-mongo:27017")
+MONGO_DB = os.getenv("MONGO_DB", "ggp")
+
+CHUNK_SIZE = int(os.getenv("REBUILD_CHUNK_SIZE", "5000"))
+SUFFIX = os.getenv("REBUILD_SUFFIX", "__next")
+SWAP = os.getenv("REBUILD_SWAP", "true").strip().lower() in {"1", "true", "yes", "y", "on"}
+
+READ_MODELS = ("rm_sop_index", "rm_sop_versions", "rm_audit_trail")
+
+_COLUMNS = """
+    event_id, event_type, occurred_at, producer, correlation_id, causation_id,
+    actor_type, actor_id, actor_display, tenant_id, schema_version,
+    CAST(payload AS text) AS payload
+"""
+
+# {table} is a partition name from pg_inherits, checked against _partition_table()
+_PAGE_SQL = """
+    SELECT {columns}
+    FROM {table}
+    WHERE (occurred_at, event_id) > (:last_ts, :last_id)
+      AND occurred_at >= :lower AND occurred_at < :upper
+    ORDER BY occurred_at, event_id
+    LIMIT :limit
+"""
+
+_CATCH_UP_SQL = text(f"""
+    SELECT {_COLUMNS}
+    FROM audit_event
+    WHERE ingested_at >= :since
+    ORDER BY occurred_at, event_id
+""")
+
+_MIN_TS = datetime.min.replace(tzinfo=timezone.utc)
+_MAX_TS = datetime.max.replace(tzinfo=timezone.utc)
+_MIN_ID = UUID(int=0)
+
+# (partition, occurred_at lower bound, upper bound)
+Segment = Tuple[str, datetime, datetime]
+
+
+def row_to_envelope(row) -> EventEnvelope:
+    # audit_event rows were validated on ingest; build the envelope directly
+    return EventEnvelope(
+        row.event_id,
+        row.event_type,
+        row.occurred_at,
+        row.producer,
+        row.correlation_id,
+        row.causation_id,
+        Actor(type=row.actor_type, id=row.actor_id, display=row.actor_display),
+        row.tenant_id,
+        row.schema_version,
+        codec.loads(row.payload),
+    )
+
+
+class RebuildStats:
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.events = 0
+        self.skipped = 0
+        self.writes = 0
+
+    def rate(self) -> float:
+        elapsed = time.perf_counter() - self.started
+        return self.events / elapsed if elapsed > 0 else 0.0
+
+    def line(self) -> str:
+        return (
+            f"events={self.events} skipped={self.skipped} writes={self.writes} "
+            f"elapsed={time.perf_counter() - self.started:.1f}s rate={self.rate():.0f} events/s"
+        )
+
+
+def _partition_table(name: str) -> str:
+    if name != f"{PARENT}_default" and partition_month(name) is None:
+        raise RuntimeError(f"unexpected {PARENT} partition {name!r}")
+    return name
+
+
+async def replay_segments(pg) -> List[Segment]:
+    """Month partitions in time order, with the default partition split around them."""
+    async with pg.connect() as conn:
+        names = await list_partitions(conn)
+    months = sorted(n for n in names if partition_month(n) is not None)
+    segments: List[Segment] = [(_partition_table(n), _MIN_TS, _MAX_TS) for n in months]
+    default = f"{PARENT}_default"
+    if default in names:
+        if months:
+            m = partition_month(months[0])
+            first = datetime(m.year, m.month, 1, tzinfo=timezone.utc)
+            segments.insert(0, (default, _MIN_TS, first))
+            segments.append((default, first, _MAX_TS))
+        else:
+            segments.append((default, _MIN_TS, _MAX_TS))
+    return segments
+
+
+async def _pages(pg, segments: List[Segment]):
+    for table, lower, upper in segments:
+        sql = text(_PAGE_SQL.format(columns=_COLUMNS, table=table))
+        last_ts, last_id = _MIN_TS, _MIN_ID
+        while True:
+            async with pg.connect() as conn:
+                rows = (await conn.execute(sql, {
+                    "last_ts": last_ts, "last_id": last_id,
+                    "lower": lower, "upper": upper, "limit": CHUNK_SIZE,
+                })).all()
+            if rows:
+                yield rows
+            if len(rows) < CHUNK_SIZE:
+                break
+            last_ts, last_id = rows[-1].occurred_at, rows[-1].event_id
+
+
+async def _catch_up_pages(pg, since: datetime):
+    async with pg.connect() as conn:
+        result = await conn.stream(_CATCH_UP_SQL.execution_options(yield_per=CHUNK_SIZE), {"since": since})
+        async for rows in result.partitions(CHUNK_SIZE):
+            yield rows
+
+
+async def load(pg, mdb, *, stats: RebuildStats, since: Optional[datetime] = None) -> None:
+    """
+    Project audit_event into the shadow collections: every partition (keyset
+    pages), or with `since` only the rows ingested at/after it. Chunks are
+    flushed in order; one flush overlaps with reducing the next chunk.
+    """
+    pages = _pages(pg, await replay_segments(pg)) if since is None else _catch_up_pages(pg, since)
+    flushing = None
+    try:
+        async for rows in pages:
+            batch = ProjectionBatch()
+            for row in rows:
+                try:
+                    batch.add(projection_ops(row_to_envelope(row)))
+                except Exception:
+                    # event types the projector does not handle (DLQ'd live as well)
+                    stats.skipped += 1
+                    continue
+                stats.events += 1
+
+            if flushing is not None:
+                stats.writes += await flushing
+            flushing = asyncio.create_task(batch.flush(mdb, collection_suffix=SUFFIX))
+            print(f"[rebuild] {stats.line()}")
+        if flushing is not None:
+            stats.writes += await flushing
+    except BaseException:
+        if flushing is not None and not flushing.done():
+            flushing.cancel()
+            await asyncio.gather(flushing, return_exceptions=True)
+        raise
+    finally:
+        await pages.aclose()
+
+
+async def swap(mdb) -> None:
+    existing = set(await mdb.list_collection_names())
+    for name in READ_MODELS:
+        if name + SUFFIX not in existing:
+            continue  # nothing projected into it (e.g. no events of that kind)
+        await mdb[name + SUFFIX].rename(name, dropTarget=True)
+        print(f"[rebuild] swapped {name + SUFFIX} -> {name}")
+
+
+async def main() -> None:
+    if not POSTGRES_DSN:
+        raise RuntimeError("POSTGRES_DSN is required")
+    if not SUFFIX:
+        raise RuntimeError("REBUILD_SUFFIX must be non-empty (shadow collections)")
+
+    pg = create_async_engine(POSTGRES_DSN, pool_pre_ping=True)
+    mongo = AsyncIOMotorClient(MONGO_URI)
+    mdb = mongo[MONGO_DB]
+    try:
+        for name in READ_MODELS:
+            await mdb.drop_collection(name + SUFFIX)
+
+        stats = RebuildStats()
+        load_started = datetime.now(timezone.utc)
+        print(f"[rebuild] loading audit_event into *{SUFFIX} (chunk={CHUNK_SIZE})")
+        await load(pg, mdb, stats=stats)
+
+        print("[rebuild] building indexes")
+        await create_read_model_indexes(mdb, SUFFIX)
+
+        # rows that arrived while loading; upserts are idempotent so overlap is harmless
+        print("[rebuild] catch-up pass")
+        await load(pg, mdb, stats=stats, since=load_started)
+
+        if SWAP:
+            await swap(mdb)
+        print(f"[rebuild] done {stats.line()}")
+    finally:
+        await pg.dispose()
+        mongo.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
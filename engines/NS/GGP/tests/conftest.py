@@ -0,0 +1,6 @@
+# tests/conftest.py
+# Modules import as top-level packages (components, api, ...) from the GGP root.
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("pymongo")
+
+from projection.bulk import ProjectionBatch
+
+
+class FakeCollection:
+    def __init__(self):
+        self.calls = []
+
+    async def bulk_write(self, requests, ordered=True):
+        self.calls.append((requests, ordered))
+
+
+class FakeDb(dict):
+    def __missing__(self, name):
+        coll = self[name] = FakeCollection()
+        return coll
+
+
+def test_ops_for_same_id_coalesce_last_writer_wins():
+    batch = ProjectionBatch()
+    batch.add([
+        ("rm_sop_index", "s1", {"status": "draft", "title": "A"}),
+        ("rm_sop_index", "s2", {"status": "draft"}),
+    ])
+    batch.add([("rm_sop_index", "s1", {"status": "published"})])
+
+    assert len(batch) == 2
+    assert batch.ops_added == 3
+
+    db = FakeDb()
+    assert asyncio.run(batch.flush(db)) == 2
+
+    (requests, ordered), = db["rm_sop_index"].calls
+    assert ordered is False
+    docs = {r._filter["_id"]: r._doc["$set"] for r in requests}
+    assert docs == {"s1": {"status": "published", "title": "A"}, "s2": {"status": "draft"}}
+    assert len(batch) == 0 and batch.ops_added == 0
+
+
+def test_add_does_not_alias_caller_doc():
+    doc = {"status": "draft"}
+    batch = ProjectionBatch()
+    batch.add([("rm_sop_index", "s1", doc)])
+    batch.add([("rm_sop_index", "s1", {"status": "published"})])
+    assert doc == {"status": "draft"}
+
+
+def test_flush_one_bulk_write_per_collection_with_suffix():
+    batch = ProjectionBatch()
+    batch.add([
+        ("rm_sop_index", "s1", {"a": 1}),
+        ("rm_sop_version", "v1", {"b": 2}),
+    ])
+    db = FakeDb()
+    assert asyncio.run(batch.flush(db, collection_suffix="__next")) == 2
+    assert set(db) == {"rm_sop_index__next", "rm_sop_version__next"}
+    assert all(len(c.calls) == 1 for c in db.values())
+
+
+def test_failed_flush_keeps_batch():
+    class Failing:
+        async def bulk_write(self, requests, ordered=True):
+            raise RuntimeError("down")
+
+    batch = ProjectionBatch()
+    batch.add([("rm_sop_index", "s1", {"a": 1})])
+    with pytest.raises(RuntimeError):
+        asyncio.run(batch.flush({"rm_sop_index": Failing()}))
+    assert len(batch) == 1
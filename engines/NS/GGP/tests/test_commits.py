@@ -0,0 +1,165 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("aiokafka")
+
+from aiokafka import TopicPartition
+from aiokafka.errors import CommitFailedError
+
+from components.commits import CommitManager
+from components.offsets import OffsetTracker
+
+TP0 = TopicPartition("sop.created", 0)
+TP1 = TopicPartition("sop.created", 1)
+
+
+class FakeConsumer:
+    def __init__(self, assigned=(TP0, TP1)):
+        self.assigned = set(assigned)
+        self.committed = []
+        self.fail_next = None
+
+    def assignment(self):
+        return set(self.assigned)
+
+    async def commit(self, offsets):
+        if self.fail_next is not None:
+            err, self.fail_next = self.fail_next, None
+            raise err
+        self.committed.append(dict(offsets))
+
+
+def _msgs(*offsets):
+    return [SimpleNamespace(offset=o) for o in offsets]
+
+
+# ---------------------------
+# OffsetTracker
+# ---------------------------
+
+def test_tracker_never_passes_unfinished_offset():
+    t = OffsetTracker()
+    for off in (10, 11, 12):
+        t.begin(off)
+    assert t.committable() is None
+    t.complete(12)
+    t.complete(10)
+    assert t.committable() == 11
+    assert t.in_flight == 2
+    t.complete(11)
+    assert t.committable() == 13
+    assert t.in_flight == 0
+
+
+def test_tracker_take_commit_only_when_moved():
+    t = OffsetTracker()
+    t.begin(0)
+    t.complete(0)
+    assert t.take_commit() == 1
+    assert t.take_commit() is None
+    t.retry_commit()
+    assert t.take_commit() == 1
+
+
+# ---------------------------
+# CommitManager
+# ---------------------------
+
+def test_every_n_triggers_commit():
+    consumer = FakeConsumer()
+    cm = CommitManager(consumer, every_n=3, interval_s=3600)
+
+    async def run():
+        for off in range(2):
+            cm.done(TP0, off)
+        await cm.maybe_commit()
+        assert consumer.committed == []
+        cm.done(TP0, 2)
+        await cm.maybe_commit()
+
+    asyncio.run(run())
+    assert consumer.committed == [{TP0: 3}]
+    assert cm.commits == 1
+
+
+def test_interval_triggers_commit():
+    now = [0.0]
+    consumer = FakeConsumer()
+    cm = CommitManager(consumer, every_n=1000, interval_s=1.0, clock=lambda: now[0])
+
+    async def run():
+        cm.done(TP0, 0)
+        await cm.maybe_commit()
+        assert consumer.committed == []
+        now[0] = 1.5
+        await cm.maybe_commit()
+
+    asyncio.run(run())
+    assert consumer.committed == [{TP0: 1}]
+    assert not cm.due
+
+
+def test_out_of_order_completion_commits_contiguous_prefix():
+    consumer = FakeConsumer()
+    cm = CommitManager(consumer, every_n=1000, interval_s=3600)
+    trackers = [cm.begin(TP0, off) for off in range(3)]
+    cm.complete(TP0, 2, trackers[2])
+    cm.complete(TP0, 0, trackers[0])
+
+    assert asyncio.run(cm.flush()) == {TP0: 1}
+
+
+def test_revoke_commits_then_forgets_partition():
+    consumer = FakeConsumer()
+    committed = []
+    cm = CommitManager(consumer, every_n=1000, interval_s=3600, on_commit=committed.append)
+    cm.complete_batch(TP0, _msgs(0, 1), cm.begin_batch(TP0, _msgs(0, 1)))
+    cm.done(TP1, 7)
+
+    asyncio.run(cm.revoke([TP0]))
+    assert consumer.committed == [{TP0: 2}]
+    assert committed == [{TP0: 2}]
+
+    # completions for a revoked partition are ignored
+    cm.complete(TP0, 2)
+    consumer.assigned.discard(TP0)
+    assert asyncio.run(cm.flush()) == {TP1: 8}
+
+
+def test_stale_tracker_completion_is_ignored_after_reassignment():
+    consumer = FakeConsumer()
+    cm = CommitManager(consumer, every_n=1000, interval_s=3600)
+    stale = cm.begin(TP0, 0)
+    asyncio.run(cm.revoke([TP0]))
+
+    fresh = cm.begin(TP0, 0)
+    cm.complete(TP0, 0, stale)
+    assert asyncio.run(cm.flush()) == {}
+    cm.complete(TP0, 0, fresh)
+    assert asyncio.run(cm.flush()) == {TP0: 1}
+
+
+def test_unassigned_partition_is_dropped_not_committed():
+    consumer = FakeConsumer(assigned=[TP1])
+    cm = CommitManager(consumer, every_n=1000, interval_s=3600)
+    cm.done(TP0, 0)
+
+    assert asyncio.run(cm.flush()) == {}
+    assert consumer.committed == []
+
+
+def test_rejected_commit_is_retried_by_next_flush():
+    consumer = FakeConsumer()
+    cm = CommitManager(consumer, every_n=1, interval_s=3600)
+    cm.done(TP0, 0)
+    consumer.fail_next = CommitFailedError()
+
+    async def run():
+        assert await cm.flush() == {}
+        assert cm.due
+        assert await cm.flush() == {TP0: 1}
+
+    asyncio.run(run())
+    assert consumer.committed == [{TP0: 1}]
@@ -0,0 +1,55 @@
+import pytest
+
+from components.dedup_cache import RecentEventCache, cache_from_env
+
+
+def test_lru_eviction_and_ttl_expiry():
+    now = [0.0]
+    cache = RecentEventCache(2, ttl_seconds=10, clock=lambda: now[0])
+    cache.add_many(["a", "b"])
+    assert cache.seen("a")  # a is now most recent
+    cache.add("c")          # evicts b
+    assert not cache.seen("b")
+    assert cache.evictions == 1
+
+    now[0] = 11.0
+    assert not cache.seen("a")
+    assert cache.expirations == 1
+    assert cache.stats() == {
+        "size": 1,
+        "max_size": 2,
+        "hits": 1,
+        "misses": 2,
+        "hit_ratio": 1 / 3,
+        "evictions": 1,
+        "expirations": 1,
+    }
+
+
+def test_cache_from_env(monkeypatch):
+    monkeypatch.setenv("DEDUP_CACHE_SIZE", "0")
+    assert cache_from_env() is None
+    monkeypatch.setenv("DEDUP_CACHE_SIZE", "10")
+    monkeypatch.setenv("DEDUP_CACHE_TTL_S", "2.5")
+    cache = cache_from_env()
+    assert (cache.max_size, cache.ttl_seconds) == (10, 2.5)
+
+
+def test_counters_are_exported():
+    pytest.importorskip("prometheus_client")
+    from prometheus_client import REGISTRY
+
+    from components.metrics import ConsumerMetrics
+
+    cache = RecentEventCache(10)
+    cache.add("a")
+    cache.seen("a")
+    cache.seen("b")
+    ConsumerMetrics("test-dedup").watch_cache(cache)
+
+    sample = lambda name: REGISTRY.get_sample_value(name, {"service": "test-dedup"})
+    assert sample("ggp_dedup_cache_hits_total") == 1
+    assert sample("ggp_dedup_cache_misses_total") == 1
+    assert sample("ggp_dedup_cache_size") == 1
+    cache.seen("a")
+    assert sample("ggp_dedup_cache_hits_total") == 2
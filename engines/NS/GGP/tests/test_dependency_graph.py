@@ -0,0 +1,99 @@
+import pytest
+
+from dependency_graph.graph import COMPONENT, SOP, CycleError, DependencyGraph
+
+
+def _graph(edges, sops=()):
+    g = DependencyGraph()
+    for dependent, dependency in edges:
+        g.add_node(dependency, SOP if dependency in sops else COMPONENT)
+        g.add_node(dependent, SOP if dependent in sops else COMPONENT)
+        g.add_dependency(dependent, dependency)
+    return g
+
+
+def _assert_topological(g):
+    pos = {n: i for i, n in enumerate(g.topological_order())}
+    for node in g.nodes():
+        for dep in g.dependencies(node):
+            assert pos[dep] < pos[node]
+
+
+def test_add_and_remove_nodes_and_edges():
+    g = _graph([("b", "a"), ("c", "b")])
+    assert len(g) == 3 and g.edge_count == 2
+    assert g.dependents("a") == {"b"}
+    assert g.dependencies("c") == {"b"}
+    assert g.add_dependency("b", "a") is False
+
+    assert g.remove_dependency("c", "b") is True
+    assert g.remove_dependency("c", "b") is False
+    assert g.edge_count == 1
+
+    g.remove_node("b")
+    assert "b" not in g
+    assert g.edge_count == 0
+    assert g.dependents("a") == set()
+    with pytest.raises(KeyError):
+        g.remove_node("b")
+
+
+def test_add_node_keeps_kind_unless_given():
+    g = DependencyGraph()
+    g.add_node("s", SOP)
+    g.add_node("s")
+    assert g.kind("s") == SOP
+    g.add_node("s", COMPONENT)
+    assert g.nodes(SOP) == []
+
+
+def test_cycle_is_rejected_and_graph_unchanged():
+    g = _graph([("b", "a"), ("c", "b")])
+    assert g.would_create_cycle("a", "c")
+    with pytest.raises(CycleError) as exc:
+        g.add_dependency("a", "c")
+    assert exc.value.cycle[0] == exc.value.cycle[-1]
+    assert set(exc.value.cycle) == {"a", "b", "c"}
+    assert g.edge_count == 2
+    assert g.dependencies("a") == set()
+
+    with pytest.raises(CycleError):
+        g.add_dependency("a", "a")
+
+
+def test_ranks_stay_topological_under_reordering_inserts():
+    g = DependencyGraph()
+    for n in "abcdef":
+        g.add_node(n)
+    # each edge runs against insertion order, forcing re-ranks
+    for dependent, dependency in [("a", "b"), ("b", "c"), ("d", "e"), ("a", "f"), ("c", "e")]:
+        g.add_dependency(dependent, dependency)
+        _assert_topological(g)
+    assert not g.would_create_cycle("f", "e")
+    assert g.would_create_cycle("e", "a")
+
+
+def test_impact_order_and_kind_filter():
+    # a <- b <- d, a <- c <- d, d <- s (SOP)
+    g = _graph([("b", "a"), ("c", "a"), ("d", "b"), ("d", "c"), ("s", "d")], sops={"s"})
+    impact = g.impact("a")
+    assert impact.affected == {"b", "c", "d", "s"}
+    assert impact.order.index("d") > max(impact.order.index("b"), impact.order.index("c"))
+    assert impact.order[-1] == "s"
+
+    assert g.impact("a", kind=SOP).affected == {"s"}
+    assert g.impact(["b", "c"]).affected == {"d", "s"}
+    assert g.impact("s").affected == set()
+
+
+def test_from_edges_bulk_load_and_cycle():
+    nodes = [("a", COMPONENT), ("b", COMPONENT), ("c", SOP)]
+    g = DependencyGraph.from_edges(nodes, [("b", "a"), ("c", "b")])
+    assert g.topological_order() == ["a", "b", "c"]
+    assert g.edge_count == 2
+    g.add_dependency("c", "a")
+    _assert_topological(g)
+
+    with pytest.raises(CycleError) as exc:
+        DependencyGraph.from_edges(nodes, [("b", "a"), ("c", "b"), ("a", "c")])
+    assert set(exc.value.cycle) == {"a", "b", "c"}
@@ -0,0 +1,62 @@
+import dataclasses
+from datetime import datetime, timezone
+from uuid import uuid4
+
+import pytest
+
+from core.events import Actor, EventEnvelope, parse_envelope, parse_envelopes
+
+
+def _obj(**overrides):
+    obj = {
+        "event_id": str(uuid4()),
+        "event_type": "ggp.core.sop.created",
+        "occurred_at": "2024-01-01T12:30:00.250Z",
+        "producer": "ggp-api",
+        "correlation_id": str(uuid4()),
+        "causation_id": None,
+        "actor": {"type": "user", "id": "u1", "display": "U One"},
+        "tenant_id": None,
+        "schema_version": 1,
+        "payload": {"sop_id": "s1"},
+    }
+    obj.update(overrides)
+    return obj
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("2024-01-01T12:30:00.250Z", datetime(2024, 1, 1, 12, 30, 0, 250000, tzinfo=timezone.utc)),
+    ("2024-01-01T12:30:00+00:00", datetime(2024, 1, 1, 12, 30, tzinfo=timezone.utc)),
+    # offset-less and date-only values were accepted before the fast decoder
+    ("2024-01-01T00:00:00", datetime(2024, 1, 1)),
+    ("2024-01-01", datetime(2024, 1, 1)),
+])
+def test_occurred_at_accepts_original_forms(value, expected):
+    assert parse_envelope(_obj(occurred_at=value)).occurred_at == expected
+
+
+def test_envelope_is_a_frozen_dataclass():
+    env = parse_envelope(_obj())
+    assert dataclasses.is_dataclass(env)
+    assert env != tuple(dataclasses.astuple(env))
+    assert dataclasses.asdict(env)["actor"] == {"type": "user", "id": "u1", "display": "U One"}
+    assert dataclasses.replace(env, tenant_id="t1").tenant_id == "t1"
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        env.tenant_id = "t1"
+    assert parse_envelope(_obj(event_id=str(env.event_id), correlation_id=str(env.correlation_id))) == env
+
+
+def test_actor_instances_are_shared():
+    a, b = parse_envelope(_obj()), parse_envelope(_obj())
+    assert a.actor is b.actor
+    assert a.actor == Actor("user", "u1", "U One")
+
+
+def test_batch_returns_errors_in_place():
+    good = _obj()
+    bad_ts, missing = _obj(occurred_at="yesterday"), _obj()
+    del missing["actor"]
+    out = parse_envelopes([good, bad_ts, missing])
+    assert isinstance(out[0], EventEnvelope)
+    assert isinstance(out[1], ValueError)
+    assert isinstance(out[2], ValueError) and "actor" in str(out[2])
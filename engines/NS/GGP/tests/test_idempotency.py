@@ -0,0 +1,153 @@
+import asyncio
+from uuid import uuid4
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from components.dedup_cache import RecentEventCache
+from components.pg_idempotency import KafkaMeta, mark_processed, mark_processed_many, try_mark_processed_many
+
+
+class FakeResult:
+    def __init__(self, rows, rowcount=None):
+        self._rows = rows
+        self.rowcount = rowcount
+
+    def __iter__(self):
+        return iter(self._rows)
+
+
+class FakeLedgerConn:
+    """Acts as consumer_processed_event: ON CONFLICT DO NOTHING RETURNING event_id."""
+
+    def __init__(self, existing=()):
+        self.rows = set(str(e) for e in existing)
+        self.calls = []
+
+    async def execute(self, stmt, params):
+        self.calls.append(params)
+        if "eids" in params:
+            new = [eid for eid in params["eids"] if eid not in self.rows]
+            self.rows.update(new)
+            return FakeResult([(eid,) for eid in new])
+        eid = str(params["eid"])
+        inserted = eid not in self.rows
+        self.rows.add(eid)
+        return FakeResult([], rowcount=1 if inserted else 0)
+
+
+class FakeEngine:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def begin(self):
+        conn = self.conn
+
+        class _Tx:
+            async def __aenter__(self):
+                return conn
+
+            async def __aexit__(self, *exc):
+                return False
+
+        return _Tx()
+
+
+def _items(ids):
+    return [(eid, "sop.created", KafkaMeta("sop.created", 0, i)) for i, eid in enumerate(ids)]
+
+
+def test_mark_many_returns_only_newly_inserted():
+    dup, a, b = uuid4(), uuid4(), uuid4()
+    conn = FakeLedgerConn(existing=[dup])
+
+    inserted = asyncio.run(mark_processed_many(conn, "cg", _items([a, dup, b])))
+
+    assert inserted == {a, b}
+    assert len(conn.calls) == 1
+    assert conn.calls[0]["cg"] == "cg"
+    assert conn.calls[0]["offs"] == [0, 1, 2]
+
+
+def test_mark_many_inserts_in_batch_repeat_once():
+    a, b = uuid4(), uuid4()
+    conn = FakeLedgerConn()
+
+    inserted = asyncio.run(mark_processed_many(conn, "cg", _items([a, b, a])))
+
+    assert inserted == {a, b}
+    assert conn.calls[0]["eids"] == [str(a), str(b)]
+
+
+def test_mark_many_empty_batch_makes_no_round_trip():
+    conn = FakeLedgerConn()
+    assert asyncio.run(mark_processed_many(conn, "cg", [])) == set()
+    assert conn.calls == []
+
+
+def test_try_mark_many_redelivery_is_not_new():
+    a, b = uuid4(), uuid4()
+    conn = FakeLedgerConn()
+    engine = FakeEngine(conn)
+
+    assert asyncio.run(try_mark_processed_many(engine, "cg", _items([a, b]))) == {a, b}
+    assert asyncio.run(try_mark_processed_many(engine, "cg", _items([b, a]))) == set()
+
+
+def test_mark_many_returns_inserted_and_caches_only_duplicates():
+    dup, a, b = uuid4(), uuid4(), uuid4()
+    conn = FakeLedgerConn(existing=[dup])
+    cache = RecentEventCache(100)
+
+    inserted = asyncio.run(mark_processed_many(conn, "cg", _items([a, dup, b]), cache=cache))
+
+    assert inserted == {a, b}
+    # new ids may still roll back with the caller's transaction: not cached yet
+    assert cache.seen(dup)
+    assert not cache.seen(a)
+    assert not cache.seen(b)
+
+
+def test_mark_many_skips_cache_hits_and_in_batch_repeats():
+    known, a = uuid4(), uuid4()
+    conn = FakeLedgerConn()
+    cache = RecentEventCache(100)
+    cache.add(known)
+
+    inserted = asyncio.run(mark_processed_many(conn, "cg", _items([known, a, a]), cache=cache))
+
+    assert inserted == {a}
+    assert conn.calls[0]["eids"] == [str(a)]
+    assert cache.hits == 1
+
+
+def test_mark_many_all_cached_makes_no_round_trip():
+    a = uuid4()
+    conn = FakeLedgerConn()
+    cache = RecentEventCache(100)
+    cache.add(a)
+
+    assert asyncio.run(mark_processed_many(conn, "cg", _items([a]), cache=cache)) == set()
+    assert conn.calls == []
+
+
+def test_try_mark_many_caches_inserted_after_commit():
+    a, b = uuid4(), uuid4()
+    conn = FakeLedgerConn()
+    cache = RecentEventCache(100)
+
+    assert asyncio.run(try_mark_processed_many(FakeEngine(conn), "cg", _items([a, b]), cache=cache)) == {a, b}
+    # a redelivery is answered from the cache
+    assert asyncio.run(try_mark_processed_many(FakeEngine(conn), "cg", _items([a, b]), cache=cache)) == set()
+    assert len(conn.calls) == 1
+
+
+def test_mark_one_duplicate_is_cached():
+    a = uuid4()
+    conn = FakeLedgerConn(existing=[a])
+    cache = RecentEventCache(100)
+
+    assert asyncio.run(mark_processed(conn, "cg", a, "sop.created", KafkaMeta(), cache=cache)) is False
+    assert asyncio.run(mark_processed(conn, "cg", a, "sop.created", KafkaMeta(), cache=cache)) is False
+    assert len(conn.calls) == 1
@@ -0,0 +1,110 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("sqlalchemy")
+
+from fastapi import HTTPException, Response
+
+from api.routes import decode_cursor, encode_cursor, keyset_filter, list_sops, page_etag
+
+T0 = datetime(2025, 3, 1, 12, 0, tzinfo=timezone.utc)
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+        self.filter = None
+        self.limit_n = None
+
+    def sort(self, keys):
+        self.sort_keys = keys
+        return self
+
+    def limit(self, n):
+        self.limit_n = n
+        return self
+
+    async def to_list(self, length):
+        return self.docs[:length]
+
+
+class FakeIndex:
+    def __init__(self, docs):
+        self.docs = docs
+        self.last = None
+
+    def find(self, flt, projection):
+        self.last = FakeCursor(self.docs)
+        self.last.filter = flt
+        return self.last
+
+
+def _request(docs, headers=None):
+    index = FakeIndex(docs)
+    app = SimpleNamespace(state=SimpleNamespace(mdb={"rm_sop_index": index}))
+    return SimpleNamespace(app=app, headers=headers or {}), index
+
+
+def _docs(n):
+    return [{"_id": f"s{i}", "updated_at": T0 - timedelta(minutes=i)} for i in range(n)]
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor(T0, "sop-1")
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (T0, "sop-1")
+
+
+@pytest.mark.parametrize("cursor", ["not base64!", "e30", encode_cursor(T0, "x")[:-3]])
+def test_invalid_cursor_is_400(cursor):
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor(cursor)
+    assert exc.value.status_code == 400
+
+
+def test_keyset_filter_after_cursor():
+    base = {"status": "published"}
+    assert keyset_filter(base, None) is base
+    flt = keyset_filter(base, encode_cursor(T0, "s3"))
+    assert flt["status"] == "published"
+    assert flt["$or"] == [
+        {"updated_at": {"$lt": T0}},
+        {"updated_at": T0, "_id": {"$lt": "s3"}},
+    ]
+
+
+def test_page_etag_changes_with_page_content():
+    docs = _docs(2)
+    etag = page_etag(docs, None)
+    assert etag.startswith('W/"')
+    assert page_etag(_docs(2), None) == etag
+    assert page_etag(docs, "next") != etag
+    assert page_etag([{**docs[0], "updated_at": T0 + timedelta(seconds=1)}, docs[1]], None) != etag
+
+
+def test_list_sops_pages_and_returns_304_on_match():
+    docs = _docs(3)
+    request, index = _request(docs)
+    response = Response()
+    body = asyncio.run(list_sops(request, response, {}, limit=2, cursor=None))
+
+    assert index.last.limit_n == 3
+    assert [d["_id"] for d in body["items"]] == ["s0", "s1"]
+    assert body["next_cursor"] == encode_cursor(docs[1]["updated_at"], "s1")
+    etag = response.headers["etag"]
+
+    request, _ = _request(docs, {"if-none-match": f'W/"other", {etag}'})
+    not_modified = asyncio.run(list_sops(request, Response(), {}, limit=2, cursor=None))
+    assert not_modified.status_code == 304
+    assert not_modified.headers["etag"] == etag
+    assert not_modified.body == b""
+
+
+def test_list_sops_last_page_has_no_cursor():
+    request, _ = _request(_docs(2))
+    body = asyncio.run(list_sops(request, Response(), {}, limit=2, cursor=None))
+    assert body["next_cursor"] is None
@@ -0,0 +1,81 @@
+import os
+
+import pytest
+
+from dependency_graph.graph import COMPONENT, SOP, DependencyGraph
+from dependency_graph.snapshot import (
+    CURRENT_FILE,
+    SnapshotError,
+    encode_snapshot,
+    load_current,
+    load_snapshot,
+    write_snapshot,
+)
+
+
+@pytest.fixture
+def graph():
+    return DependencyGraph.from_edges(
+        [("a", COMPONENT), ("b", COMPONENT), ("c", SOP), ("sop-ü", SOP)],
+        [("b", "a"), ("c", "b"), ("sop-ü", "a"), ("c", "sop-ü")],
+    )
+
+
+def test_round_trip(tmp_path, graph):
+    path = write_snapshot(graph, str(tmp_path))
+    with load_current(str(tmp_path)) as snap:
+        assert os.path.basename(path) == (tmp_path / CURRENT_FILE).read_text().strip()
+        assert len(snap) == len(graph)
+        assert "sop-ü" in snap and "missing" not in snap
+        assert snap.kind("c") == SOP
+        assert snap.dependents("a") == graph.dependents("a")
+        assert snap.dependencies("c") == graph.dependencies("c")
+        assert sorted(snap.edges()) == sorted((d, n) for n in graph.nodes() for d in graph.dependents(n))
+        assert snap.impact("a").affected == graph.impact("a").affected
+        assert snap.impact("a", kind=SOP).affected == {"c", "sop-ü"}
+
+        order = snap.topological_order()
+        assert order.index("a") < order.index("b") < order.index("c")
+
+        copy = snap.to_graph()
+    assert copy.edge_count == graph.edge_count
+    assert encode_snapshot(copy) == encode_snapshot(graph)
+
+
+def test_same_content_same_file(tmp_path, graph):
+    first = write_snapshot(graph, str(tmp_path))
+    assert write_snapshot(DependencyGraph.from_edges(
+        [(n, graph.kind(n)) for n in reversed(graph.topological_order())],
+        [(d, n) for n in graph.nodes() for d in graph.dependents(n)],
+    ), str(tmp_path)) == first
+
+
+def _write(tmp_path, data):
+    path = tmp_path / "graph.snap"
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_corrupt_body_fails_hash_check(tmp_path, graph):
+    data = bytearray(encode_snapshot(graph)[0])
+    data[-1] ^= 0xFF
+    path = _write(tmp_path, bytes(data))
+    with pytest.raises(SnapshotError, match="hash"):
+        load_snapshot(path)
+
+
+def test_truncated_snapshot(tmp_path, graph):
+    data = encode_snapshot(graph)[0]
+    with pytest.raises(SnapshotError):
+        load_snapshot(_write(tmp_path, data[:-8]))
+
+
+@pytest.mark.parametrize("data", [b"", b"not a snapshot at all", b"GGPSNAP1\x05\x00\x00\x00{oops"])
+def test_garbage_is_rejected(tmp_path, data):
+    with pytest.raises(SnapshotError):
+        load_snapshot(_write(tmp_path, data))
+
+
+def test_missing_current_pointer(tmp_path):
+    with pytest.raises(SnapshotError):
+        load_current(str(tmp_path))
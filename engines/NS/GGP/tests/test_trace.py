@@ -0,0 +1,104 @@
+import json
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from api.trace import TraceCache, build_trace
+
+T0 = datetime(2025, 3, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def _row(event_id, causation_id=None, minute=0):
+    return SimpleNamespace(
+        event_id=event_id,
+        event_type="sop.created",
+        occurred_at=T0 + timedelta(minutes=minute),
+        producer="ggp-api",
+        causation_id=causation_id,
+        actor_type="user",
+        actor_id="u1",
+        actor_display="U One",
+        tenant_id=None,
+        kafka_topic="sop.created",
+        kafka_partition=0,
+        kafka_offset=minute,
+    )
+
+
+def _ids(nodes):
+    return [n["event_id"] for n in nodes]
+
+
+def test_tree_follows_causation_links():
+    a, b, c, d = (uuid4() for _ in range(4))
+    trace = build_trace(uuid4(), [_row(a), _row(b, a, 1), _row(c, a, 2), _row(d, b, 3)])
+
+    assert trace["event_count"] == 4
+    root, = trace["roots"]
+    assert root["event_id"] == str(a)
+    assert _ids(root["children"]) == [str(b), str(c)]
+    assert _ids(root["children"][0]["children"]) == [str(d)]
+    json.dumps(trace)
+
+
+def test_cause_outside_correlation_is_external_root():
+    a, outside = uuid4(), uuid4()
+    trace = build_trace(uuid4(), [_row(a, outside)])
+    root, = trace["roots"]
+    assert root["external_cause"] is True
+
+
+def test_self_caused_event_is_a_cycle_root():
+    a, b = uuid4(), uuid4()
+    root, = build_trace(uuid4(), [_row(a, a), _row(b, a, 1)])["roots"]
+    assert root["event_id"] == str(a)
+    assert root["causation_cycle"] is True
+    assert "external_cause" not in root
+    assert _ids(root["children"]) == [str(b)]
+
+
+def test_cycle_is_cut_at_earliest_event():
+    a, b, c, d = (uuid4() for _ in range(4))
+    # a -> b -> c -> a, with d hanging off c
+    rows = [_row(a, c, 0), _row(b, a, 1), _row(c, b, 2), _row(d, c, 3)]
+    trace = build_trace(uuid4(), rows)
+
+    root, = trace["roots"]
+    assert root["event_id"] == str(a)
+    assert root["causation_cycle"] is True
+    assert _ids(root["children"]) == [str(b)]
+    c_node, = root["children"][0]["children"]
+    assert _ids(c_node["children"]) == [str(d)]
+    # the cut edge is gone, so the tree serializes
+    assert json.loads(json.dumps(trace))["event_count"] == 4
+
+
+def test_cycle_next_to_normal_tree():
+    r, x, y = uuid4(), uuid4(), uuid4()
+    trace = build_trace(uuid4(), [_row(r), _row(x, y, 1), _row(y, x, 2)])
+    assert _ids(trace["roots"]) == [str(r), str(x)]
+    assert "causation_cycle" not in trace["roots"][0]
+
+
+def test_cache_drops_load_overlapping_invalidation():
+    cache = TraceCache(max_size=2)
+    cache.enabled = True
+    token = cache.begin_load("k")
+    cache.invalidate("k")
+    cache.finish_load("k", token, b"stale")
+    assert cache.get("k") is None
+
+    token = cache.begin_load("k")
+    cache.finish_load("k", token, b"fresh")
+    assert cache.get("k") == b"fresh"
+
+
+def test_disabled_cache_stores_nothing():
+    cache = TraceCache()
+    token = cache.begin_load("k")
+    cache.finish_load("k", token, b"value")
+    assert cache.get("k") is None
@@ -0,0 +1,85 @@
+import json
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from versioning.manager import DELTA, FULL, canonical_json, content_hash, diff, encode_content, patch
+
+BASE = {
+    "title": "Incident response",
+    "owner": "ops",
+    "steps": [{"n": i, "text": f"step {i} " + "x" * 40} for i in range(20)],
+    "tags": ["a", "b"],
+}
+
+
+def _edited():
+    doc = json.loads(json.dumps(BASE))
+    doc["title"] = "Incident response v2"
+    del doc["owner"]
+    doc["steps"][5]["text"] = "rewritten"
+    doc["steps"].insert(10, {"n": 99, "text": "new"})
+    del doc["steps"][15]
+    doc["tags"].append("c")
+    return doc
+
+
+@pytest.mark.parametrize("new", [
+    _edited(),
+    {"title": "other"},
+    [1, 2, 3],
+    "scalar",
+    {**BASE, "tags": []},
+    {**BASE, "steps": list(reversed(BASE["steps"]))},
+])
+def test_patch_of_diff_rebuilds_new(new):
+    d = diff(BASE, new)
+    assert patch(BASE, d) == new
+    # deltas are stored as JSON
+    assert patch(BASE, json.loads(canonical_json(d))) == new
+
+
+def test_equal_content_has_no_diff():
+    assert diff(BASE, json.loads(json.dumps(BASE))) is None
+    # 1 == True in Python but not in JSON: no delta is found, so the version is stored in full
+    encoding, body, _, _ = encode_content({"a": True}, prev={"a": 1}, prev_depth=0)
+    assert (encoding, body) == (FULL, b'{"a":true}')
+
+
+def test_patch_does_not_mutate_base():
+    before = canonical_json(BASE)
+    patch(BASE, diff(BASE, _edited()))
+    assert canonical_json(BASE) == before
+
+
+def test_content_hash_is_key_order_independent():
+    assert content_hash({"a": 1, "b": 2}) == content_hash({"b": 2, "a": 1})
+
+
+def test_first_version_is_keyframe():
+    encoding, body, depth, size = encode_content(BASE)
+    assert (encoding, depth) == (FULL, 0)
+    assert body == canonical_json(BASE) and size == len(body)
+
+
+def test_small_edit_is_delta():
+    new = _edited()
+    encoding, body, depth, size = encode_content(new, prev=BASE, prev_depth=3, keyframe_interval=16)
+    assert (encoding, depth) == (DELTA, 4)
+    assert size == len(canonical_json(new)) > len(body)
+    assert patch(BASE, json.loads(body)) == new
+
+
+def test_keyframe_interval_forces_full():
+    encoding, _, depth, _ = encode_content(_edited(), prev=BASE, prev_depth=14, keyframe_interval=16)
+    assert encoding == DELTA and depth == 15
+    encoding, _, depth, _ = encode_content(_edited(), prev=BASE, prev_depth=15, keyframe_interval=16)
+    assert (encoding, depth) == (FULL, 0)
+
+
+def test_large_delta_falls_back_to_full():
+    rewrite = {"title": "entirely different", "body": "y" * 2000}
+    encoding, body, depth, _ = encode_content(rewrite, prev=BASE, prev_depth=0)
+    assert (encoding, depth) == (FULL, 0)
+    assert body == canonical_json(rewrite)
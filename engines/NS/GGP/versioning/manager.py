@@ -0,0 +1,346 @@
+# versioning/manager.py
+"""
+SOP version storage: content addressed by hash, delta-encoded between versions.
+
+sop_version rows carry only content_hash; the document lives once in sop_content
+(migration 0005), however many versions or SOPs share it:
+
+- content_hash = sha256 of the canonical JSON (sorted keys, no whitespace), so
+  identical content always dedups, across versions and across SOPs
+- a new document is stored as a delta against the SOP's previous version, or as
+  a full keyframe when: there is no previous version in sop_content, the delta
+  chain would reach SOP_KEYFRAME_INTERVAL, or the delta is not meaningfully
+  smaller than the document (SOP_DELTA_MAX_RATIO)
+- reading any version is one recursive query for its chain (keyframe + fewer
+  than SOP_KEYFRAME_INTERVAL deltas) and that many patch() calls
+
+Deltas are structural JSON diffs (see diff()): objects by key, arrays by
+sequence matching on element content, so an edited clause costs about its own
+size. Every delta is checked against the target hash before it is written.
+
+Bodies are stored as the canonical JSON text itself (sop_content.body is text),
+never as JSONB, whose number rendering would change what was hashed; load_content()
+still re-verifies each rebuilt document against its hash before returning or
+caching it.
+
+Publishing:
+  async with engine.begin() as conn:
+      v = await publish_version(conn, sop_id=sop_id, content=doc, published_by=actor.id)
+      await enqueue_event(conn, topic=CORE_SOP_VERSION_PUBLISHED,
+                          payload={"sop_id": str(sop_id), "version": v.version, "content_hash": v.content_hash},
+                          actor=actor, key_entity_id=str(sop_id))
+The event carries the hash, not the content; readers resolve it with
+load_content()/load_version() (the API serves GET /sops/{sop_id}/versions/{version}).
+This tree has no SOP write endpoint yet: whichever path publishes versions must
+call publish_version() as above.
+
+Content by hash never changes, so ContentCache can hold decoded documents
+without invalidation. Cached documents are shared: treat them as read-only.
+
+Env:
+  SOP_KEYFRAME_INTERVAL=16   max deltas between keyframes (1 => every version full)
+  SOP_DELTA_MAX_RATIO=0.5    store full when delta size > ratio * document size
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from difflib import SequenceMatcher
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from core import codec
+
+KEYFRAME_INTERVAL = max(1, int(os.getenv("SOP_KEYFRAME_INTERVAL", "16")))
+DELTA_MAX_RATIO = float(os.getenv("SOP_DELTA_MAX_RATIO", "0.5"))
+
+FULL = "full"
+DELTA = "delta"
+
+_PUBLISH_CONTEXT_SQL = text("""
+    SELECT
+      s.current_version,
+      v.content_hash AS prev_hash,
+      c.depth AS prev_depth,
+      EXISTS (SELECT 1 FROM sop_content WHERE content_hash = :hash) AS known
+    FROM sop s
+    LEFT JOIN sop_version v ON v.sop_id = s.sop_id AND v.version = s.current_version
+    LEFT JOIN sop_content c ON c.content_hash = v.content_hash
+    WHERE s.sop_id = :sop_id
+    FOR UPDATE OF s
+""")
+
+_INSERT_CONTENT_SQL = text("""
+    INSERT INTO sop_content (content_hash, encoding, base_hash, depth, body, content_size)
+    VALUES (:hash, :encoding, :base_hash, :depth, :body, :size)
+    ON CONFLICT (content_hash) DO NOTHING
+""")
+
+_INSERT_VERSION_SQL = text("""
+    WITH v AS (
+      INSERT INTO sop_version (sop_id, version, content_hash, content_ref, published_by)
+      VALUES (:sop_id, :version, :hash, :content_ref, :published_by)
+    )
+    UPDATE sop
+    SET current_version = :version, status = 'published', updated_at = now(), updated_by = :published_by
+    WHERE sop_id = :sop_id
+""")
+
+# keyframe first; the CHECK on sop_content keeps every chain ending in a keyframe
+_CHAIN_SQL = text("""
+    WITH RECURSIVE chain AS (
+      SELECT content_hash, base_hash, encoding, body, depth FROM sop_content WHERE content_hash = :hash
+      UNION ALL
+      SELECT c.content_hash, c.base_hash, c.encoding, c.body, c.depth
+      FROM sop_content c JOIN chain ON c.content_hash = chain.base_hash
+    )
+    SELECT content_hash, encoding, body FROM chain ORDER BY depth
+""")
+
+_VERSION_SQL = text("""
+    SELECT content_hash, CAST(content_json AS text) AS content_json
+    FROM sop_version
+    WHERE sop_id = :sop_id AND version = :version
+""")
+
+
+class PublishedVersion(NamedTuple):
+    sop_id: UUID
+    version: int
+    content_hash: str
+    stored: Optional[str]  # FULL / DELTA, or None when the content already existed
+    stored_size: int       # bytes of body written (0 when deduplicated)
+
+
+# ---------------------------
+# Hashing / structural diff
+# ---------------------------
+
+def canonical_json(content: Any) -> bytes:
+    return json.dumps(content, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def content_hash(content: Any) -> str:
+    return hashlib.sha256(canonical_json(content)).hexdigest()
+
+
+def diff(base: Any, new: Any) -> Optional[Dict[str, Any]]:
+    """
+    Delta such that patch(base, delta) == new; None when they are equal.
+
+      {"v": value}                   replace
+      {"m": {key: delta}, "x": [k]}  object: changed/added keys, removed keys
+      {"l": [segment, ...]}          array rebuilt from segments:
+                                       [i, j]           base[i:j]
+                                       {"i": [items]}   literal items
+                                       {"p": [i, d]}    patch(base[i], d)
+    """
+    if base == new and type(base) is type(new):
+        return None
+    if isinstance(base, dict) and isinstance(new, dict):
+        changed = {}
+        for key, value in new.items():
+            if key not in base:
+                changed[key] = {"v": value}
+            else:
+                d = diff(base[key], value)
+                if d is not None:
+                    changed[key] = d
+        out: Dict[str, Any] = {"m": changed}
+        removed = [key for key in base if key not in new]
+        if removed:
+            out["x"] = removed
+        return out
+    if isinstance(base, list) and isinstance(new, list):
+        return {"l": _diff_list(base, new)}
+    return {"v": new}
+
+
+def _diff_list(base: List[Any], new: List[Any]) -> List[Any]:
+    a = [canonical_json(x) for x in base]
+    b = [canonical_json(x) for x in new]
+    segments: List[Any] = []
+    for op, i1, i2, j1, j2 in SequenceMatcher(None, a, b, autojunk=False).get_opcodes():
+        if op == "equal":
+            segments.append([i1, i2])
+        elif op == "replace" and i2 - i1 == j2 - j1:
+            # same-length replacement: usually edited elements, patch them in place
+            for i, j in zip(range(i1, i2), range(j1, j2)):
+                d = diff(base[i], new[j]) if isinstance(new[j], (dict, list)) and type(base[i]) is type(new[j]) else None
+                segments.append({"p": [i, d]} if d is not None else {"i": [new[j]]})
+        elif op != "delete":
+            segments.append({"i": new[j1:j2]})
+    return segments
+
+
+def patch(base: Any, delta: Dict[str, Any]) -> Any:
+    """Apply a diff() delta. Unchanged parts of `base` are shared, not copied."""
+    if "v" in delta:
+        return delta["v"]
+    if "m" in delta:
+        out = dict(base)
+        for key in delta.get("x", ()):
+            del out[key]
+        for key, d in delta["m"].items():
+            out[key] = patch(out.get(key), d)
+        return out
+    out_list: List[Any] = []
+    for seg in delta["l"]:
+        if isinstance(seg, list):
+            out_list.extend(base[seg[0]:seg[1]])
+        elif "i" in seg:
+            out_list.extend(seg["i"])
+        else:
+            i, d = seg["p"]
+            out_list.append(patch(base[i], d))
+    return out_list
+
+
+def encode_content(
+    content: Any,
+    *,
+    prev: Any = None,
+    prev_depth: Optional[int] = None,
+    keyframe_interval: int = KEYFRAME_INTERVAL,
+    max_delta_ratio: float = DELTA_MAX_RATIO,
+) -> Tuple[str, bytes, int, int]:
+    """
+    Choose the stored form of `content` given the previous version (prev_depth
+    None => no usable base). Returns (encoding, body, depth, content_size).
+    """
+    full = canonical_json(content)
+    if prev_depth is None or prev_depth + 1 >= keyframe_interval:
+        return FULL, full, 0, len(full)
+    delta = diff(prev, content)
+    if delta is None:
+        return FULL, full, 0, len(full)  # unreachable via publish_version: equal content dedups
+    body = canonical_json(delta)
+    if len(body) > max_delta_ratio * len(full) or canonical_json(patch(prev, delta)) != full:
+        return FULL, full, 0, len(full)
+    return DELTA, body, prev_depth + 1, len(full)
+
+
+# ---------------------------
+# Cache
+# ---------------------------
+
+class ContentCache:
+    """LRU of decoded documents by content_hash (immutable content: no invalidation)."""
+
+    def __init__(self, max_size: int = 512) -> None:
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+
+    def get(self, key: str) -> Any:
+        doc = self._entries.get(key)
+        if doc is not None:
+            self._entries.move_to_end(key)
+        return doc
+
+    def put(self, key: str, doc: Any) -> None:
+        self._entries[key] = doc
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+
+# ---------------------------
+# Read
+# ---------------------------
+
+class ContentIntegrityError(ValueError):
+    """A rebuilt document does not match its content_hash."""
+
+
+async def load_content(conn: AsyncConnection, key: str, *, cache: Optional[ContentCache] = None) -> Any:
+    """Document whose content_hash is `key`; KeyError if it is not stored, ContentIntegrityError if it is corrupt."""
+    if cache is not None:
+        doc = cache.get(key)
+        if doc is not None:
+            return doc
+    rows = (await conn.execute(_CHAIN_SQL, {"hash": key})).all()
+    if not rows or rows[0].encoding != FULL:
+        raise KeyError(key)
+    doc = None
+    for row in rows:
+        body = codec.loads(row.body.encode(codec.ENCODING))
+        doc = body if row.encoding == FULL else patch(doc, body)
+    if content_hash(doc) != key:
+        raise ContentIntegrityError(f"sop_content {key} does not match its hash")
+    if cache is not None:
+        cache.put(key, doc)
+    return doc
+
+
+async def load_version(
+    conn: AsyncConnection,
+    sop_id: UUID,
+    version: int,
+    *,
+    cache: Optional[ContentCache] = None,
+) -> Optional[Tuple[str, Any]]:
+    """(content_hash, content) of one version, or None if there is no such version."""
+    row = (await conn.execute(_VERSION_SQL, {"sop_id": sop_id, "version": version})).first()
+    if row is None:
+        return None
+    if row.content_json is not None:  # written before sop_content existed
+        return row.content_hash, codec.loads(row.content_json.encode(codec.ENCODING))
+    return row.content_hash, await load_content(conn, row.content_hash, cache=cache)
+
+
+# ---------------------------
+# Write (caller's transaction)
+# ---------------------------
+
+async def publish_version(
+    conn: AsyncConnection,
+    *,
+    sop_id: UUID,
+    content: Any,
+    published_by: Optional[str] = None,
+    content_ref: Optional[str] = None,
+    cache: Optional[ContentCache] = None,
+) -> PublishedVersion:
+    """
+    Append version current_version + 1 to the SOP (row-locked, so concurrent
+    publishes of one SOP serialize) and store its content unless the hash is
+    already known. Runs on the caller's connection; nothing is visible until the
+    caller commits. KeyError if the SOP does not exist.
+    """
+    full_hash = content_hash(content)
+    ctx = (await conn.execute(_PUBLISH_CONTEXT_SQL, {"sop_id": sop_id, "hash": full_hash})).first()
+    if ctx is None:
+        raise KeyError(sop_id)
+    version = ctx.current_version + 1
+
+    stored, stored_size = None, 0
+    if not ctx.known:
+        prev = None
+        prev_depth = ctx.prev_depth  # NULL: first version, or previous one predates sop_content
+        if prev_depth is not None and prev_depth + 1 < KEYFRAME_INTERVAL:
+            prev = await load_content(conn, ctx.prev_hash, cache=cache)
+        encoding, body, depth, size = encode_content(content, prev=prev, prev_depth=prev_depth)
+        await conn.execute(_INSERT_CONTENT_SQL, {
+            "hash": full_hash,
+            "encoding": encoding,
+            "base_hash": ctx.prev_hash if encoding == DELTA else None,
+            "depth": depth,
+            "body": body.decode("utf-8"),
+            "size": size,
+        })
+        stored, stored_size = encoding, len(body)
+
+    await conn.execute(_INSERT_VERSION_SQL, {
+        "sop_id": sop_id,
+        "version": version,
+        "hash": full_hash,
+        "content_ref": content_ref,
+        "published_by": published_by,
+    })
+    return PublishedVersion(sop_id, version, full_hash, stored, stored_size)